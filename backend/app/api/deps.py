@@ -0,0 +1,25 @@
+from app.core.container import provide
+from app.services.tour_service import TourService
+from app.services.scene_service import SceneService
+from app.services.hotspot_service import HotspotService
+from app.services.search_service import SearchService
+from app.services.bundle_service import BundleService
+from app.services.backup_service import BackupService
+from app.services.migration_service import MigrationService
+from app.services.upload_service import UploadService
+from app.services.change_service import ChangeService
+from app.services.analytics_service import AnalyticsService
+from app.services.batch_service import BatchService
+
+# Dependencies FastAPI: service chỉ được khởi tạo ở request đầu tiên cần đến
+get_tour_service = provide(TourService)
+get_scene_service = provide(SceneService)
+get_hotspot_service = provide(HotspotService)
+get_search_service = provide(SearchService)
+get_bundle_service = provide(BundleService)
+get_backup_service = provide(BackupService)
+get_migration_service = provide(MigrationService)
+get_upload_service = provide(UploadService)
+get_change_service = provide(ChangeService)
+get_analytics_service = provide(AnalyticsService)
+get_batch_service = provide(BatchService)
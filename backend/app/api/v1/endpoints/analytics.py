@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.services.analytics_service import AnalyticsService
+from app.api.deps import get_analytics_service
+from app.schema.analytics_schema import (
+    AnalyticsBatch,
+    AnalyticsIngestResult,
+    AnalyticsSummary,
+    AnalyticsTimeseries,
+    EventType,
+)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.post("/events", status_code=202, response_model=AnalyticsIngestResult)
+async def ingest_events(
+    batch: AnalyticsBatch,
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Nhận batch event của viewer (tối đa ANALYTICS_MAX_BATCH event)
+
+    Event được gom trong bộ nhớ và ghi định kỳ, response trả về ngay. Route
+    không qua admission control (không chiếm slot write của tour API).
+    """
+    return analytics_service.ingest([event.model_dump(exclude_none=True) for event in batch.events])
+
+
+@router.get("/tours/{tour_id}/summary", response_model=AnalyticsSummary)
+async def get_summary(
+    tour_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Lượt vào/rời, dwell trung bình, click hotspot theo scene và click theo
+    hotspot (mặc định 7 ngày gần nhất)
+    """
+    return await analytics_service.summary(tour_id, start, end)
+
+
+@router.get("/tours/{tour_id}/timeseries", response_model=AnalyticsTimeseries)
+async def get_timeseries(
+    tour_id: str,
+    type: EventType = "scene_enter",
+    bucket: Literal["minute", "hour", "day"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    scene_id: Optional[str] = None,
+    hotspot_id: Optional[str] = None,
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+):
+    """Số event theo bucket (mặc định 24 giờ gần nhất), lọc theo scene/hotspot"""
+    return await analytics_service.timeseries(
+        tour_id, type, bucket, start, end, scene_id, hotspot_id
+    )
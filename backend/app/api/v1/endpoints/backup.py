@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.services.backup_service import BackupService
+from app.services.tour_service import TourService
+from app.services.job_service import job_service, JobContext
+from app.api.v1.endpoints.job import submit_upload_job
+from app.api.deps import get_backup_service, get_tour_service
+from app.core.container import container
+
+router = APIRouter(prefix="/backup", tags=["backup"])
+
+
+async def run_restore_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: restore backup từ file tạm"""
+    path = params["path"]
+    backup_service = container.get(BackupService)
+    try:
+        with open(path, "rb") as file:
+            counts = await backup_service.restore(file, params["remap"], context.progress)
+    finally:
+        os.remove(path)
+    return {"success": True, "message": "Backup restored successfully", **counts}
+
+
+job_service.register("restore_backup", run_restore_job)
+
+
+@router.get("")
+async def create_backup(
+    tour_id: Optional[List[str]] = Query(None, description="Chỉ backup các tours này"),
+    name: Optional[str] = None,
+    tour_service: TourService = Depends(get_tour_service),
+    backup_service: BackupService = Depends(get_backup_service),
+):
+    """
+    Stream backup nhiều tours (tất cả nếu không có filter) dạng `.ndjson.gz`
+
+    Mỗi dòng là một tour ở format export (kèm id và sha256), dòng cuối chứa
+    số lượng và checksum toàn archive.
+    """
+    filter_dict: Dict = {}
+    ids = set()
+    if tour_id:
+        if not all(ObjectId.is_valid(id) for id in tour_id):
+            raise HTTPException(status_code=400, detail="Invalid tour_id")
+        ids.update(tour_id)
+    if name:
+        matched = set(await tour_service.find_tour_ids_by_name(name))
+        ids = ids & matched if tour_id else matched
+    if tour_id or name:
+        filter_dict["_id"] = {"$in": [ObjectId(id) for id in ids]}
+
+    filename = f"novaland-backup-{datetime.utcnow():%Y%m%d-%H%M%S}.ndjson.gz"
+    return StreamingResponse(
+        backup_service.stream_backup(filter_dict),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/restore")
+async def restore_backup(
+    file: UploadFile = File(...),
+    remap: bool = Query(False, description="Tạo ID mới thay vì giữ ID trong backup"),
+    background: bool = Query(True, description="Chạy nền (202 kèm job), false để chờ kết quả"),
+    idempotency_key: Optional[str] = Header(None),
+    backup_service: BackupService = Depends(get_backup_service),
+):
+    """
+    Restore backup tạo bởi `GET /backup`
+
+    Mặc định giữ nguyên ID (document đã tồn tại được bỏ qua và đếm vào
+    `skipped`); `remap=true` tạo ID mới để restore song song với dữ liệu hiện có.
+    Mặc định chạy nền: trả về 202, theo dõi tiến độ qua `/jobs/{job_id}`.
+    """
+    if background:
+        return await submit_upload_job(
+            "restore_backup",
+            file,
+            {"remap": remap},
+            summary={"filename": file.filename, "remap": remap},
+            idempotency_key=idempotency_key,
+            suffix=".ndjson.gz",
+        )
+
+    counts = await backup_service.restore(file.file, remap)
+    return {"success": True, "message": "Backup restored successfully", **counts}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.batch_service import BatchService
+from app.api.deps import get_batch_service
+from app.schema.batch_schema import BatchRequest, BatchResult
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+
+@router.post("", response_model=BatchResult)
+async def apply_batch(
+    batch: BatchRequest,
+    batch_service: BatchService = Depends(get_batch_service),
+):
+    """
+    Ghi nhiều thao tác create/update/delete trên tours, scenes, hotspots
+
+    Document tạo mới có `ref`, các thao tác sau tham chiếu bằng `$<ref>` (ở
+    `id` hoặc tour_id, scene_id, target_scene, entry_scene). Nếu một thao tác
+    lỗi thì không thao tác nào được ghi: response có mã lỗi của thao tác lỗi
+    đầu tiên, các thao tác còn lại có status 424.
+    """
+    result = await batch_service.execute([operation.model_dump() for operation in batch.operations])
+    if not result["applied"]:
+        status = next(r["status"] for r in result["results"] if r["status"] != 424)
+        return JSONResponse(status_code=status, content=jsonable_encoder(BatchResult(**result)))
+    return result
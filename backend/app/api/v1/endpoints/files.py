@@ -0,0 +1,48 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse
+
+from app.core.conditional import is_not_modified
+from app.core.config import configs
+from app.core.exceptions import NotFoundError
+from app.core.storage import MEDIA_TYPES, local_storage
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+@router.get("/{public_id:path}")
+async def get_file(public_id: str, request: Request):
+    """
+    Serve ảnh lưu bằng storage local (LOCAL_STORAGE_DIR)
+
+    Hỗ trợ Range (206), ETag/If-None-Match (304); file không bao giờ đổi sau
+    khi ghi nên được cache lâu dài (immutable).
+    """
+    path = local_storage.resolve(public_id)
+    try:
+        stat = os.stat(path) if path else None
+    except FileNotFoundError:
+        stat = None
+    if stat is None or not os.path.isfile(path):
+        raise NotFoundError(f"File not found: {public_id}")
+
+    etag = '"{}"'.format(
+        hashlib.md5(f"{public_id}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+    )
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={configs.LOCAL_STORAGE_MAX_AGE}, immutable",
+    }
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    # FileResponse xử lý Range/If-Range và dùng pathsend (zero-copy) nếu server hỗ trợ
+    return FileResponse(
+        path,
+        headers=headers,
+        media_type=MEDIA_TYPES.get(os.path.splitext(path)[1].lower()),
+        stat_result=stat,
+    )
@@ -1,20 +1,30 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from typing import Optional, List
 
 from app.services.hotspot_service import HotspotService
+from app.api.deps import get_hotspot_service
 from app.schema.hotspot_schema import (
     HotspotCreate,
     HotspotUpdate,
     HotspotResponse,
     FindHotspotResult,
     Position,
+    HotspotBatchPositionUpdate,
+    HotspotBatchPositionResult,
 )
 from app.schema.base_schema import MessageResponse
+from app.core.streaming import ndjson_response
+from app.core.conditional import (
+    is_conditional,
+    is_not_modified,
+    list_validators,
+    not_modified_response,
+    set_validators,
+    stamp_validators,
+)
 
 router = APIRouter(prefix="/hotspots", tags=["hotspots"])
 
-hotspot_service = HotspotService()
-
 
 @router.get("", response_model=FindHotspotResult)
 async def get_hotspots(
@@ -22,6 +32,7 @@ async def get_hotspots(
     page_size: int = Query(50, ge=1, le=100),
     scene_id: Optional[str] = None,
     type: Optional[str] = None,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
 ):
     """Get list of hotspots"""
     filter_dict = {}
@@ -40,10 +51,40 @@ async def get_hotspots(
     return result
 
 
+@router.get("/stream")
+async def stream_hotspots(
+    scene_id: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = Query(0, ge=0, description="0 = no limit"),
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
+    """Stream all hotspots as NDJSON (one hotspot per line, no pagination)"""
+    filter_dict = {}
+    if scene_id:
+        filter_dict["scene_id"] = scene_id
+    if type:
+        filter_dict["type"] = type
+
+    return ndjson_response(hotspot_service.stream(filter_dict, limit))
+
+
 @router.get("/by-scene/{scene_id}")
-async def get_hotspots_by_scene(scene_id: str):
-    """Get all hotspots by scene id"""
+async def get_hotspots_by_scene(
+    scene_id: str,
+    request: Request,
+    response: Response,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
+    """Get all hotspots by scene id (supports If-None-Match)"""
+    scope = f"hotspots-by-scene:{scene_id}"
+    if is_conditional(request):
+        stamps = await hotspot_service.get_hotspot_stamps_by_scene(scene_id)
+        etag, last_modified = list_validators(stamps, scope)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
     hotspots = await hotspot_service.get_hotspots_by_scene(scene_id)
+    set_validators(response, *list_validators(hotspots, scope))
     # Convert _id -> id cho response
     items = [
         HotspotResponse(id=h["_id"], **{k: v for k, v in h.items() if k != "_id"})
@@ -53,18 +94,35 @@ async def get_hotspots_by_scene(scene_id: str):
 
 
 @router.get("/{hotspot_id}", response_model=HotspotResponse)
-async def get_hotspot(hotspot_id: str):
-    """Get hotspot by id"""
+async def get_hotspot(
+    hotspot_id: str,
+    request: Request,
+    response: Response,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
+    """Get hotspot by id (supports If-None-Match / If-Modified-Since)"""
+    if is_conditional(request):
+        stamp = await hotspot_service.get_stamp(hotspot_id)
+        if not stamp:
+            raise HTTPException(status_code=404, detail="Hotspot not found")
+        etag, last_modified = stamp_validators([stamp], "hotspot")
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
     hotspot = await hotspot_service.get_by_id(hotspot_id)
     if not hotspot:
         raise HTTPException(status_code=404, detail="Hotspot not found")
+    set_validators(response, *stamp_validators([hotspot], "hotspot"))
     return HotspotResponse(
         id=hotspot["_id"], **{k: v for k, v in hotspot.items() if k != "_id"}
     )
 
 
 @router.post("", response_model=HotspotResponse)
-async def create_hotspot(hotspot: HotspotCreate):
+async def create_hotspot(
+    hotspot: HotspotCreate,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
     """Create new hotspot"""
     hotspot_data = hotspot.dict()
 
@@ -79,7 +137,10 @@ async def create_hotspot(hotspot: HotspotCreate):
 
 
 @router.post("/bulk")
-async def create_hotspots_bulk(hotspots: List[HotspotCreate]):
+async def create_hotspots_bulk(
+    hotspots: List[HotspotCreate],
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
     """Create multiple hotspots at once"""
     hotspots_data = []
     for h in hotspots:
@@ -92,43 +153,78 @@ async def create_hotspots_bulk(hotspots: List[HotspotCreate]):
     return {"items": results, "total": len(results)}
 
 
+@router.patch("/positions", response_model=HotspotBatchPositionResult)
+async def update_hotspot_positions(
+    batch: HotspotBatchPositionUpdate,
+    response: Response,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
+    """
+    Update positions of many hotspots at once
+
+    Only the latest position per hotspot is kept. With `relaxed=true` the
+    update is coalesced server-side and the request returns 202 immediately.
+    """
+    result = await hotspot_service.batch_update_positions(
+        [item.model_dump() for item in batch.items], relaxed=batch.relaxed
+    )
+    if result["queued"]:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
+
+
 @router.patch("/{hotspot_id}", response_model=HotspotResponse)
-async def update_hotspot(hotspot_id: str, hotspot: HotspotUpdate):
-    """Update hotspot"""
+async def update_hotspot(
+    hotspot_id: str,
+    hotspot: HotspotUpdate,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
+    """Update hotspot (send `version` to get 409 if it was modified meanwhile)"""
     hotspot_data = hotspot.dict(exclude_none=True)
+    expected_version = hotspot_data.pop("version", None)
 
     # Convert position to dict if present
     if "position" in hotspot_data and hasattr(hotspot_data["position"], "dict"):
         hotspot_data["position"] = hotspot_data["position"].dict()
 
-    result = await hotspot_service.update(hotspot_id, hotspot_data)
-    if not result:
-        raise HTTPException(status_code=404, detail="Hotspot not found")
+    result = await hotspot_service.update(hotspot_id, hotspot_data, expected_version)
     return HotspotResponse(
         id=result["_id"], **{k: v for k, v in result.items() if k != "_id"}
     )
 
 
 @router.patch("/{hotspot_id}/position", response_model=HotspotResponse)
-async def update_hotspot_position(hotspot_id: str, position: Position):
+async def update_hotspot_position(
+    hotspot_id: str,
+    position: Position,
+    version: Optional[int] = Query(None, description="Expected version (409 on mismatch)"),
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
     """Update hotspot position"""
-    result = await hotspot_service.update_hotspot_position(hotspot_id, position.dict())
-    if not result:
-        raise HTTPException(status_code=404, detail="Hotspot not found")
+    result = await hotspot_service.update_hotspot_position(
+        hotspot_id, position.dict(), version
+    )
     return HotspotResponse(
         id=result["_id"], **{k: v for k, v in result.items() if k != "_id"}
     )
 
 
 @router.delete("/{hotspot_id}", response_model=MessageResponse)
-async def delete_hotspot(hotspot_id: str):
+async def delete_hotspot(
+    hotspot_id: str,
+    version: Optional[int] = Query(None, description="Expected version (409 on mismatch)"),
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
     """Delete hotspot"""
-    await hotspot_service.delete(hotspot_id)
+    await hotspot_service.delete(hotspot_id, version)
     return MessageResponse(message="Hotspot deleted successfully")
 
 
 @router.delete("/by-scene/{scene_id}", response_model=MessageResponse)
-async def delete_hotspots_by_scene(scene_id: str):
+async def delete_hotspots_by_scene(
+    scene_id: str,
+    hotspot_service: HotspotService = Depends(get_hotspot_service),
+):
     """Delete all hotspots by scene id"""
     count = await hotspot_service.bulk_delete_by_scene(scene_id)
     return MessageResponse(message=f"Deleted {count} hotspots")
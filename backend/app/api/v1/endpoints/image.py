@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Header, Query
+from typing import Dict, Optional
+
+from app.services.image_gc_service import ImageGCService
+from app.services.job_service import job_service, JobContext
+from app.api.v1.endpoints.job import job_accepted
+from app.core.container import container
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+
+async def run_image_gc_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: đối soát storage và xóa ảnh orphan"""
+    return await container.get(ImageGCService).collect(
+        params["dry_run"], params.get("grace_hours"), context.progress
+    )
+
+
+job_service.register("gc_images", run_image_gc_job)
+
+
+@router.post("/gc")
+async def collect_images(
+    dry_run: bool = Query(True, description="Chỉ báo cáo ảnh orphan, không xóa"),
+    grace_hours: Optional[float] = Query(
+        None, ge=0, description="Bỏ qua ảnh mới hơn (mặc định IMAGE_GC_GRACE_HOURS)"
+    ),
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    Chạy nền job dọn ảnh không còn scene nào dùng, trả về 202 kèm job
+
+    Kết quả (`GET /jobs/{id}/result`) là báo cáo: số ảnh đã duyệt, số orphan,
+    dung lượng và danh sách mẫu public_id, số ảnh đã xóa.
+    """
+    params = {"dry_run": dry_run, "grace_hours": grace_hours}
+    job = await job_service.submit(
+        "gc_images", params, summary=params, idempotency_key=idempotency_key
+    )
+    return job_accepted(job)
@@ -1,23 +1,62 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query
+from typing import Dict, Optional
 import json
+import os
 
 from app.services.tour_service import TourService
-from app.services.scene_service import SceneService
-from app.services.hotspot_service import HotspotService
+from app.services.bundle_service import BundleService
+from app.services.job_service import job_service, JobContext
+from app.api.v1.endpoints.job import job_accepted, submit_upload_job
+from app.api.deps import get_bundle_service, get_tour_service
+from app.core.container import container
 
 router = APIRouter(prefix="/import", tags=["import-export"])
 
-tour_service = TourService()
-scene_service = SceneService()
-hotspot_service = HotspotService()
+
+async def run_import_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: import tour từ JSON (upsert nếu có tour_id)"""
+    tour_service = container.get(TourService)
+    if params.get("tour_id"):
+        result = await tour_service.sync_tour_json(
+            params["tour_id"], params["data"], context.progress
+        )
+    else:
+        result = await tour_service.import_tour_json(params["data"], context.progress)
+    return {"success": True, "message": "Tour imported successfully", **result}
+
+
+async def run_bundle_import_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: import tour từ ZIP bundle trong file tạm"""
+    path = params["path"]
+    try:
+        with open(path, "rb") as file:
+            result = await container.get(BundleService).import_bundle(file, context.progress)
+    finally:
+        os.remove(path)
+    return {"success": True, "message": "Tour bundle imported successfully", **result}
+
+
+job_service.register("import_tour", run_import_job)
+job_service.register("import_bundle", run_bundle_import_job)
 
 
 @router.post("/tour-json")
-async def import_tour_from_json(data: Dict):
+async def import_tour_from_json(
+    data: Dict,
+    tour_id: Optional[str] = Query(None, description="Upsert vào tour có sẵn"),
+    background: bool = Query(False, description="Chạy nền, trả về 202 kèm job"),
+    idempotency_key: Optional[str] = Header(None),
+    tour_service: TourService = Depends(get_tour_service),
+):
     """
     Import tour từ JSON format (giống tour.json của frontend)
 
+    Với `tour_id`, JSON được import vào tour đó: scenes/hotspots được so khớp
+    theo ID trong JSON và chỉ phần thêm/sửa/xóa được ghi.
+
+    Với `background=true` request trả về 202 ngay, theo dõi tiến độ qua
+    `/jobs/{job_id}`. Header `Idempotency-Key` giúp retry không tạo job trùng.
+
     Expected format:
     {
         "name": "Tour Name",
@@ -42,82 +81,77 @@ async def import_tour_from_json(data: Dict):
         }
     }
     """
-    try:
-        # 1. Tạo tour
-        tour_data = {
-            "name": data.get("name", "Imported Tour"),
-            "entry_scene": None,  # Sẽ cập nhật sau
-        }
-        tour = await tour_service.create(tour_data)
-        tour_id = tour["_id"]
-
-        # Map từ old scene id sang new scene id
-        scene_id_map = {}
-
-        # 2. Tạo scenes
-        scenes_data = data.get("scenes", {})
-        for old_scene_id, scene_info in scenes_data.items():
-            scene_data = {
+    if background:
+        job = await job_service.submit(
+            "import_tour",
+            {"data": data, "tour_id": tour_id},
+            summary={
+                "name": data.get("name"),
+                "scenes": len(data.get("scenes", {})),
                 "tour_id": tour_id,
-                "name": scene_info.get("name", ""),
-                "description": scene_info.get("description", ""),
-                "image_url": scene_info.get("image", ""),
-                "initial_view": scene_info.get(
-                    "initialView", {"yaw": 0, "pitch": 0, "fov": 100}
-                ),
-            }
-            scene = await scene_service.create(scene_data)
-            scene_id_map[old_scene_id] = scene["_id"]
-
-        # 3. Cập nhật entry_scene với new scene id
-        entry_scene = data.get("entryScene", "")
-        if entry_scene and entry_scene in scene_id_map:
-            await tour_service.update(
-                tour_id, {"entry_scene": scene_id_map[entry_scene]}
-            )
-
-        # 4. Tạo hotspots với mapped scene ids
-        for old_scene_id, scene_info in scenes_data.items():
-            new_scene_id = scene_id_map.get(old_scene_id)
-            if not new_scene_id:
-                continue
-
-            hotspots = scene_info.get("hotspots", [])
-            for hotspot_info in hotspots:
-                target_scene = hotspot_info.get("targetScene", "")
-                new_target_scene = scene_id_map.get(target_scene, target_scene)
-
-                hotspot_data = {
-                    "scene_id": new_scene_id,
-                    "type": hotspot_info.get("type", "click"),
-                    "position": hotspot_info.get("position", {"x": 0, "y": 0, "z": 0}),
-                    "target_scene": new_target_scene,
-                    "label": hotspot_info.get("label", ""),
-                    "fov_trigger": hotspot_info.get("fovTrigger"),
-                }
-                await hotspot_service.create_hotspot(hotspot_data)
-
-        return {
-            "success": True,
-            "message": "Tour imported successfully",
-            "tour_id": tour_id,
-            "scene_id_map": scene_id_map,
-            "scenes_count": len(scene_id_map),
-        }
+            },
+            idempotency_key=idempotency_key,
+        )
+        return job_accepted(job)
 
+    if tour_id:
+        result = await tour_service.sync_tour_json(tour_id, data)
+        return {"success": True, "message": "Tour imported successfully", **result}
+
+    try:
+        result = await tour_service.import_tour_json(data)
+        return {"success": True, "message": "Tour imported successfully", **result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
 
 
 @router.post("/tour-file")
-async def import_tour_from_file(file: UploadFile = File(...)):
-    """Import tour từ file JSON"""
+async def import_tour_from_file(
+    file: UploadFile = File(...),
+    tour_id: Optional[str] = Query(None, description="Upsert vào tour có sẵn"),
+    background: bool = Query(True, description="Chạy nền (202 kèm job), false để chờ kết quả"),
+    idempotency_key: Optional[str] = Header(None),
+    tour_service: TourService = Depends(get_tour_service),
+):
+    """Import tour từ file JSON (mặc định chạy nền, theo dõi qua `/jobs/{job_id}`)"""
     if not file.filename.endswith(".json"):
         raise HTTPException(status_code=400, detail="File must be JSON")
 
     try:
         contents = await file.read()
         data = json.loads(contents.decode("utf-8"))
-        return await import_tour_from_json(data)
+        return await import_tour_from_json(
+            data, tour_id, background, idempotency_key, tour_service
+        )
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON file")
+
+
+@router.post("/tour-bundle")
+async def import_tour_from_bundle(
+    file: UploadFile = File(...),
+    background: bool = Query(True, description="Chạy nền (202 kèm job), false để chờ kết quả"),
+    idempotency_key: Optional[str] = Header(None),
+    bundle_service: BundleService = Depends(get_bundle_service),
+):
+    """
+    Import tour từ ZIP bundle (tạo bởi `GET /tours/{id}/bundle`)
+
+    Kiểm tra sha256 theo manifest, upload ảnh lên storage rồi tạo tour.
+    Mặc định chạy nền: trả về 202, theo dõi tiến độ qua `/jobs/{job_id}`.
+    """
+    if not file.filename.endswith(".zip"):
+        raise HTTPException(status_code=400, detail="File must be a ZIP bundle")
+
+    if background:
+        return await submit_upload_job(
+            "import_bundle",
+            file,
+            {},
+            summary={"filename": file.filename},
+            idempotency_key=idempotency_key,
+            suffix=".zip",
+        )
+
+    result = await bundle_service.import_bundle(file.file)
+    return {"success": True, "message": "Tour bundle imported successfully", **result}
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
+
+from app.services.job_service import job_service, request_fingerprint
+from app.schema.job_schema import JobResponse, FindJobResult
+from app.core.config import configs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def to_job_response(job: Dict) -> JobResponse:
+    """Convert job document -> JobResponse"""
+    return JobResponse(id=job["_id"], **{k: v for k, v in job.items() if k != "_id"})
+
+
+def job_accepted(job: Dict) -> JSONResponse:
+    """Response 202 Accepted trỏ tới job vừa tạo"""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(to_job_response(job)),
+        headers={"Location": f"{configs.API_V1_STR}/jobs/{job['_id']}"},
+    )
+
+
+async def submit_upload_job(
+    job_type: str,
+    file: UploadFile,
+    params: Dict,
+    summary: Dict,
+    idempotency_key: Optional[str] = None,
+    suffix: str = "",
+) -> JSONResponse:
+    """
+    Chạy nền job xử lý file upload, trả về 202
+
+    File upload bị đóng khi request kết thúc nên job đọc từ bản copy trên đĩa
+    (`params["path"]`, handler xóa file khi xong). Idempotency-Key được so khớp
+    theo sha256 nội dung file và params, không theo đường dẫn file tạm.
+    """
+    fingerprint = None
+    if idempotency_key:
+        sha256 = await run_in_threadpool(_hash_file, file.file)
+        fingerprint = request_fingerprint({"sha256": sha256, **params})
+        existing = await job_service.find_existing(job_type, idempotency_key, fingerprint)
+        if existing:
+            return job_accepted(existing)
+
+    path = await run_in_threadpool(_spool_to_disk, file.file, suffix)
+    try:
+        job = await job_service.submit(
+            job_type,
+            {"path": path, **params},
+            summary=summary,
+            idempotency_key=idempotency_key,
+            fingerprint=fingerprint,
+        )
+    except Exception:
+        os.remove(path)
+        raise
+    return job_accepted(job)
+
+
+def _hash_file(file) -> str:
+    """sha256 nội dung file upload (đọc lại từ đầu sau khi hash)"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _spool_to_disk(file, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(file, tmp)
+    return tmp.name
+
+
+@router.get("", response_model=FindJobResult)
+async def get_jobs(
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Danh sách jobs mới nhất"""
+    jobs = await job_service.list_jobs(status, type, limit)
+    items = [to_job_response(job) for job in jobs]
+    return {"items": items, "total": len(items)}
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """
+    Lấy trạng thái job
+
+    - **wait**: Số giây chờ job kết thúc trước khi trả về (long-poll)
+    """
+    job = await job_service.wait(job_id, wait)
+    return to_job_response(job)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, request: Request):
+    """Lấy kết quả của job đã hoàn thành"""
+    job = await job_service.get_job(job_id)
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=409, detail=f"Job is {job['status']}, no result available"
+        )
+    return await job_service.load_result(job, request)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Hủy job đang chờ hoặc đang chạy"""
+    job = await job_service.cancel(job_id)
+    return to_job_response(job)
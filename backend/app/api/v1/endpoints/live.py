@@ -0,0 +1,56 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.services.change_service import ChangeService
+from app.services.tour_service import TourService
+from app.core.container import container
+from app.core.live import LiveSubscriber, live_hub
+
+router = APIRouter(tags=["live"])
+
+
+async def _send_events(websocket: WebSocket, subscriber: LiveSubscriber):
+    """Gửi các event đang chờ của subscriber, mỗi frame là một mảng JSON"""
+    try:
+        while True:
+            batch = await subscriber.next_batch(live_hub.batch_size)
+            await websocket.send_text(live_hub.frame(batch))
+    except (WebSocketDisconnect, RuntimeError):
+        # Kết nối đã đóng, vòng receive sẽ dọn subscriber
+        pass
+
+
+@router.websocket("/tours/{tour_id}/live")
+async def tour_live(websocket: WebSocket, tour_id: str):
+    """
+    Kênh live của tour: server đẩy delta sau mỗi thay đổi tour, scenes và
+    hotspots thay vì client tải lại `/tours/{id}/full`
+
+    Mỗi frame là mảng JSON các event
+    `{"seq", "tour_id", "op", "entity", "id", "version", "fields"}` với op là
+    create | update | delete, seq là seq trong change log của tour. Event đầu
+    tiên là `subscribed` (kèm seq hiện tại); event `resync` (client đọc không
+    kịp, sync/restore hàng loạt) yêu cầu client tải lại tour hoặc lấy phần
+    thiếu qua `/tours/{id}/changes?since=<seq>`.
+    """
+    if not ObjectId.is_valid(tour_id) or not await container.get(TourService).get_stamp(tour_id):
+        await websocket.close(code=1008, reason="Tour not found")
+        return
+
+    await websocket.accept()
+    seq = await container.get(ChangeService).current_seq(tour_id)
+    subscriber = live_hub.subscribe(tour_id, seq)
+    sender = asyncio.create_task(_send_events(websocket, subscriber))
+    try:
+        # Client không gửi gì, chỉ đọc để biết khi nào ngắt kết nối
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(subscriber)
+        sender.cancel()
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Header, Query
+from typing import Dict, Optional
+
+from app.services.migration_service import MigrationService
+from app.services.job_service import job_service, JobContext
+from app.api.v1.endpoints.job import job_accepted
+from app.api.deps import get_migration_service
+from app.core.container import container
+
+router = APIRouter(prefix="/migrations", tags=["migrations"])
+
+
+async def run_migration_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: chạy schema migrations"""
+    results = await container.get(MigrationService).run(
+        params.get("migration_id"), context.progress
+    )
+    return {"success": True, "migrations": results}
+
+
+job_service.register("run_migrations", run_migration_job)
+
+
+@router.get("")
+async def get_migrations(
+    migration_service: MigrationService = Depends(get_migration_service),
+):
+    """Trạng thái các migration, kích thước collection/index trước và sau khi chạy"""
+    return {"items": await migration_service.list_status()}
+
+
+@router.post("/run")
+async def run_migrations(
+    migration_id: Optional[str] = Query(None, description="Chỉ chạy migration này"),
+    background: bool = Query(False, description="Chạy nền, trả về 202 kèm job"),
+    idempotency_key: Optional[str] = Header(None),
+    migration_service: MigrationService = Depends(get_migration_service),
+):
+    """
+    Chạy các migration chưa hoàn tất theo thứ tự
+
+    Migration chạy theo batch và lưu checkpoint sau mỗi batch; bị dừng giữa
+    chừng thì lần chạy sau tiếp tục từ checkpoint.
+    """
+    if background:
+        job = await job_service.submit(
+            "run_migrations",
+            {"migration_id": migration_id},
+            summary={"migration_id": migration_id},
+            idempotency_key=idempotency_key,
+        )
+        return job_accepted(job)
+
+    results = await migration_service.run(migration_id)
+    return {"success": True, "migrations": results}
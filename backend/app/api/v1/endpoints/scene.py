@@ -1,25 +1,34 @@
-from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Request, Response
 from typing import Optional
 import json
 
 from app.services.scene_service import SceneService
+from app.api.deps import get_scene_service
 from app.schema.scene_schema import (
     SceneResponse,
     SceneWithHotspots,
     FindSceneResult,
 )
 from app.schema.base_schema import MessageResponse
+from app.core.streaming import ndjson_response
+from app.core.conditional import (
+    is_conditional,
+    is_not_modified,
+    list_validators,
+    not_modified_response,
+    set_validators,
+    stamp_validators,
+)
 
 router = APIRouter(prefix="/scenes", tags=["scenes"])
 
-scene_service = SceneService()
-
 
 @router.get("", response_model=FindSceneResult)
 async def get_scenes(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     tour_id: Optional[str] = None,
+    scene_service: SceneService = Depends(get_scene_service),
 ):
     """Lấy danh sách scenes"""
     filter_dict = {}
@@ -36,10 +45,37 @@ async def get_scenes(
     return result
 
 
+@router.get("/stream")
+async def stream_scenes(
+    tour_id: Optional[str] = None,
+    limit: int = Query(0, ge=0, description="0 = không giới hạn"),
+    scene_service: SceneService = Depends(get_scene_service),
+):
+    """Stream toàn bộ scenes dạng NDJSON (mỗi dòng một scene, không phân trang)"""
+    filter_dict = {}
+    if tour_id:
+        filter_dict["tour_id"] = tour_id
+
+    return ndjson_response(scene_service.stream(filter_dict, limit))
+
+
 @router.get("/by-tour/{tour_id}")
-async def get_scenes_by_tour(tour_id: str):
-    """Lấy tất cả scenes của một tour"""
+async def get_scenes_by_tour(
+    tour_id: str,
+    request: Request,
+    response: Response,
+    scene_service: SceneService = Depends(get_scene_service),
+):
+    """Lấy tất cả scenes của một tour (hỗ trợ If-None-Match)"""
+    scope = f"scenes-by-tour:{tour_id}"
+    if is_conditional(request):
+        stamps = await scene_service.get_scene_stamps_by_tour(tour_id)
+        etag, last_modified = list_validators(stamps, scope)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
     scenes = await scene_service.get_scenes_by_tour(tour_id)
+    set_validators(response, *list_validators(scenes, scope))
     # Convert _id -> id cho response
     items = [
         SceneResponse(id=s["_id"], **{k: v for k, v in s.items() if k != "_id"})
@@ -49,18 +85,35 @@ async def get_scenes_by_tour(tour_id: str):
 
 
 @router.get("/{scene_id}", response_model=SceneResponse)
-async def get_scene(scene_id: str):
-    """Lấy thông tin scene theo ID"""
+async def get_scene(
+    scene_id: str,
+    request: Request,
+    response: Response,
+    scene_service: SceneService = Depends(get_scene_service),
+):
+    """Lấy thông tin scene theo ID (hỗ trợ If-None-Match / If-Modified-Since)"""
+    if is_conditional(request):
+        stamp = await scene_service.get_stamp(scene_id)
+        if not stamp:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        etag, last_modified = stamp_validators([stamp], "scene")
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
     scene = await scene_service.get_by_id(scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
+    set_validators(response, *stamp_validators([scene], "scene"))
     return SceneResponse(
         id=scene["_id"], **{k: v for k, v in scene.items() if k != "_id"}
     )
 
 
 @router.get("/{scene_id}/full", response_model=SceneWithHotspots)
-async def get_scene_full(scene_id: str):
+async def get_scene_full(
+    scene_id: str,
+    scene_service: SceneService = Depends(get_scene_service),
+):
     """Lấy scene đầy đủ với hotspots"""
     scene = await scene_service.get_scene_with_hotspots(scene_id)
     return scene
@@ -76,6 +129,8 @@ async def create_scene(
     ),  # JSON string: {"yaw": 0, "pitch": 0, "fov": 100}
     image: Optional[UploadFile] = File(None),
     image_url: Optional[str] = Form(None),
+    upload_id: Optional[str] = Form(None),
+    scene_service: SceneService = Depends(get_scene_service),
 ):
     """
     Tạo scene mới
@@ -86,8 +141,9 @@ async def create_scene(
     - **initial_view**: JSON string góc nhìn ban đầu, ví dụ: {"yaw": 0, "pitch": 0, "fov": 100}
     - **image**: File ảnh 360° (optional)
     - **image_url**: URL ảnh 360° nếu đã có sẵn (optional)
+    - **upload_id**: ID resumable upload đã complete, thay cho image với file lớn (optional)
 
-    Lưu ý: Chỉ cần một trong hai: image (file) hoặc image_url
+    Lưu ý: Chỉ cần một trong ba: image (file), upload_id hoặc image_url
     """
     # Parse initial_view từ JSON string
     view_dict = {"yaw": 0, "pitch": 0, "fov": 100}
@@ -108,15 +164,26 @@ async def create_scene(
     }
 
     # Upload ảnh nếu có file
-    if image and image.filename:
+    upload_result = None
+    if upload_id:
+        upload_result = await scene_service.upload_from_session(upload_id, tour_id)
+    elif image and image.filename:
         if not image.content_type or not image.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
 
         upload_result = await scene_service.upload_image(image, tour_id)
+    if upload_result:
         scene_data["image_url"] = upload_result["url"]
         scene_data["image_public_id"] = upload_result["public_id"]
-
-    result = await scene_service.create(scene_data)
+        scene_data["preview"] = upload_result["preview"]
+        scene_data["image_transcode"] = upload_result["transcode"]
+
+    try:
+        result = await scene_service.create(scene_data)
+    except Exception:
+        if upload_result:
+            scene_service.discard_images(scene_data)
+        raise
     return SceneResponse(
         id=result["_id"], **{k: v for k, v in result.items() if k != "_id"}
     )
@@ -130,6 +197,9 @@ async def update_scene(
     initial_view: Optional[str] = Form(None),  # JSON string
     image: Optional[UploadFile] = File(None),
     image_url: Optional[str] = Form(None),
+    upload_id: Optional[str] = Form(None),
+    version: Optional[int] = Form(None),
+    scene_service: SceneService = Depends(get_scene_service),
 ):
     """
     Cập nhật scene
@@ -139,6 +209,8 @@ async def update_scene(
     - **initial_view**: JSON string góc nhìn mới (optional)
     - **image**: File ảnh 360° mới (optional)
     - **image_url**: URL ảnh 360° mới (optional)
+    - **upload_id**: ID resumable upload đã complete chứa ảnh mới (optional)
+    - **version**: Version đang giữ, trả về 409 nếu scene đã bị sửa (optional)
     """
     scene_data = {}
 
@@ -146,8 +218,6 @@ async def update_scene(
         scene_data["name"] = name
     if description is not None:
         scene_data["description"] = description
-    if image_url is not None:
-        scene_data["image_url"] = image_url
 
     if initial_view:
         try:
@@ -157,41 +227,63 @@ async def update_scene(
                 status_code=400, detail="initial_view must be valid JSON"
             )
 
-    # Upload ảnh mới nếu có
-    if image and image.filename:
-        if not image.content_type or not image.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
+    has_file = bool(image and image.filename)
+    if has_file and not upload_id and (
+        not image.content_type or not image.content_type.startswith("image/")
+    ):
+        raise HTTPException(status_code=400, detail="File must be an image")
 
-        # Lấy scene hiện tại để có tour_id và xóa ảnh cũ
+    # Scene hiện tại: tour_id cho ảnh mới và ảnh cũ cần xóa
+    current_scene = None
+    if upload_id or has_file or image_url is not None:
         current_scene = await scene_service.get_by_id(scene_id)
         if not current_scene:
             raise HTTPException(status_code=404, detail="Scene not found")
 
-        # Xóa ảnh cũ trên Cloudinary
-        old_public_id = current_scene.get("image_public_id")
-        if old_public_id:
-            await scene_service.delete_image(old_public_id)
-
-        # Upload ảnh mới
-        upload_result = await scene_service.upload_image(
-            image, current_scene.get("tour_id", "default")
-        )
+    # Upload ảnh mới nếu có
+    upload_result = None
+    if upload_id or has_file:
+        tour_id = current_scene.get("tour_id", "default")
+        if upload_id:
+            upload_result = await scene_service.upload_from_session(upload_id, tour_id)
+        else:
+            upload_result = await scene_service.upload_image(image, tour_id)
         scene_data["image_url"] = upload_result["url"]
         scene_data["image_public_id"] = upload_result["public_id"]
+        scene_data["preview"] = upload_result["preview"]
+        scene_data["image_transcode"] = upload_result["transcode"]
+    elif image_url is not None:
+        scene_data["image_url"] = image_url
+        if image_url != current_scene.get("image_url"):
+            # Ảnh ngoài: public_id, preview và báo cáo transcode của ảnh cũ không còn đúng
+            scene_data["image_public_id"] = None
+            scene_data["preview"] = {}
+            scene_data["image_transcode"] = None
 
     if not scene_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    result = await scene_service.update(scene_id, scene_data)
-    if not result:
-        raise HTTPException(status_code=404, detail="Scene not found")
+    try:
+        result = await scene_service.update(scene_id, scene_data, version)
+    except Exception:
+        # Scene không đổi (404/409): ảnh vừa upload không được dùng
+        if upload_result:
+            scene_service.discard_images(scene_data)
+        raise
+    # Ảnh cũ chỉ bị xóa (nền) sau khi scene đã trỏ sang ảnh mới
+    if current_scene and scene_data.get("image_url") != current_scene.get("image_url"):
+        scene_service.discard_images(current_scene)
     return SceneResponse(
         id=result["_id"], **{k: v for k, v in result.items() if k != "_id"}
     )
 
 
 @router.delete("/{scene_id}", response_model=MessageResponse)
-async def delete_scene(scene_id: str):
+async def delete_scene(
+    scene_id: str,
+    version: Optional[int] = Query(None, description="Chỉ xóa nếu version còn khớp"),
+    scene_service: SceneService = Depends(get_scene_service),
+):
     """Xóa scene và tất cả hotspots liên quan"""
-    await scene_service.delete_scene_cascade(scene_id)
+    await scene_service.delete_scene_cascade(scene_id, version)
     return MessageResponse(message="Scene deleted successfully")
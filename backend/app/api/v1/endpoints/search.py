@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
+
+from app.services.search_service import SearchService
+from app.api.deps import get_search_service
+from app.schema.search_schema import SearchResult
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResult)
+async def search(
+    q: str = Query(..., min_length=1, description="Chuỗi tìm kiếm, có hoặc không dấu"),
+    kind: Optional[List[Literal["tour", "scene", "hotspot"]]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    mode: Literal["prefix", "text"] = "prefix",
+    search_service: SearchService = Depends(get_search_service),
+):
+    """
+    Tìm kiếm tours, scenes và hotspots
+
+    - **q**: "ho boi" khớp "Hồ Bơi"
+    - **kind**: Lọc theo loại (lặp lại tham số để chọn nhiều loại)
+    - **mode**: `prefix` cho typeahead (mỗi từ là prefix), `text` cho full-text theo từ
+    """
+    items = await search_service.search(q, kinds=kind, limit=limit, mode=mode)
+    return {"items": items, "total": len(items)}
+
+
+@router.post("/reindex")
+async def reindex(search_service: SearchService = Depends(get_search_service)):
+    """Index lại toàn bộ tours, scenes, hotspots"""
+    counts = await search_service.rebuild()
+    return {"success": True, "indexed": counts}
@@ -1,20 +1,84 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
 
 from app.services.tour_service import TourService
+from app.services.job_service import job_service, JobContext
+from app.services.bundle_service import BundleService
+from app.services.change_service import ChangeService
+from app.api.deps import get_bundle_service, get_change_service, get_tour_service
+from app.api.v1.endpoints.job import job_accepted
+from app.core.container import container
+from app.core.exceptions import GoneError, NotFoundError
 from app.schema.tour_schema import (
     TourCreate,
     TourUpdate,
     TourResponse,
-    TourWithScenes,
     TourExport,
+    TourChanges,
     FindTourResult,
 )
 from app.schema.base_schema import MessageResponse
+from app.core.compression import payload_response
+from app.core.streaming import ndjson_response
+from app.core.conditional import (
+    is_conditional,
+    is_not_modified,
+    not_modified_response,
+    set_validators,
+    stamp_validators,
+)
 
 router = APIRouter(prefix="/tours", tags=["tours"])
 
-tour_service = TourService()
+
+async def run_export_job(params: Dict, context: JobContext) -> Dict:
+    """
+    Job handler: export tour JSON
+
+    Document job chỉ lưu tham chiếu (payload có thể vượt 16MB) kèm sha256 của
+    payload lúc export, /jobs/{id}/result chỉ trả về payload nếu tour chưa đổi.
+    """
+    await context.progress(0, 1, "exporting")
+    payload = await container.get(TourService).get_export_payload(params["tour_id"])
+    await context.progress(1, 1, "exported")
+    return {
+        "tour_id": params["tour_id"],
+        "bytes": len(payload.body),
+        "sha256": await run_in_threadpool(_sha256, payload.body),
+    }
+
+
+async def load_export_result(result: Dict, request: Request) -> Response:
+    """Payload export trong kết quả job (410 nếu tour đã đổi hoặc bị xóa sau khi export)"""
+    try:
+        payload = await container.get(TourService).get_export_payload(result["tour_id"])
+    except NotFoundError:
+        raise GoneError("Export result is no longer available: the tour was deleted")
+    if await run_in_threadpool(_sha256, payload.body) != result["sha256"]:
+        raise GoneError(
+            "Export result is no longer available: the tour changed after the export"
+        )
+    return await payload_response(payload, request)
+
+
+def _sha256(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+async def run_delete_job(params: Dict, context: JobContext) -> Dict:
+    """Job handler: xóa tour cascade"""
+    await container.get(TourService).delete_tour_cascade(
+        params["tour_id"], context.progress, params.get("version")
+    )
+    return {"success": True, "message": "Tour deleted successfully"}
+
+
+job_service.register("export_tour", run_export_job, load_export_result)
+job_service.register("delete_tour", run_delete_job)
 
 
 @router.get("", response_model=FindTourResult)
@@ -22,13 +86,14 @@ async def get_tours(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     name: Optional[str] = None,
+    tour_service: TourService = Depends(get_tour_service),
 ):
     """Lấy danh sách tours"""
-    filter_dict = {}
     if name:
-        filter_dict["name"] = {"$regex": name, "$options": "i"}
-
-    result = await tour_service.get_list(filter_dict, page, page_size)
+        # Tìm qua search index: không phân biệt dấu, phân trang trên index
+        result = await tour_service.find_by_name(name, page, page_size)
+    else:
+        result = await tour_service.get_list({}, page, page_size)
 
     # Convert _id -> id cho response
     result["items"] = [
@@ -38,30 +103,135 @@ async def get_tours(
     return result
 
 
+@router.get("/stream")
+async def stream_tours(
+    name: Optional[str] = None,
+    limit: int = Query(0, ge=0, description="0 = không giới hạn"),
+    tour_service: TourService = Depends(get_tour_service),
+):
+    """Stream toàn bộ tours dạng NDJSON (mỗi dòng một tour, không phân trang)"""
+    filter_dict = await tour_service.name_filter(name) if name else {}
+    return ndjson_response(tour_service.stream(filter_dict, limit))
+
+
 @router.get("/{tour_id}", response_model=TourResponse)
-async def get_tour(tour_id: str):
-    """Lấy thông tin tour theo ID"""
+async def get_tour(
+    tour_id: str,
+    request: Request,
+    response: Response,
+    tour_service: TourService = Depends(get_tour_service),
+):
+    """Lấy thông tin tour theo ID (hỗ trợ If-None-Match / If-Modified-Since)"""
+    if is_conditional(request):
+        stamp = await tour_service.get_stamp(tour_id)
+        if not stamp:
+            raise HTTPException(status_code=404, detail="Tour not found")
+        etag, last_modified = stamp_validators([stamp], "tour")
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
     tour = await tour_service.get_by_id(tour_id)
     if not tour:
         raise HTTPException(status_code=404, detail="Tour not found")
+    set_validators(response, *stamp_validators([tour], "tour"))
     return TourResponse(id=tour["_id"], **{k: v for k, v in tour.items() if k != "_id"})
 
 
-@router.get("/{tour_id}/full", response_model=TourWithScenes)
-async def get_tour_full(tour_id: str):
-    """Lấy tour đầy đủ với scenes và hotspots"""
-    tour = await tour_service.get_tour_with_scenes(tour_id)
-    return tour
+@router.get("/{tour_id}/full")
+async def get_tour_full(
+    tour_id: str,
+    request: Request,
+    tour_service: TourService = Depends(get_tour_service),
+    change_service: ChangeService = Depends(get_change_service),
+):
+    """
+    Lấy tour đầy đủ với scenes và hotspots (nén gzip/brotli theo Accept-Encoding)
+
+    Header X-Change-Seq là seq của change log dùng cho `/changes?since=`.
+    """
+    seq = await change_service.current_seq(tour_id)
+    payload = await tour_service.get_full_payload(tour_id)
+    tour_service.record_view(tour_id)
+    response = await payload_response(payload, request)
+    response.headers["X-Change-Seq"] = str(seq)
+    return response
 
 
 @router.get("/{tour_id}/export")
-async def export_tour(tour_id: str):
-    """Export tour sang JSON format cho frontend"""
-    return await tour_service.export_tour_json(tour_id)
+async def export_tour(
+    tour_id: str,
+    request: Request,
+    background: bool = Query(False, description="Chạy nền, trả về 202 kèm job"),
+    idempotency_key: Optional[str] = Header(None),
+    tour_service: TourService = Depends(get_tour_service),
+    change_service: ChangeService = Depends(get_change_service),
+):
+    """
+    Export tour sang JSON format cho frontend (nén gzip/brotli theo Accept-Encoding)
+
+    Header X-Change-Seq là seq của change log dùng cho `/changes?since=`.
+    """
+    if background:
+        job = await job_service.submit(
+            "export_tour",
+            {"tour_id": tour_id},
+            summary={"tour_id": tour_id},
+            idempotency_key=idempotency_key,
+        )
+        return job_accepted(job)
+
+    # Đọc seq trước payload: thay đổi sau seq này sẽ có trong /changes
+    seq = await change_service.current_seq(tour_id)
+    payload = await tour_service.get_export_payload(tour_id)
+    tour_service.record_view(tour_id)
+    response = await payload_response(payload, request)
+    response.headers["X-Change-Seq"] = str(seq)
+    return response
+
+
+@router.get("/{tour_id}/changes", response_model=TourChanges, response_model_exclude_unset=True)
+async def get_tour_changes(
+    tour_id: str,
+    since: int = Query(..., ge=0, description="Seq của bản client đang có (X-Change-Seq hoặc seq lần trước)"),
+    tour_service: TourService = Depends(get_tour_service),
+    change_service: ChangeService = Depends(get_change_service),
+):
+    """
+    Delta sync: scenes/hotspots đã đổi sau seq since, gộp theo document
+    (create có cả document, update chỉ có các field đã đổi, delete chỉ có id;
+    xóa scene là xóa cả hotspots của nó)
+
+    `resync=true` khi log đã bị xóa hoặc có quá nhiều/thay đổi hàng loạt:
+    client tải lại `/export` rồi tiếp tục với seq trả về.
+    """
+    changes = await change_service.changes(tour_id, since)
+    if changes["seq"] == 0 and not await tour_service.get_stamp(tour_id):
+        raise HTTPException(status_code=404, detail="Tour not found")
+    return changes
+
+
+@router.get("/{tour_id}/bundle")
+async def export_tour_bundle(
+    tour_id: str,
+    bundle_service: BundleService = Depends(get_bundle_service),
+):
+    """
+    Export tour offline dạng ZIP (stream): tour.json, ảnh panorama của các
+    scenes trong `images/` và manifest.json với sha256 của từng file
+    """
+    export = await bundle_service.prepare_export(tour_id)
+    return StreamingResponse(
+        bundle_service.stream_bundle(tour_id, export),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="tour-{tour_id}.zip"'},
+    )
 
 
 @router.post("", response_model=TourResponse)
-async def create_tour(tour: TourCreate):
+async def create_tour(
+    tour: TourCreate,
+    tour_service: TourService = Depends(get_tour_service),
+):
     """Tạo tour mới"""
     tour_data = tour.model_dump()
     result = await tour_service.create(tour_data)
@@ -71,19 +241,37 @@ async def create_tour(tour: TourCreate):
 
 
 @router.patch("/{tour_id}", response_model=TourResponse)
-async def update_tour(tour_id: str, tour: TourUpdate):
-    """Cập nhật tour"""
+async def update_tour(
+    tour_id: str,
+    tour: TourUpdate,
+    tour_service: TourService = Depends(get_tour_service),
+):
+    """Cập nhật tour (gửi `version` để nhận 409 nếu tour đã bị sửa bởi người khác)"""
     tour_data = tour.model_dump(exclude_none=True)
-    result = await tour_service.update(tour_id, tour_data)
-    if not result:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    expected_version = tour_data.pop("version", None)
+    result = await tour_service.update(tour_id, tour_data, expected_version)
     return TourResponse(
         id=result["_id"], **{k: v for k, v in result.items() if k != "_id"}
     )
 
 
 @router.delete("/{tour_id}", response_model=MessageResponse)
-async def delete_tour(tour_id: str):
+async def delete_tour(
+    tour_id: str,
+    version: Optional[int] = Query(None, description="Chỉ xóa nếu version còn khớp"),
+    background: bool = Query(False, description="Chạy nền, trả về 202 kèm job"),
+    idempotency_key: Optional[str] = Header(None),
+    tour_service: TourService = Depends(get_tour_service),
+):
     """Xóa tour và tất cả scenes, hotspots liên quan"""
-    await tour_service.delete_tour_cascade(tour_id)
+    if background:
+        job = await job_service.submit(
+            "delete_tour",
+            {"tour_id": tour_id, "version": version},
+            summary={"tour_id": tour_id},
+            idempotency_key=idempotency_key,
+        )
+        return job_accepted(job)
+
+    await tour_service.delete_tour_cascade(tour_id, expected_version=version)
     return MessageResponse(message="Tour deleted successfully")
@@ -0,0 +1,73 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Path, Request
+
+from app.services.upload_service import UploadService
+from app.schema.upload_schema import UploadCreate, UploadResponse
+from app.schema.base_schema import MessageResponse
+from app.api.deps import get_upload_service
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+@router.post("", response_model=UploadResponse, status_code=201)
+async def create_upload(
+    data: UploadCreate,
+    upload_service: UploadService = Depends(get_upload_service),
+):
+    """
+    Bắt đầu resumable upload cho ảnh panorama lớn
+
+    Client chia file theo `chunk_size` trả về, PUT từng chunk (theo thứ tự bất
+    kỳ, có thể song song), gọi complete rồi truyền `upload_id` khi tạo hoặc
+    cập nhật scene.
+    """
+    session = await upload_service.create(data.model_dump())
+    return upload_service.describe(session)
+
+
+@router.get("/{upload_id}", response_model=UploadResponse)
+async def get_upload(
+    upload_id: str,
+    upload_service: UploadService = Depends(get_upload_service),
+):
+    """Trạng thái upload, `missing` là các chunk cần gửi (tiếp tục sau khi mất kết nối)"""
+    return upload_service.describe(await upload_service.get(upload_id))
+
+
+@router.put("/{upload_id}/chunks/{index}", response_model=UploadResponse)
+async def put_chunk(
+    request: Request,
+    upload_id: str,
+    index: int = Path(..., ge=0),
+    x_chunk_sha256: Optional[str] = Header(None, description="SHA-256 (hex) của chunk"),
+    upload_service: UploadService = Depends(get_upload_service),
+):
+    """
+    Gửi chunk thứ `index` (body là dữ liệu thô, đúng `chunk_size` byte trừ
+    chunk cuối). Gửi lại một chunk sẽ ghi đè chunk cũ.
+    """
+    session = await upload_service.write_chunk(
+        upload_id, index, request.stream(), x_chunk_sha256
+    )
+    return upload_service.describe(session)
+
+
+@router.post("/{upload_id}/complete", response_model=UploadResponse)
+async def complete_upload(
+    upload_id: str,
+    upload_service: UploadService = Depends(get_upload_service),
+):
+    """Kiểm tra đủ chunk và SHA-256 của cả file; file sẵn sàng để gắn vào scene"""
+    return upload_service.describe(await upload_service.complete(upload_id))
+
+
+@router.delete("/{upload_id}", response_model=MessageResponse)
+async def delete_upload(
+    upload_id: str,
+    upload_service: UploadService = Depends(get_upload_service),
+):
+    """Hủy upload và xóa dữ liệu đã nhận"""
+    await upload_service.get(upload_id)
+    await upload_service.discard(upload_id)
+    return MessageResponse(message="Upload deleted successfully")
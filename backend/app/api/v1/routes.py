@@ -4,10 +4,35 @@ from app.api.v1.endpoints.tour import router as tour_router
 from app.api.v1.endpoints.scene import router as scene_router
 from app.api.v1.endpoints.hotspot import router as hotspot_router
 from app.api.v1.endpoints.import_export import router as import_router
+from app.api.v1.endpoints.search import router as search_router
+from app.api.v1.endpoints.job import router as job_router
+from app.api.v1.endpoints.backup import router as backup_router
+from app.api.v1.endpoints.migration import router as migration_router
+from app.api.v1.endpoints.upload import router as upload_router
+from app.api.v1.endpoints.files import router as files_router
+from app.api.v1.endpoints.image import router as image_router
+from app.api.v1.endpoints.live import router as live_router
+from app.api.v1.endpoints.analytics import router as analytics_router
+from app.api.v1.endpoints.batch import router as batch_router
 
 routers = APIRouter()
 
-router_list = [tour_router, scene_router, hotspot_router, import_router]
+router_list = [
+    tour_router,
+    scene_router,
+    hotspot_router,
+    import_router,
+    search_router,
+    job_router,
+    backup_router,
+    migration_router,
+    upload_router,
+    files_router,
+    image_router,
+    live_router,
+    analytics_router,
+    batch_router,
+]
 
 for router in router_list:
     routers.include_router(router)
@@ -0,0 +1,197 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import configs
+from app.core.exceptions import ServiceUnavailableError
+
+
+# (route class, methods, path) - path tính sau API_V1_STR, rule đầu tiên khớp được dùng
+ROUTE_CLASSES: List[Tuple[str, Tuple[str, ...], Pattern]] = [
+    ("upload", ("POST",), re.compile(r"^/scenes$")),
+    ("upload", ("PATCH",), re.compile(r"^/scenes/[^/]+$")),
+    ("upload", ("POST",), re.compile(r"^/import/")),
+    ("upload", ("POST",), re.compile(r"^/backup/restore$")),
+    ("upload", ("PUT",), re.compile(r"^/uploads/[^/]+/chunks/\d+$")),
+    ("upload", ("POST",), re.compile(r"^/uploads/[^/]+/complete$")),
+    # Analytics chỉ ghi vào buffer trong bộ nhớ: class không có gate (không giới hạn)
+    ("analytics", ("POST",), re.compile(r"^/analytics/events$")),
+    ("heavy_read", ("GET",), re.compile(r"^/tours/[^/]+/(full|export|bundle)$")),
+    ("heavy_read", ("GET",), re.compile(r"^/scenes/[^/]+/full$")),
+    ("heavy_read", ("GET",), re.compile(r"^/(tours|scenes|hotspots)/stream$")),
+    ("heavy_read", ("GET",), re.compile(r"^/backup$")),
+    ("write", ("POST", "PUT", "PATCH", "DELETE"), re.compile(r"^/")),
+]
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Route class của request, None nếu là route rẻ (không giới hạn)"""
+    if not path.startswith(configs.API_V1_STR):
+        return None
+    path = path[len(configs.API_V1_STR):]
+    for name, methods, pattern in ROUTE_CLASSES:
+        if method in methods and pattern.match(path):
+            return name
+    return None
+
+
+class AdmissionGate:
+    """
+    Giới hạn số request đồng thời của một route class
+
+    Request vượt `limit` chờ trong hàng đợi FIFO tối đa `queue_size` phần tử và
+    `timeout` giây; hàng đợi đầy hoặc chờ quá lâu thì request bị từ chối (shed).
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def acquire(self) -> bool:
+        """Chờ lấy slot, trả về False nếu request bị shed"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot vừa được chuyển cho request này nhưng không dùng đến
+                self.release()
+            else:
+                self._remove(waiter)
+            self._record_wait(time.perf_counter() - start)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed_timeout += 1
+            return False
+
+        self._record_wait(time.perf_counter() - start)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        """Trả slot, chuyển thẳng cho request đầu hàng đợi nếu có"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _record_wait(self, seconds: float):
+        self.queued += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed_queue_full + self.shed_timeout,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queued": self.queued,
+            "queue_wait_avg_ms": (
+                round(self.wait_total / self.queued * 1000, 2) if self.queued else 0.0
+            ),
+            "queue_wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+def create_gates() -> Dict[str, AdmissionGate]:
+    """Gates theo cấu hình"""
+    timeout = configs.ADMISSION_QUEUE_TIMEOUT
+    return {
+        "heavy_read": AdmissionGate(
+            "heavy_read", configs.ADMISSION_HEAVY_READ_LIMIT,
+            configs.ADMISSION_HEAVY_READ_QUEUE, timeout,
+        ),
+        "write": AdmissionGate(
+            "write", configs.ADMISSION_WRITE_LIMIT, configs.ADMISSION_WRITE_QUEUE, timeout
+        ),
+        "upload": AdmissionGate(
+            "upload", configs.ADMISSION_UPLOAD_LIMIT, configs.ADMISSION_UPLOAD_QUEUE, timeout
+        ),
+    }
+
+
+# Singleton (dùng chung giữa middleware và endpoint metrics)
+admission_gates = create_gates()
+
+
+def admission_stats() -> Dict[str, Dict]:
+    """Metrics của các route class"""
+    return {name: gate.stats() for name, gate in admission_gates.items()}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware giới hạn đồng thời theo route class (heavy_read, write,
+    upload); request bị shed nhận ngay 503 kèm Retry-After
+
+    Slot được giữ cho đến khi response (kể cả streaming) gửi xong.
+    """
+
+    def __init__(self, app, gates: Optional[Dict[str, AdmissionGate]] = None):
+        self.app = app
+        self.gates = admission_gates if gates is None else gates
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gates.get(classify(scope["method"], scope["path"]))
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire():
+            error = ServiceUnavailableError(
+                f"Server busy ({gate.name}), retry later",
+                retry_after=configs.ADMISSION_RETRY_AFTER,
+            )
+            response = JSONResponse(
+                {"detail": error.detail},
+                status_code=error.status_code,
+                headers=error.headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
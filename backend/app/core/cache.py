@@ -0,0 +1,130 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import configs
+
+
+class CachedPayload:
+    """
+    Payload JSON đã serialize, kèm các bản nén theo từng encoding
+
+    Args:
+        body: JSON bytes
+        dependencies: ID các tour/scene/hotspot tạo nên payload,
+            dùng để invalidate khi một trong số đó thay đổi
+    """
+
+    def __init__(self, body: bytes, dependencies: Optional[Iterable[str]] = None):
+        self.body = body
+        self.dependencies: Set[str] = set(dependencies or [])
+        self.encoded: Dict[str, bytes] = {}
+        self.created_at = time.monotonic()
+
+    @classmethod
+    def from_data(cls, data: Any, dependencies: Optional[Iterable[str]] = None):
+        """Serialize dữ liệu giống JSONResponse của FastAPI"""
+        body = json.dumps(
+            jsonable_encoder(data),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return cls(body, dependencies)
+
+
+class PayloadCache:
+    """
+    Cache LRU có TTL cho các payload tour lớn (full, export)
+
+    Args:
+        ttl: Thời gian sống của một entry (giây)
+        max_entries: Số entry tối đa, entry cũ nhất bị loại trước
+    """
+
+    # Số ID đã invalidate được nhớ tối đa (vượt quá thì mọi lần load đang chạy bị coi là cũ)
+    MAX_INVALIDATED = 16384
+
+    def __init__(self, ttl: float = 60, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedPayload]" = OrderedDict()
+        # Tăng mỗi lần invalidate; loader ghi nhận trước khi query để không
+        # cache lại dữ liệu đọc trước một lần ghi
+        self.generation = 0
+        self._invalidated: Dict[str, int] = {}
+        self._floor = 0
+
+    def get(self, key: Hashable) -> Optional[CachedPayload]:
+        """Lấy payload còn hạn theo key"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def is_stale(self, generation: int, dependencies: Iterable[str]) -> bool:
+        """Một dependency đã bị invalidate sau thời điểm `generation`"""
+        if generation < self._floor:
+            return True
+        return any(self._invalidated.get(id, 0) > generation for id in dependencies)
+
+    def set(
+        self, key: Hashable, payload: CachedPayload, generation: Optional[int] = None
+    ) -> CachedPayload:
+        """
+        Lưu payload, loại entry cũ nhất nếu vượt giới hạn
+
+        Args:
+            generation: `self.generation` lúc bắt đầu load; payload không được
+                lưu nếu dependency của nó bị invalidate trong lúc load
+        """
+        if generation is not None and self.is_stale(generation, payload.dependencies):
+            return payload
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return payload
+
+    def invalidate(self, *ids: str) -> int:
+        """Xóa các entry phụ thuộc vào bất kỳ ID nào trong danh sách"""
+        targets = {str(id) for id in ids if id}
+        if not targets:
+            return 0
+        self.generation += 1
+        if len(self._invalidated) + len(targets) > self.MAX_INVALIDATED:
+            self._invalidated.clear()
+            self._floor = self.generation
+        for id in targets:
+            self._invalidated[id] = self.generation
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry.dependencies & targets
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        self._entries.clear()
+        self.generation += 1
+        self._invalidated.clear()
+        self._floor = self.generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+tour_payload_cache = PayloadCache(
+    ttl=configs.TOUR_CACHE_TTL, max_entries=configs.TOUR_CACHE_MAX_ENTRIES
+)
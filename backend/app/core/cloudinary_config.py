@@ -1,10 +1,13 @@
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import configs
+from app.core.storage import StorageBackend
 
 
 def configure_cloudinary():
@@ -17,9 +20,19 @@ def configure_cloudinary():
     )
 
 
-class CloudinaryService:
+class CloudinaryService(StorageBackend):
+    """Storage backend Cloudinary (STORAGE_BACKEND=cloudinary)"""
+
+    name = "cloudinary"
+
     def __init__(self):
-        configure_cloudinary()
+        # Cấu hình khi gọi Cloudinary lần đầu, không phải lúc import
+        self._configured = False
+
+    def _ensure_configured(self):
+        if not self._configured:
+            configure_cloudinary()
+            self._configured = True
 
     async def upload_image(
         self,
@@ -38,6 +51,7 @@ class CloudinaryService:
         Returns:
             Dict chứa thông tin ảnh đã upload
         """
+        self._ensure_configured()
         try:
             contents = await file.read()
 
@@ -62,6 +76,73 @@ class CloudinaryService:
         except Exception as e:
             raise Exception(f"Failed to upload image: {str(e)}")
 
+    async def upload_bytes(
+        self,
+        data: bytes,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload ảnh từ bytes (chạy trong threadpool, không chặn event loop)
+
+        Returns:
+            Dict chứa thông tin ảnh đã upload
+        """
+        self._ensure_configured()
+        upload_options = {"folder": folder, "resource_type": "image"}
+        if public_id:
+            upload_options["public_id"] = public_id
+
+        try:
+            result = await run_in_threadpool(
+                cloudinary.uploader.upload, data, **upload_options
+            )
+        except Exception as e:
+            raise Exception(f"Failed to upload image: {str(e)}")
+
+        return {
+            "public_id": result["public_id"],
+            "url": result["secure_url"],
+            "width": result["width"],
+            "height": result["height"],
+            "format": result["format"],
+            "bytes": result["bytes"],
+        }
+
+    async def upload_file(
+        self,
+        path: str,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload file ảnh trên đĩa theo từng phần (upload_large), không đọc cả
+        file vào bộ nhớ
+
+        Returns:
+            Dict chứa thông tin ảnh đã upload
+        """
+        self._ensure_configured()
+        upload_options = {"folder": folder, "resource_type": "image"}
+        if public_id:
+            upload_options["public_id"] = public_id
+
+        try:
+            result = await run_in_threadpool(
+                cloudinary.uploader.upload_large, path, **upload_options
+            )
+        except Exception as e:
+            raise Exception(f"Failed to upload image: {str(e)}")
+
+        return {
+            "public_id": result["public_id"],
+            "url": result["secure_url"],
+            "width": result["width"],
+            "height": result["height"],
+            "format": result["format"],
+            "bytes": result["bytes"],
+        }
+
     def delete_image(self, public_id: str) -> bool:
         """
         Xóa ảnh trên Cloudinary
@@ -72,12 +153,47 @@ class CloudinaryService:
         Returns:
             True nếu xóa thành công
         """
+        self._ensure_configured()
         try:
             result = cloudinary.uploader.destroy(public_id)
             return result.get("result") == "ok"
         except Exception as e:
             raise Exception(f"Failed to delete image: {str(e)}")
 
+    async def delete_images(self, public_ids: List[str]) -> List[str]:
+        """
+        Xóa nhiều ảnh bằng một lần gọi Admin API (tối đa 100 public_id)
+
+        Returns:
+            Các public_id đã xóa
+        """
+        self._ensure_configured()
+        try:
+            result = await run_in_threadpool(cloudinary.api.delete_resources, public_ids)
+        except Exception as e:
+            raise Exception(f"Failed to delete images: {str(e)}")
+        return [id for id, status in result.get("deleted", {}).items() if status == "deleted"]
+
+    async def list_images(self, prefix: str) -> AsyncIterator[Dict[str, Any]]:
+        """Duyệt ảnh theo prefix bằng Admin API (500 ảnh mỗi trang)"""
+        self._ensure_configured()
+        cursor = None
+        while True:
+            options = {"type": "upload", "prefix": prefix, "max_results": 500}
+            if cursor:
+                options["next_cursor"] = cursor
+            page = await run_in_threadpool(cloudinary.api.resources, **options)
+            for resource in page.get("resources", []):
+                yield {
+                    "public_id": resource["public_id"],
+                    "url": resource.get("secure_url"),
+                    "created_at": datetime.strptime(resource["created_at"], "%Y-%m-%dT%H:%M:%SZ"),
+                    "bytes": resource.get("bytes", 0),
+                }
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
     def get_image_url(self, public_id: str, **options) -> str:
         """
         Lấy URL của ảnh với các transform options
@@ -89,6 +205,7 @@ class CloudinaryService:
         Returns:
             URL của ảnh
         """
+        self._ensure_configured()
         return cloudinary.CloudinaryImage(public_id).build_url(**options)
 
 
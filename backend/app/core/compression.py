@@ -0,0 +1,197 @@
+import gzip
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.cache import CachedPayload
+from app.core.conditional import weaken_etag
+from app.core.config import configs
+
+try:
+    import brotli
+except ImportError:  # brotli là optional, chỉ dùng gzip nếu chưa cài
+    brotli = None
+
+
+# Thứ tự ưu tiên khi client chấp nhận nhiều encoding
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Mức nén cho response động (nén mỗi request) và payload cache (nén một lần)
+DYNAMIC_LEVELS = {"gzip": 6, "br": 4}
+CACHED_LEVELS = {"gzip": 9, "br": 9}
+
+# Response động lớn hơn ngưỡng này được nén trong threadpool, tránh chặn event loop
+THREADPOOL_MIN_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Chọn content-encoding tốt nhất từ header Accept-Encoding
+
+    Returns:
+        "br", "gzip" hoặc None nếu không nén
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[token] = q
+
+    best: Tuple[Optional[str], float] = (None, 0.0)
+    for encoding in SUPPORTED_ENCODINGS:
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best[1]:
+            best = (encoding, q)
+    return best[0]
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Nén body theo encoding"""
+    if encoding == "br":
+        quality = DYNAMIC_LEVELS["br"] if level is None else level
+        return brotli.compress(body, quality=quality)
+    if encoding == "gzip":
+        compresslevel = DYNAMIC_LEVELS["gzip"] if level is None else level
+        return gzip.compress(body, compresslevel=compresslevel, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Kiểm tra content-type có đáng nén không"""
+    if not content_type:
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+async def payload_response(
+    payload: CachedPayload, request: Request, media_type: str = "application/json"
+) -> Response:
+    """
+    Trả về payload cache với encoding đã thương lượng
+
+    Bản nén được tạo một lần (ngoài event loop) và giữ lại trên entry cache,
+    các request sau dùng lại bytes đã nén.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if len(payload.body) >= configs.COMPRESSION_MIN_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    if encoding is None:
+        return Response(payload.body, media_type=media_type, headers=headers)
+
+    headers["Content-Encoding"] = encoding
+    body = await _encoded_body(payload, encoding)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def _encoded_body(payload: CachedPayload, encoding: str) -> bytes:
+    """Bản nén của payload, tạo (ngoài event loop) ở lần đầu cần đến"""
+    body = payload.encoded.get(encoding)
+    if body is None:
+        body = await run_in_threadpool(
+            compress, payload.body, encoding, CACHED_LEVELS[encoding]
+        )
+        payload.encoded[encoding] = body
+    return body
+
+
+async def precompress(payload: CachedPayload):
+    """Tạo trước các bản nén của payload (dùng khi warm-up cache)"""
+    if len(payload.body) >= configs.COMPRESSION_MIN_SIZE:
+        for encoding in SUPPORTED_ENCODINGS:
+            await _encoded_body(payload, encoding)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware nén response gzip/brotli theo Accept-Encoding
+
+    Chỉ nén response một message (không streaming), lớn hơn minimum_size,
+    có content-type dạng text/JSON và chưa được nén sẵn.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, started
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if started:
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # vd: http.response.pathsend của FileResponse: gửi start chưa nén
+                if start_message is not None:
+                    started = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            started = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not is_compressible(headers.get("content-type"))
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= THREADPOOL_MIN_SIZE:
+                compressed = await run_in_threadpool(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if "etag" in headers:
+                headers["ETag"] = weaken_etag(headers["etag"])
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,107 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+
+def stamp_validators(
+    stamps: Iterable[Dict], scope: str = ""
+) -> Tuple[str, Optional[datetime]]:
+    """
+    Tính ETag và Last-Modified từ change stamps (_id, version, updated_at)
+
+    Dùng được cho cả stamps lấy bằng projection và document đầy đủ, nên
+    ETag của 304 và của response 200 luôn giống nhau.
+
+    Args:
+        stamps: Các document có `_id`, `version`, `updated_at`
+        scope: Tiền tố phân biệt các route dùng chung document
+
+    Returns:
+        (etag, last_modified)
+    """
+    digest = hashlib.sha1(scope.encode("utf-8"))
+    last_modified = None
+    for doc in stamps:
+        digest.update(f"|{doc['_id']}:{doc.get('version', 0)}".encode("utf-8"))
+        updated_at = doc.get("updated_at")
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return f'"{digest.hexdigest()[:32]}"', last_modified
+
+
+def list_validators(stamps: Iterable[Dict], scope: str) -> Tuple[str, None]:
+    """
+    ETag của một danh sách documents, không kèm Last-Modified
+
+    Xóa một document không làm thay đổi `updated_at` lớn nhất của danh sách
+    nên If-Modified-Since không phát hiện được; ETag (theo _id và version
+    của từng document) thì có.
+    """
+    etag, _ = stamp_validators(stamps, scope)
+    return etag, None
+
+
+def weaken_etag(etag: str) -> str:
+    """ETag yếu (W/) cho response đã được nén: bytes khác bản gốc"""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+    """Request có gửi If-None-Match / If-Modified-Since không"""
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Kiểm tra If-None-Match / If-Modified-Since của request"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match dùng weak comparison
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: Optional[datetime] = None
+):
+    """Gắn ETag, Last-Modified và Cache-Control vào response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if last_modified:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified_response(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Response:
+    """Response 304 không body"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
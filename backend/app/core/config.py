@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import List
 
 from dotenv import load_dotenv
@@ -21,12 +22,141 @@ class Configs(BaseSettings):
     # MongoDB
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "novaland_tour")
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+
+    # Startup & readiness
+    STARTUP_ENSURE_INDEXES: bool = os.getenv("STARTUP_ENSURE_INDEXES", "true").lower() == "true"
+    WARMUP_POOL_SIZE: int = int(os.getenv("WARMUP_POOL_SIZE", "0"))
+    WARMUP_TOURS: int = int(os.getenv("WARMUP_TOURS", "0"))
+    READY_PING_TIMEOUT: float = float(os.getenv("READY_PING_TIMEOUT", "2"))
+    VIEW_FLUSH_SECONDS: float = float(os.getenv("VIEW_FLUSH_SECONDS", "5"))
 
     # Cloudinary
     CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME", "")
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
 
+    # Nơi lưu ảnh: cloudinary | local (LOCAL_STORAGE_DIR, serve qua /files)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "cloudinary")
+    LOCAL_STORAGE_DIR: str = os.getenv("LOCAL_STORAGE_DIR", "storage")
+    LOCAL_STORAGE_BASE_URL: str = os.getenv(
+        "LOCAL_STORAGE_BASE_URL", "http://localhost:8000/api/v1/files"
+    )
+    LOCAL_STORAGE_MAX_AGE: int = int(os.getenv("LOCAL_STORAGE_MAX_AGE", str(365 * 24 * 3600)))
+
+    # Dọn ảnh không còn scene nào dùng (job gc_images)
+    IMAGE_GC_PREFIX: str = os.getenv("IMAGE_GC_PREFIX", "novaland/")
+    IMAGE_GC_GRACE_HOURS: float = float(os.getenv("IMAGE_GC_GRACE_HOURS", "24"))
+    IMAGE_GC_FLUSH_SECONDS: float = float(os.getenv("IMAGE_GC_FLUSH_SECONDS", "2"))
+
+    # Resumable upload (chunk lưu trên đĩa, UPLOAD_DIR phải dùng chung giữa các instance)
+    UPLOAD_DIR: str = os.getenv(
+        "UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "novaland-uploads")
+    )
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))
+    UPLOAD_TTL_HOURS: int = int(os.getenv("UPLOAD_TTL_HOURS", "24"))
+
+    # Transcode panorama khi upload: webp | avif | jpeg | original (lưu nguyên file)
+    PANORAMA_FORMAT: str = os.getenv("PANORAMA_FORMAT", "webp")
+    PANORAMA_MAX_WIDTH: int = int(os.getenv("PANORAMA_MAX_WIDTH", "8192"))
+    PANORAMA_QUALITY: int = int(os.getenv("PANORAMA_QUALITY", "80"))
+    PANORAMA_MAX_BYTES: int = int(os.getenv("PANORAMA_MAX_BYTES", "0"))
+
+    # Scene previews (thumbnail, blurhash, màu chủ đạo) tạo khi upload ảnh
+    SCENE_PREVIEWS: bool = os.getenv("SCENE_PREVIEWS", "true").lower() == "true"
+    SCENE_THUMBNAIL_WIDTH: int = int(os.getenv("SCENE_THUMBNAIL_WIDTH", "512"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+
+    # Change log theo tour (delta sync qua /tours/{id}/changes): entry cũ hơn
+    # TTL bị xóa, quá MAX_ENTRIES thay đổi thì client phải tải lại cả tour
+    CHANGE_LOG_TTL_HOURS: float = float(os.getenv("CHANGE_LOG_TTL_HOURS", "168"))
+    CHANGE_LOG_MAX_ENTRIES: int = int(os.getenv("CHANGE_LOG_MAX_ENTRIES", "1000"))
+
+    # Kênh live (WebSocket) theo tour: số event chờ gửi tối đa mỗi client,
+    # số event tối đa mỗi frame
+    LIVE_QUEUE_SIZE: int = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+    LIVE_BATCH_SIZE: int = int(os.getenv("LIVE_BATCH_SIZE", "64"))
+
+    # Hotspot position updates
+    HOTSPOT_POSITION_COALESCE_MS: int = int(
+        os.getenv("HOTSPOT_POSITION_COALESCE_MS", "50")
+    )
+
+    # Hotspot storage: ghi dạng compact (tắt khi còn instance cũ chỉ đọc được dạng cũ)
+    HOTSPOT_COMPACT_WRITES: bool = (
+        os.getenv("HOTSPOT_COMPACT_WRITES", "true").lower() == "true"
+    )
+
+    # Nơi lưu hotspots: collection | dual (ghi vào scene, đọc cả hai) | embedded
+    HOTSPOT_STORAGE: str = os.getenv("HOTSPOT_STORAGE", "collection")
+
+    # Schema migrations
+    MIGRATION_BATCH_SIZE: int = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+
+    # Compression & tour payload cache
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    TOUR_CACHE_TTL: int = int(os.getenv("TOUR_CACHE_TTL", "60"))
+    TOUR_CACHE_MAX_ENTRIES: int = int(os.getenv("TOUR_CACHE_MAX_ENTRIES", "256"))
+
+    # Background jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+    # Offline bundle (ZIP)
+    BUNDLE_FETCH_CONCURRENCY: int = int(os.getenv("BUNDLE_FETCH_CONCURRENCY", "4"))
+    BUNDLE_SPOOL_MAX_BYTES: int = int(
+        os.getenv("BUNDLE_SPOOL_MAX_BYTES", str(8 * 1024 * 1024))
+    )
+    # Host được tải ảnh ngoài FRONTEND_URL, Cloudinary và LOCAL_STORAGE_BASE_URL
+    BUNDLE_FETCH_HOSTS: str = os.getenv("BUNDLE_FETCH_HOSTS", "")
+
+    # NDJSON streaming
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    STREAM_CHUNK_BYTES: int = int(os.getenv("STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+    # Backup/restore
+    BACKUP_WORKERS: int = int(os.getenv("BACKUP_WORKERS", "4"))
+    BACKUP_CHUNK_BYTES: int = int(os.getenv("BACKUP_CHUNK_BYTES", str(1024 * 1024)))
+    RESTORE_BATCH_SIZE: int = int(os.getenv("RESTORE_BATCH_SIZE", "1000"))
+
+    # Batch write API (/batch)
+    BATCH_MAX_OPERATIONS: int = int(os.getenv("BATCH_MAX_OPERATIONS", "500"))
+    # Ghi trong transaction khi MongoDB là replica set/sharded cluster
+    BATCH_TRANSACTIONS: bool = os.getenv("BATCH_TRANSACTIONS", "true").lower() == "true"
+
+    # Viewer analytics (buffer trong bộ nhớ, flush định kỳ)
+    ANALYTICS_FLUSH_SECONDS: float = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "5"))
+    ANALYTICS_BUFFER_SIZE: int = int(os.getenv("ANALYTICS_BUFFER_SIZE", "200000"))
+    ANALYTICS_MAX_BATCH: int = int(os.getenv("ANALYTICS_MAX_BATCH", "1000"))
+    ANALYTICS_STORE_EVENTS: bool = os.getenv("ANALYTICS_STORE_EVENTS", "true").lower() == "true"
+    ANALYTICS_EVENTS_TTL_DAYS: int = int(os.getenv("ANALYTICS_EVENTS_TTL_DAYS", "30"))
+
+    # Tracing (span cho route, service, repository, lệnh MongoDB, storage)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    # file (JSON lines vào TRACING_FILE) | otlp (OTLP/HTTP JSON tới TRACING_OTLP_ENDPOINT)
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "file")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv(
+        "TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+    )
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "novaland-api")
+    TRACING_EXPORT_INTERVAL: float = float(os.getenv("TRACING_EXPORT_INTERVAL", "2"))
+
+    # Admission control (giới hạn đồng thời theo route class)
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_HEAVY_READ_LIMIT: int = int(os.getenv("ADMISSION_HEAVY_READ_LIMIT", "32"))
+    ADMISSION_HEAVY_READ_QUEUE: int = int(os.getenv("ADMISSION_HEAVY_READ_QUEUE", "64"))
+    ADMISSION_WRITE_LIMIT: int = int(os.getenv("ADMISSION_WRITE_LIMIT", "32"))
+    ADMISSION_WRITE_QUEUE: int = int(os.getenv("ADMISSION_WRITE_QUEUE", "64"))
+    ADMISSION_UPLOAD_LIMIT: int = int(os.getenv("ADMISSION_UPLOAD_LIMIT", "4"))
+    ADMISSION_UPLOAD_QUEUE: int = int(os.getenv("ADMISSION_UPLOAD_QUEUE", "8"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
     # Pagination
     PAGE: int = 1
     PAGE_SIZE: int = 20
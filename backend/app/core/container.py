@@ -0,0 +1,53 @@
+import inspect
+from typing import Any, Callable, Dict, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class ServiceContainer:
+    """
+    Giữ các service singleton, mỗi service chỉ được khởi tạo khi dùng lần đầu
+
+    Import module endpoint không tạo service nào; FastAPI lấy service qua
+    `Depends(provide(Service))`, các service khác gọi `container.get(Service)`.
+    """
+
+    def __init__(self):
+        self._instances: Dict[type, Any] = {}
+
+    def get(self, cls: Type[T]) -> T:
+        """Lấy (hoặc khởi tạo) instance duy nhất của cls"""
+        instance = self._instances.get(cls)
+        if instance is None:
+            instance = self._instances[cls] = cls()
+        return instance
+
+    def override(self, cls: type, instance: Any):
+        """Thay instance của cls (vd: dùng bản giả trong môi trường thử)"""
+        self._instances[cls] = instance
+
+    async def close(self):
+        """Gọi close() của các service đã khởi tạo (flush write đang chờ, ...)"""
+        for instance in reversed(list(self._instances.values())):
+            close = getattr(instance, "close", None)
+            if close is None:
+                continue
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        self._instances.clear()
+
+
+# Singleton instance
+container = ServiceContainer()
+
+
+def provide(cls: Type[T]) -> Callable[[], T]:
+    """Dependency FastAPI trả về service singleton của cls"""
+
+    # async để FastAPI không chạy dependency trong threadpool
+    async def dependency() -> T:
+        return container.get(cls)
+
+    dependency.__name__ = f"get_{cls.__name__}"
+    return dependency
@@ -1,8 +1,68 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
-from typing import Optional
+from pymongo.monitoring import ConnectionPoolListener
+from typing import AsyncIterator, Dict, Optional
 
 from app.core.config import configs
+from app.core.tracing import MongoCommandTracer
+
+
+class PoolMonitor(ConnectionPoolListener):
+    """Đếm connection đang mở / đang được dùng của connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+
+    def _add(self, field: str, delta: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "checkout_failures": self.checkout_failures,
+            }
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_checked_out(self, event):
+        self._add("in_use", 1)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failures", 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
 
 
 class MongoDB:
@@ -12,11 +72,26 @@ class MongoDB:
     def __init__(self, url: str, db_name: str):
         self.url = url
         self.db_name = db_name
+        self.pool_monitor = PoolMonitor()
+        self._transactions: Optional[bool] = None
+
+    @staticmethod
+    def command_listeners() -> list:
+        """Listener cho lệnh MongoDB (span khi TRACING_ENABLED)"""
+        if not configs.TRACING_ENABLED:
+            return []
+        return [MongoCommandTracer()]
 
     def connect(self):
         """Kết nối MongoDB"""
-        self.client = AsyncIOMotorClient(self.url)
+        self.client = AsyncIOMotorClient(
+            self.url,
+            minPoolSize=configs.MONGODB_MIN_POOL_SIZE,
+            maxPoolSize=configs.MONGODB_MAX_POOL_SIZE,
+            event_listeners=[self.pool_monitor, *self.command_listeners()],
+        )
         self.db = self.client[self.db_name]
+        self._transactions = None
         print(f"Connected to MongoDB: {self.db_name}")
         return self.db
 
@@ -36,6 +111,45 @@ class MongoDB:
         """Lấy collection theo tên"""
         return self.get_database()[name]
 
+    async def ping(self) -> bool:
+        """Kiểm tra server phản hồi (một round trip)"""
+        await self.get_database().command("ping")
+        return True
+
+    async def supports_transactions(self) -> bool:
+        """Deployment hỗ trợ transaction (replica set hoặc sharded cluster), kiểm tra một lần"""
+        if self._transactions is None:
+            try:
+                hello = await self.get_database().command("hello")
+                self._transactions = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+            except Exception as e:
+                print(f"MongoDB transaction check failed: {e}")
+                return False
+        return self._transactions
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Optional[object]]:
+        """
+        Session trong một transaction (commit khi thoát, abort khi có lỗi);
+        None nếu deployment không hỗ trợ (standalone): các write không atomic
+        """
+        if not await self.supports_transactions():
+            yield None
+            return
+        async with await self.client.start_session() as session:
+            async with session.start_transaction():
+                yield session
+
+    async def warm_pool(self, size: int):
+        """Mở trước size connection bằng các lệnh ping song song"""
+        size = min(size, configs.MONGODB_MAX_POOL_SIZE)
+        if size > 0:
+            await asyncio.gather(*(self.ping() for _ in range(size)))
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Trạng thái connection pool"""
+        return {**self.pool_monitor.stats(), "max_size": configs.MONGODB_MAX_POOL_SIZE}
+
 
 # Singleton instance
 mongodb = MongoDB(url=configs.MONGODB_URL, db_name=configs.MONGODB_DB_NAME)
@@ -11,11 +11,35 @@ class DuplicatedError(HTTPException):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
 
 
+class ConflictError(HTTPException):
+    def __init__(self, detail: str = "Resource was modified by another request"):
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class GoneError(HTTPException):
+    def __init__(self, detail: str = "Resource is no longer available"):
+        super().__init__(status_code=status.HTTP_410_GONE, detail=detail)
+
+
 class BadRequestError(HTTPException):
     def __init__(self, detail: str = "Bad request"):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
 
+class UnprocessableError(HTTPException):
+    def __init__(self, detail: str = "Unprocessable request"):
+        super().__init__(status_code=422, detail=detail)
+
+
 class UnauthorizedError(HTTPException):
     def __init__(self, detail: str = "Unauthorized"):
         super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(self, detail: str = "Service unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,154 @@
+import asyncio
+import json
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.core.config import configs
+from app.core.streaming import _default
+
+
+def encode_event(event: Dict) -> str:
+    """Serialize một event (một lần cho mọi subscriber)"""
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+def make_delta(
+    entity: str, op: str, doc: Dict, fields: Optional[Iterable[str]] = None
+) -> Dict:
+    """
+    Delta của một document: create gửi cả document, update chỉ gửi các field
+    đã đổi (kèm version, updated_at), delete chỉ gửi id
+
+    Args:
+        entity: tour | scene | hotspot
+        op: create | update | delete
+        fields: Các field đã cập nhật (op=update)
+    """
+    delta = {"op": op, "entity": entity, "id": str(doc["_id"])}
+    if entity == "hotspot" and doc.get("scene_id"):
+        delta["scene_id"] = str(doc["scene_id"])
+    if doc.get("version") is not None:
+        delta["version"] = doc["version"]
+    if op == "create":
+        delta["fields"] = {k: v for k, v in doc.items() if k not in ("_id", "version")}
+    elif op == "update":
+        changed = {k: doc.get(k) for k in fields or () if k != "_id"}
+        if "updated_at" in doc:
+            changed["updated_at"] = doc["updated_at"]
+        delta["fields"] = changed
+    return delta
+
+
+class LiveSubscriber:
+    """
+    Một kết nối WebSocket: hàng đợi gửi giới hạn LIVE_QUEUE_SIZE event
+
+    Client không đọc kịp (hàng đợi đầy) thì các delta đang chờ bị bỏ và thay
+    bằng một event resync: client tải lại `/tours/{id}/full` thay vì làm chậm
+    request ghi hoặc giữ delta vô hạn trong bộ nhớ.
+    """
+
+    def __init__(self, tour_id: str, queue_size: int):
+        self.tour_id = tour_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(queue_size)
+        self.lagged = False
+
+    def push(self, message: str) -> bool:
+        """Đưa event vào hàng đợi, không bao giờ chờ. True nếu phải resync"""
+        if self.lagged:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return False
+        except asyncio.QueueFull:
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event({"op": "resync", "tour_id": self.tour_id}))
+            return True
+
+    async def next_batch(self, max_events: int) -> List[str]:
+        """Chờ event đầu tiên rồi lấy thêm các event đang chờ (tối đa max_events)"""
+        batch = [await self.queue.get()]
+        while len(batch) < max_events and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        # Resync đã được lấy ra, các delta sau đó lại được nhận bình thường
+        self.lagged = False
+        return batch
+
+
+class LiveHub:
+    """
+    Kênh live theo tour: delta được publish sau khi ghi vào change log (kèm
+    seq của tour), mỗi client WebSocket (`/tours/{id}/live`) nhận delta của
+    tour nó đang mở
+
+    Delta chỉ được serialize một lần và đưa vào hàng đợi của từng subscriber
+    (không chờ I/O), việc gửi do task riêng của từng kết nối đảm nhận.
+    """
+
+    def __init__(self, queue_size: int = 256, batch_size: int = 64):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._channels: Dict[str, Set[LiveSubscriber]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    @property
+    def active(self) -> bool:
+        """Có client nào đang kết nối không (không có thì bỏ qua publish)"""
+        return bool(self._channels)
+
+    def subscribe(self, tour_id: str, seq: int = 0) -> LiveSubscriber:
+        """
+        Thêm subscriber, event đầu tiên của nó là subscribed kèm seq hiện tại
+        của tour (client đã có bản cũ hơn thì lấy phần còn thiếu qua /changes)
+        """
+        subscriber = LiveSubscriber(tour_id, self.queue_size)
+        subscriber.push(encode_event({"seq": seq, "tour_id": tour_id, "op": "subscribed"}))
+        self._channels.setdefault(tour_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber):
+        channel = self._channels.get(subscriber.tour_id)
+        if channel is None:
+            return
+        channel.discard(subscriber)
+        if not channel:
+            del self._channels[subscriber.tour_id]
+
+    def publish(self, tour_id: str, event: Dict) -> int:
+        """Gửi event tới các subscriber của tour, trả về số subscriber"""
+        channel = self._channels.get(str(tour_id))
+        if not channel:
+            return 0
+        message = encode_event({"tour_id": str(tour_id), **event})
+        for subscriber in channel:
+            self.resyncs += subscriber.push(message)
+        self.published += 1
+        self.delivered += len(channel)
+        return len(channel)
+
+    def resync(self, *tour_ids: str):
+        """Yêu cầu client tải lại tour (khi không ghi được change log)"""
+        for tour_id in tour_ids:
+            self.publish(tour_id, {"op": "resync"})
+
+    def frame(self, batch: List[str]) -> str:
+        """Một WebSocket frame: mảng JSON các event"""
+        return "[" + ",".join(batch) + "]"
+
+    def stats(self) -> Dict:
+        subscribers = [s for channel in self._channels.values() for s in channel]
+        return {
+            "tours": len(self._channels),
+            "subscribers": len(subscribers),
+            "queued": sum(s.queue.qsize() for s in subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+# Singleton instance
+live_hub = LiveHub(queue_size=configs.LIVE_QUEUE_SIZE, batch_size=configs.LIVE_BATCH_SIZE)
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Gộp các lần gọi đồng thời cùng key thành một coroutine duy nhất
+
+    Caller đến sau khi coroutine của key đang chạy sẽ chờ và nhận chung kết
+    quả (hoặc exception). Một caller bị cancel không ảnh hưởng các caller
+    khác; coroutine chỉ bị cancel khi không còn ai chờ. Key được xóa ngay khi
+    coroutine kết thúc nên lần gọi sau (kể cả sau lỗi) chạy lại từ đầu.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.shared = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Số key đang chạy"""
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Chạy fn() hoặc chờ lần chạy đang diễn ra của cùng key"""
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda _, key=key, flight=flight: self._done(key, flight))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            # shield: cancel caller này không cancel task dùng chung
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _done(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Tránh cảnh báo "exception was never retrieved" khi mọi caller đã bị cancel
+        if not flight.task.cancelled():
+            flight.task.exception()
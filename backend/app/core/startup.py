@@ -0,0 +1,51 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class StartupState:
+    """
+    Theo dõi quá trình khởi động: thời gian từng giai đoạn (ms) và trạng
+    thái sẵn sàng nhận traffic (dùng cho `/ready`)
+    """
+
+    def __init__(self):
+        self.begin()
+
+    def begin(self):
+        """Bắt đầu đo (gọi lại khi lifespan chạy)"""
+        self.started_at = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.phase: Optional[str] = None
+        self.ready = False
+        self.ready_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def measure(self, name: str):
+        """Đo thời gian một giai đoạn khởi động"""
+        self.phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 1)
+            self.phase = None
+
+    def mark_ready(self):
+        """Đánh dấu đã sẵn sàng, ghi lại tổng thời gian khởi động"""
+        self.ready = True
+        self.ready_ms = round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def report(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "phases_ms": self.phases,
+            "startup_ms": self.ready_ms,
+            "error": self.error,
+        }
+
+
+# Singleton instance
+startup_state = StartupState()
@@ -0,0 +1,247 @@
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import configs
+from app.core.tracing import instrument
+
+# Phần mở rộng theo magic bytes của ảnh (dùng cho content-type khi serve)
+SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF8", ".gif"),
+)
+# Số ảnh tối đa mỗi lần gọi delete_images (giới hạn bulk delete của Cloudinary)
+DELETE_BATCH_SIZE = 100
+
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+
+def sniff_extension(head: bytes) -> str:
+    """Phần mở rộng của file ảnh từ các byte đầu"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return ".avif"
+    return ".bin"
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+@instrument(kind="client")
+class StorageBackend:
+    """
+    Nơi lưu ảnh scene/thumbnail. Ảnh được tham chiếu bằng public_id (dùng để
+    xóa) và url (lưu trên scene)
+    """
+
+    name = ""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Span client cho upload/xóa ảnh khi TRACING_ENABLED
+        instrument(cls, kind="client", **{"peer.service": cls.name})
+
+    async def upload_bytes(
+        self,
+        data: bytes,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Lưu ảnh từ bytes, trả về dict có public_id và url"""
+        raise NotImplementedError
+
+    async def upload_file(
+        self,
+        path: str,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Lưu file ảnh trên đĩa, trả về dict có public_id và url"""
+        raise NotImplementedError
+
+    def delete_image(self, public_id: str) -> bool:
+        """Xóa ảnh, True nếu xóa thành công"""
+        raise NotImplementedError
+
+    async def delete_images(self, public_ids: List[str]) -> List[str]:
+        """
+        Xóa nhiều ảnh (tối đa DELETE_BATCH_SIZE), trả về các public_id đã xóa
+
+        Mặc định xóa từng ảnh trong threadpool; backend có bulk API thì override.
+        """
+        return await run_in_threadpool(
+            lambda: [public_id for public_id in public_ids if self.delete_image(public_id)]
+        )
+
+    def list_images(self, prefix: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Duyệt các ảnh có public_id bắt đầu bằng prefix
+
+        Yields:
+            Dict với public_id, url, created_at (datetime UTC) và bytes
+        """
+        raise NotImplementedError
+
+    def get_image_url(self, public_id: str, **options) -> str:
+        """URL của ảnh"""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """
+    Lưu ảnh trong LOCAL_STORAGE_DIR, serve qua `GET /files/{public_id}`
+    (app/api/v1/endpoints/files.py). public_id là đường dẫn tương đối
+    `<folder>/<uuid>.<ext>`, mỗi lần upload tạo file mới nên file không đổi
+    sau khi ghi.
+    """
+
+    name = "local"
+
+    @property
+    def root(self) -> str:
+        return os.path.abspath(configs.LOCAL_STORAGE_DIR)
+
+    def resolve(self, public_id: str) -> Optional[str]:
+        """Đường dẫn file của public_id, None nếu nằm ngoài thư mục lưu"""
+        root = self.root
+        path = os.path.abspath(os.path.join(root, public_id))
+        if os.path.commonpath([root, path]) != root or path == root:
+            return None
+        return path
+
+    def _new_public_id(self, folder: str, public_id: Optional[str], extension: str) -> str:
+        name = public_id or uuid.uuid4().hex
+        if os.path.splitext(name)[1] == "":
+            name += extension
+        return f"{folder.strip('/')}/{name}"
+
+    def _result(self, public_id: str, size: int) -> Dict[str, Any]:
+        return {
+            "public_id": public_id,
+            "url": self.get_image_url(public_id),
+            "width": None,
+            "height": None,
+            "format": os.path.splitext(public_id)[1].lstrip("."),
+            "bytes": size,
+        }
+
+    def _store(self, public_id: str, write: Callable[[str], None]) -> str:
+        path = self.resolve(public_id)
+        if path is None:
+            raise ValueError(f"Invalid public_id: {public_id}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Ghi vào file tạm rồi rename để không bao giờ serve file ghi dở
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return path
+
+    async def upload_bytes(
+        self,
+        data: bytes,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        public_id = self._new_public_id(folder, public_id, sniff_extension(data[:16]))
+        try:
+            await run_in_threadpool(self._store, public_id, lambda tmp: _write_file(tmp, data))
+        except Exception as e:
+            raise Exception(f"Failed to upload image: {str(e)}")
+        return self._result(public_id, len(data))
+
+    async def upload_file(
+        self,
+        path: str,
+        folder: str = "novaland/scenes",
+        public_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with open(path, "rb") as source:
+            head = source.read(16)
+        public_id = self._new_public_id(folder, public_id, sniff_extension(head))
+        try:
+            # copyfile dùng sendfile trên Linux (không copy qua user space)
+            await run_in_threadpool(
+                self._store, public_id, lambda tmp: shutil.copyfile(path, tmp)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to upload image: {str(e)}")
+        return self._result(public_id, os.path.getsize(path))
+
+    def delete_image(self, public_id: str) -> bool:
+        path = self.resolve(public_id)
+        if path is None:
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _scan(self, prefix: str) -> List[Dict[str, Any]]:
+        root = self.root
+        top = os.path.join(root, os.path.dirname(prefix))
+        images = []
+        for directory, _, filenames in os.walk(top):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                public_id = os.path.relpath(path, root).replace(os.sep, "/")
+                if not public_id.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                images.append(
+                    {
+                        "public_id": public_id,
+                        "url": self.get_image_url(public_id),
+                        "created_at": datetime.utcfromtimestamp(stat.st_mtime),
+                        "bytes": stat.st_size,
+                    }
+                )
+        return images
+
+    async def list_images(self, prefix: str) -> AsyncIterator[Dict[str, Any]]:
+        for image in await run_in_threadpool(self._scan, prefix):
+            yield image
+
+    def get_image_url(self, public_id: str, **options) -> str:
+        return f"{configs.LOCAL_STORAGE_BASE_URL.rstrip('/')}/{public_id}"
+
+
+# Dùng chung cho storage backend và route /files (vẫn serve ảnh cũ sau khi
+# đổi STORAGE_BACKEND)
+local_storage = LocalStorage()
+
+
+def get_storage() -> StorageBackend:
+    """Storage backend theo STORAGE_BACKEND (cloudinary | local)"""
+    if configs.STORAGE_BACKEND == "local":
+        return local_storage
+    # Import khi dùng: cloudinary_config import StorageBackend từ module này
+    from app.core.cloudinary_config import cloudinary_service
+
+    return cloudinary_service
@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict
+
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+from app.core.config import configs
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_line(doc: Dict) -> bytes:
+    """Một document -> một dòng JSON (_id đổi thành id như các response khác)"""
+    item = {"id": doc.get("_id")}
+    item.update((k, v) for k, v in doc.items() if k != "_id")
+    return json.dumps(
+        item, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8") + b"\n"
+
+
+async def _iter_ndjson(docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """Gom các dòng thành chunk ~STREAM_CHUNK_BYTES trước khi gửi"""
+    buffer = bytearray()
+    first = True
+    async for doc in docs:
+        buffer += ndjson_line(doc)
+        # Gửi ngay dòng đầu tiên để time-to-first-byte không phụ thuộc kích thước
+        if first or len(buffer) >= configs.STREAM_CHUNK_BYTES:
+            first = False
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(docs: AsyncIterator[Dict]) -> StreamingResponse:
+    """StreamingResponse NDJSON từ một async iterator documents"""
+    return StreamingResponse(_iter_ndjson(docs), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,45 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+# Độ dài prefix được index cho typeahead
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 15
+
+_NON_WORD = re.compile(r"[^\w\s]+", re.UNICODE)
+
+
+def fold_text(value: Optional[str]) -> str:
+    """
+    Chuẩn hóa text để tìm kiếm: bỏ dấu tiếng Việt, đ -> d, chữ thường
+
+    Ví dụ: "Hồ Bơi - Đảo Ngọc" -> "ho boi dao ngoc"
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFD", value)
+    value = "".join(c for c in value if unicodedata.category(c) != "Mn")
+    value = value.replace("đ", "d").replace("Đ", "D").lower()
+    value = _NON_WORD.sub(" ", value)
+    return " ".join(value.split())
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Tách text đã fold thành các từ"""
+    return fold_text(value).split()
+
+
+def edge_prefixes(tokens: List[str]) -> List[str]:
+    """
+    Sinh các prefix của từng từ để query typeahead dùng được index
+
+    Ví dụ: ["boi"] -> ["bo", "boi"]
+    """
+    prefixes = set()
+    for token in tokens:
+        upper = min(len(token), MAX_PREFIX_LENGTH)
+        for length in range(MIN_PREFIX_LENGTH, upper + 1):
+            prefixes.add(token[:length])
+        if len(token) < MIN_PREFIX_LENGTH:
+            prefixes.add(token)
+    return sorted(prefixes)
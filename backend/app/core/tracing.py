@@ -0,0 +1,446 @@
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from pymongo.monitoring import CommandListener
+
+from app.core.config import configs
+
+# traceparent theo W3C Trace Context: version-trace_id-parent_id-flags
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# SpanKind của OTLP
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+# Số span tối đa chờ export, quá thì bỏ span mới (không chặn request)
+EXPORT_QUEUE_SIZE = 10000
+EXPORT_BATCH_SIZE = 512
+
+
+class Span:
+    """Một span: thời gian (ns), span cha và attributes"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "sampled", "kind",
+        "attributes", "start_ns", "end_ns", "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        """Header traceparent để truyền context sang service khác"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: Any):
+        self.error = str(getattr(error, "detail", error)) or type(error).__name__
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.sampled:
+            _exporter.export(self)
+
+    def to_dict(self) -> Dict:
+        """Span dạng JSON (exporter file)"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class RemoteParent:
+    """Span cha nhận qua traceparent của request"""
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Span đang chạy trong context hiện tại"""
+    return _current.get()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[RemoteParent]:
+    """Đọc header traceparent, None nếu không có hoặc sai định dạng"""
+    match = TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return RemoteParent(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def _sample() -> bool:
+    rate = configs.TRACING_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    parent: Optional[RemoteParent] = None,
+    new_trace: bool = False,
+    **attributes: Any,
+) -> Iterator[Optional[Span]]:
+    """
+    Mở span con của span hiện tại
+
+    Span chỉ được tạo trong một trace đang có (request, job): lời gọi từ các
+    vòng lặp nền không tạo trace mới trừ khi new_trace=True. Trace không được
+    sample thì không tạo span con.
+
+    Args:
+        parent: Span cha từ traceparent (request đến)
+        new_trace: Cho phép tạo trace mới khi không có span cha
+    """
+    current = parent or _current.get()
+    if current is None:
+        if not new_trace or not configs.TRACING_ENABLED:
+            yield None
+            return
+        span = Span(name, os.urandom(16).hex(), None, _sample(), kind, attributes)
+    elif not current.sampled and not isinstance(current, RemoteParent):
+        yield None
+        return
+    else:
+        # Sampling theo span cha: trace không sample (traceparent flags=00)
+        # vẫn có span server để trả traceresponse nhưng không export
+        span = Span(name, current.trace_id, current.span_id, current.sampled, kind, attributes)
+
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+def _traced(fn, kind: str, attributes: Dict[str, Any]):
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        if _current.get() is None:
+            return await fn(self, *args, **kwargs)
+        with start_span(f"{type(self).__name__}.{fn.__name__}", kind, **attributes) as span:
+            if span is not None and hasattr(self, "collection_name"):
+                span.set_attribute("db.collection", self.collection_name)
+            return await fn(self, *args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def instrument(cls=None, kind: str = "internal", **attributes: Any):
+    """
+    Bọc các async method public của class (định nghĩa trong chính class) bằng
+    span `<Class>.<method>`. Chỉ có tác dụng khi TRACING_ENABLED lúc import
+    (tắt thì không tốn gì).
+
+    Dùng như decorator `@instrument` hoặc gọi `instrument(cls)` trong
+    `__init_subclass__` của base class.
+    """
+
+    def apply(cls):
+        if not configs.TRACING_ENABLED:
+            return cls
+        for name, value in list(vars(cls).items()):
+            if (
+                name.startswith("_")
+                or not inspect.iscoroutinefunction(value)
+                or getattr(value, "__traced__", False)
+            ):
+                continue
+            setattr(cls, name, _traced(value, kind, attributes))
+        return cls
+
+    return apply(cls) if cls is not None else apply
+
+
+class MongoCommandTracer(CommandListener):
+    """
+    Span cho mỗi lệnh MongoDB (find, aggregate, getMore, ...). Motor chạy
+    pymongo trong threadpool với context của coroutine gọi nên span cha là
+    span repository/service đang chạy.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Span] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        attributes = {"db.system": "mongodb", "db.name": event.database_name, "db.operation": event.command_name}
+        if isinstance(collection, str):
+            attributes["db.collection"] = collection
+        span = Span(
+            f"mongo.{event.command_name}", parent.trace_id, parent.span_id, True, "client", attributes
+        )
+        with self._lock:
+            self._pending[event.request_id] = span
+
+    def _finish(self, event, error: Optional[str] = None):
+        with self._lock:
+            span = self._pending.pop(event.request_id, None)
+        if span is None:
+            return
+        span.error = error
+        span.end(span.start_ns + event.duration_micros * 1000)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, str(event.failure.get("errmsg", "failed")))
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware mở span server cho mỗi request HTTP (tên theo route, vd
+    `GET /api/v1/tours/{tour_id}/full`), nhận traceparent của client và trả
+    về header traceresponse
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        method = scope["method"]
+        with start_span(
+            f"{method} {scope['path']}",
+            "server",
+            parent=parent,
+            new_trace=True,
+            **{"http.method": method, "http.target": scope["path"]},
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.status_code", status)
+                    if status >= 500:
+                        span.error = f"HTTP {status}"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"traceresponse", span.traceparent.encode("latin-1"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    # Route của router con có path tương đối với API_V1_STR
+                    path = route.path
+                    if scope["path"].startswith(configs.API_V1_STR) and not path.startswith(
+                        configs.API_V1_STR
+                    ):
+                        path = configs.API_V1_STR + path
+                    span.name = f"{method} {path}"
+
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict:
+    """Body OTLP/HTTP JSON (POST /v1/traces) cho một batch span"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": configs.TRACING_SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app.core.tracing"},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": SPAN_KINDS.get(span.kind, 1),
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                    if value is not None
+                                ],
+                                "status": (
+                                    {"code": 2, "message": span.error} if span.error else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """
+    Export span theo batch trong một thread nền (không chặn event loop):
+    TRACING_EXPORTER=file ghi JSON lines vào TRACING_FILE, otlp gửi OTLP/HTTP
+    JSON tới TRACING_OTLP_ENDPOINT (vd: collector chạy local)
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def export(self, span: Span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        client = httpx.Client(timeout=5) if configs.TRACING_EXPORTER == "otlp" else None
+        stop = False
+        while not stop:
+            batch: List[Span] = []
+            try:
+                span = self._queue.get(timeout=configs.TRACING_EXPORT_INTERVAL)
+                while True:
+                    if span is None:
+                        stop = True
+                        break
+                    batch.append(span)
+                    if len(batch) >= EXPORT_BATCH_SIZE:
+                        break
+                    span = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch, client)
+        if client is not None:
+            client.close()
+
+    def _write(self, batch: List[Span], client: Optional[httpx.Client]):
+        try:
+            if client is not None:
+                response = client.post(configs.TRACING_OTLP_ENDPOINT, json=to_otlp(batch))
+                response.raise_for_status()
+            else:
+                with open(configs.TRACING_FILE, "a", encoding="utf-8") as file:
+                    for span in batch:
+                        file.write(json.dumps(span.to_dict(), default=str) + "\n")
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Span export failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "exported": self.exported,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def shutdown(self, timeout: float = 5):
+        """Export nốt các span đang chờ rồi dừng thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+_exporter = SpanExporter()
+
+
+def tracing_stats() -> Dict:
+    """Số span đã export/đang chờ/bị bỏ"""
+    return {"enabled": configs.TRACING_ENABLED, **_exporter.stats()}
+
+
+def shutdown_tracing():
+    """Flush span khi tắt app"""
+    _exporter.shutdown()
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class WriteCoalescer:
+    """
+    Gom các write trong một cửa sổ thời gian ngắn, chỉ giữ giá trị mới nhất
+    cho mỗi key rồi flush một lần.
+
+    Args:
+        flush: Coroutine nhận dict {key: value} và ghi xuống database
+        window: Độ dài cửa sổ gom (giây)
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Dict[Hashable, Any]], Awaitable[Any]],
+        window: float = 0.05,
+    ):
+        self._flush = flush
+        self.window = window
+        self._pending: Dict[Hashable, Any] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+        # Các batch đang ghi: (batch, future hoàn thành khi ghi xong)
+        self._inflight: List[Tuple[Dict[Hashable, Any], asyncio.Future]] = []
+
+    @property
+    def pending_count(self) -> int:
+        """Số key đang chờ flush"""
+        return len(self._pending)
+
+    def submit(self, key: Hashable, value: Any) -> asyncio.Future:
+        """
+        Đưa một write vào buffer, ghi đè giá trị cũ của cùng key
+
+        Returns:
+            Future hoàn thành khi lần flush chứa write này kết thúc
+        """
+        return self.submit_many({key: value})
+
+    def submit_many(self, items: Dict[Hashable, Any]) -> asyncio.Future:
+        """Đưa nhiều write vào buffer, trả về future của lần flush"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        if not items:
+            waiter.set_result(None)
+            return waiter
+
+        self._pending.update(items)
+        self._waiters.append(waiter)
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return waiter
+
+    def discard(self, keys: Iterable[Hashable]):
+        """Bỏ các write đang chờ của những key đã được ghi theo đường khác"""
+        for key in keys:
+            self._pending.pop(key, None)
+
+    async def settle(self, keys: Iterable[Hashable]):
+        """
+        Bỏ các write đang chờ của keys và chờ batch đang ghi chúng (nếu có)
+
+        Gọi trước khi ghi các key này theo đường khác, để batch cũ không ghi
+        đè lên giá trị mới hơn.
+        """
+        keys = set(keys)
+        self.discard(keys)
+        for batch, done in list(self._inflight):
+            if not keys.isdisjoint(batch):
+                await asyncio.shield(done)
+
+    async def _run(self):
+        # Lặp lại nếu có write mới đến trong lúc đang flush
+        while self._pending:
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+    async def flush(self):
+        """Flush ngay các write đang chờ"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, []
+        inflight = (batch, asyncio.get_running_loop().create_future())
+        self._inflight.append(inflight)
+
+        try:
+            result = await self._flush(batch)
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        finally:
+            self._inflight.remove(inflight)
+            inflight[1].set_result(None)
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def close(self):
+        """Chờ lần flush đang chạy và flush phần còn lại"""
+        if self._task and not self._task.done():
+            await self._task
+        await self.flush()
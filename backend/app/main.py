@@ -1,21 +1,85 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from app.api.v1.routes import routers as v1_routers
 from app.core.config import configs
+from app.core.admission import AdmissionMiddleware, admission_stats
+from app.core.compression import CompressionMiddleware
+from app.core.container import container
 from app.core.database import mongodb
+from app.core.live import live_hub
+from app.core.startup import startup_state
+from app.core.tracing import TracingMiddleware, shutdown_tracing, tracing_stats
+from app.repository import (
+    TourRepository,
+    SceneRepository,
+    HotspotRepository,
+    SearchRepository,
+    JobRepository,
+    UploadRepository,
+    ChangeRepository,
+    AnalyticsRepository,
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.image_gc_service import ImageGCService
+from app.services.image_service import ImageService
+from app.services.job_service import job_service
+from app.services.tour_service import TourService
+
+
+async def warm_up():
+    """Warm-up chạy nền sau khi app nhận request: connection pool, cache tours"""
+    try:
+        if configs.WARMUP_POOL_SIZE > 0:
+            with startup_state.measure("warm_pool"):
+                await mongodb.warm_pool(configs.WARMUP_POOL_SIZE)
+        if configs.WARMUP_TOURS > 0:
+            with startup_state.measure("warm_tours"):
+                warmed = await container.get(TourService).warm_up(configs.WARMUP_TOURS)
+            print(f"Warmed up {warmed} tours")
+    except Exception as e:
+        # Warm-up chỉ để tăng tốc, lỗi không chặn readiness
+        startup_state.error = f"Warm-up failed: {e}"
+        print(startup_state.error)
+    startup_state.mark_ready()
+    print(f"Application ready in {startup_state.ready_ms} ms ({startup_state.phases})")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager cho FastAPI app"""
-    # Startup: kết nối database
-    mongodb.connect()
+    startup_state.begin()
+    # Startup: kết nối database (services được tạo khi dùng lần đầu)
+    with startup_state.measure("connect"):
+        mongodb.connect()
+    if configs.STARTUP_ENSURE_INDEXES:
+        with startup_state.measure("indexes"):
+            for repository in (
+                TourRepository(),
+                SceneRepository(),
+                HotspotRepository(),
+                SearchRepository(),
+                JobRepository(),
+                UploadRepository(),
+                ChangeRepository(),
+                AnalyticsRepository(),
+            ):
+                await repository.ensure_indexes()
+    with startup_state.measure("jobs"):
+        await job_service.start()
+    warm_up_task = asyncio.create_task(warm_up())
     print("Application started")
     yield
-    # Shutdown: đóng kết nối
+    # Shutdown: dừng jobs, flush các write đang chờ rồi đóng kết nối
+    warm_up_task.cancel()
+    await job_service.stop()
+    await container.close()
     mongodb.close()
+    shutdown_tracing()
     print("Application shutdown")
 
 
@@ -28,6 +92,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Giới hạn đồng thời cho route nặng (bên trong CORS để response 503 vẫn có
+# header CORS)
+if configs.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +106,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Nén gzip/brotli cho response lớn
+app.add_middleware(CompressionMiddleware, minimum_size=configs.COMPRESSION_MIN_SIZE)
+
+# Span cho mỗi request (ngoài cùng để đo cả nén và hàng đợi admission)
+if configs.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 
 # Health check
 @app.get("/")
@@ -46,8 +122,51 @@ def root():
 
 @app.get("/health")
 def health_check():
+    """Liveness: process còn chạy (không kiểm tra phụ thuộc)"""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 503 cho đến khi khởi động/warm-up xong, MongoDB phản hồi ping
+    và connection pool chưa cạn
+    """
+    startup = startup_state.report()
+    if not startup_state.ready:
+        return JSONResponse({"status": "starting", "startup": startup}, status_code=503)
+
+    pool = mongodb.pool_stats()
+    if pool["in_use"] >= pool["max_size"]:
+        return JSONResponse(
+            {"status": "unavailable", "reason": "connection pool exhausted", "pool": pool},
+            status_code=503,
+        )
+
+    try:
+        await asyncio.wait_for(mongodb.ping(), configs.READY_PING_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(
+            {"status": "unavailable", "reason": f"MongoDB ping failed: {e}", "pool": pool},
+            status_code=503,
+        )
+
+    return {"status": "ready", "pool": pool, "startup": startup}
+
+
+@app.get("/metrics")
+def metrics():
+    """Metrics: admission control theo route class, connection pool, xử lý/dọn ảnh, tracing, kênh live, analytics"""
+    return {
+        "admission": admission_stats(),
+        "pool": mongodb.pool_stats(),
+        "images": container.get(ImageService).stats(),
+        "image_gc": container.get(ImageGCService).stats(),
+        "tracing": tracing_stats(),
+        "live": live_hub.stats(),
+        "analytics": container.get(AnalyticsService).stats(),
+    }
+
+
 # Include routers
 app.include_router(v1_routers, prefix=configs.API_V1_STR)
@@ -0,0 +1,9 @@
+from app.migrations.base import Migration
+from app.migrations.m001_compact_hotspots import CompactHotspots
+from app.migrations.m002_embed_hotspots import EmbedHotspots
+
+# Các migration đã đăng ký, chạy theo thứ tự
+MIGRATIONS = [
+    CompactHotspots(),
+    EmbedHotspots(),
+]
@@ -0,0 +1,40 @@
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+
+class Migration:
+    """
+    Một migration dữ liệu, chạy theo batch trên một collection
+
+    Migration phải idempotent: `query()` chỉ khớp document chưa được migrate
+    nên chạy lại (sau khi bị dừng giữa chừng) không migrate lại document cũ.
+    """
+
+    # ID duy nhất, có tiền tố số thứ tự (migrations chạy theo thứ tự ID)
+    id: str = ""
+    collection: str = ""
+    description: str = ""
+
+    def enabled(self) -> bool:
+        """Migration có áp dụng với cấu hình hiện tại không"""
+        return True
+
+    def query(self) -> Dict:
+        """Filter các document cần migrate"""
+        raise NotImplementedError
+
+    def migrate(self, doc: Dict) -> Optional[Dict]:
+        """Update operation cho một document (None thì bỏ qua)"""
+        raise NotImplementedError
+
+    async def apply(self, collection: AsyncIOMotorCollection, batch: List[Dict]):
+        """Ghi một batch: mặc định một bulk_write các update của `migrate()`"""
+        operations = []
+        for doc in batch:
+            update = self.migrate(doc)
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, update))
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
@@ -0,0 +1,35 @@
+from typing import Dict, Optional
+
+from app.migrations.base import Migration
+from app.repository.hotspot_repository import HOTSPOT_TYPES, encode_hotspot_fields
+
+
+class CompactHotspots(Migration):
+    """Chuyển hotspots sang dạng compact (xem `encode_hotspot_fields`)"""
+
+    id = "001_compact_hotspots"
+    collection = "hotspots"
+    description = (
+        "Hotspots: scene_id/target_scene dạng ObjectId, position dạng [x, y, z], "
+        "type dạng số, bỏ fov_trigger null"
+    )
+
+    def query(self) -> Dict:
+        return {
+            "$or": [
+                {"position": {"$type": "object"}},
+                {"scene_id": {"$type": "string"}},
+                {"type": {"$in": list(HOTSPOT_TYPES)}},
+            ]
+        }
+
+    def migrate(self, doc: Dict) -> Optional[Dict]:
+        fields = {
+            field: doc[field]
+            for field in ("scene_id", "target_scene", "position", "type")
+            if field in doc
+        }
+        update: Dict = {"$set": encode_hotspot_fields(fields)}
+        if "fov_trigger" in doc and doc["fov_trigger"] is None:
+            update["$unset"] = {"fov_trigger": ""}
+        return update
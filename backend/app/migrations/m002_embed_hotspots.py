@@ -0,0 +1,84 @@
+from typing import Dict, List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+from app.migrations.base import Migration
+from app.repository.hotspot_repository import (
+    STORAGE_COLLECTION,
+    decode_hotspot,
+    encode_element,
+)
+from app.core.config import configs
+
+
+class EmbedHotspots(Migration):
+    """
+    Chuyển hotspots từ collection vào mảng `hotspots` của scene (chạy với
+    HOTSPOT_STORAGE=dual, xong thì chuyển sang embedded)
+    """
+
+    id = "002_embed_hotspots"
+    collection = "hotspots"
+    description = (
+        "Nhúng hotspots vào scene rồi xóa khỏi collection hotspots "
+        "(hotspot của scene không tồn tại được giữ lại)"
+    )
+
+    def enabled(self) -> bool:
+        return configs.HOTSPOT_STORAGE != STORAGE_COLLECTION
+
+    def query(self) -> Dict:
+        # Document đã chuyển bị xóa nên mọi document còn lại đều cần migrate
+        return {}
+
+    async def apply(self, collection: AsyncIOMotorCollection, batch: List[Dict]):
+        scenes = collection.database["scenes"]
+        pending = batch
+        while pending:
+            by_scene: Dict[ObjectId, List[Dict]] = {}
+            for doc in pending:
+                hotspot = decode_hotspot(dict(doc))
+                if ObjectId.is_valid(hotspot.get("scene_id")):
+                    by_scene.setdefault(ObjectId(hotspot["scene_id"]), []).append(
+                        {**encode_element(hotspot), "version": doc.get("version")}
+                    )
+
+            # Hotspot đã nhúng (lần chạy bị dừng giữa chừng) được ghi đè thay vì $push
+            found, embedded = set(), set()
+            async for scene in scenes.find({"_id": {"$in": list(by_scene)}}, {"hotspots._id": 1}):
+                found.add(scene["_id"])
+                embedded.update(element["_id"] for element in scene.get("hotspots", []))
+
+            operations = []
+            moved = []
+            for scene_id, elements in by_scene.items():
+                if scene_id not in found:
+                    continue
+                moved.extend(elements)
+                new = [element for element in elements if element["_id"] not in embedded]
+                if new:
+                    operations.append(
+                        UpdateOne({"_id": scene_id}, {"$push": {"hotspots": {"$each": new}}})
+                    )
+                operations.extend(
+                    UpdateOne(
+                        {"_id": scene_id, "hotspots._id": element["_id"]},
+                        {"$set": {"hotspots.$": element}},
+                    )
+                    for element in elements
+                    if element["_id"] in embedded
+                )
+            if not moved:
+                return
+            await scenes.bulk_write(operations, ordered=False)
+
+            # Chỉ xóa document chưa bị ghi trong lúc chuyển; document vừa bị
+            # sửa được chuyển lại ở vòng sau
+            await collection.delete_many(
+                {"$or": [{"_id": e["_id"], "version": e["version"]} for e in moved]}
+            )
+            pending = await collection.find(
+                {"_id": {"$in": [e["_id"] for e in moved]}}
+            ).to_list(length=None)
@@ -1,3 +1,9 @@
 from app.repository.tour_repository import TourRepository
 from app.repository.scene_repository import SceneRepository
 from app.repository.hotspot_repository import HotspotRepository
+from app.repository.search_repository import SearchRepository
+from app.repository.job_repository import JobRepository
+from app.repository.migration_repository import MigrationRepository
+from app.repository.upload_repository import UploadRepository
+from app.repository.change_repository import ChangeRepository
+from app.repository.analytics_repository import AnalyticsRepository
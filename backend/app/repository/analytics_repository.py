@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import IndexModel, UpdateOne
+
+from app.repository.base_repository import BaseRepository
+from app.core.config import configs
+from app.core.database import get_database
+
+
+class AnalyticsRepository(BaseRepository):
+    """
+    Rollup theo phút của viewer analytics: mỗi document đếm một loại event
+    của một scene/hotspot trong một phút (kèm đầu giờ/ngày để gộp theo
+    bucket). Event gốc nằm trong analytics_events (hết hạn sau
+    ANALYTICS_EVENTS_TTL_DAYS).
+    """
+
+    indexes = [IndexModel([("tour_id", 1), ("minute", 1)])]
+
+    event_indexes = [
+        IndexModel(
+            [("received_at", 1)],
+            expireAfterSeconds=configs.ANALYTICS_EVENTS_TTL_DAYS * 86400,
+        ),
+        IndexModel([("tour_id", 1), ("ts", 1)]),
+    ]
+
+    def __init__(self):
+        super().__init__("analytics_rollups")
+
+    @property
+    def events(self):
+        return get_database()["analytics_events"]
+
+    async def ensure_indexes(self):
+        """Index của rollups và TTL index của event gốc"""
+        await super().ensure_indexes()
+        await self.events.create_indexes(self.event_indexes)
+
+    async def insert_events(self, events: List[Dict]) -> int:
+        """Ghi event gốc bằng một insert_many (không theo thứ tự)"""
+        if not events:
+            return 0
+        result = await self.events.insert_many(events, ordered=False)
+        return len(result.inserted_ids)
+
+    async def upsert_rollups(self, rollups: Dict[tuple, List[int]]) -> int:
+        """
+        Cộng dồn rollup vào document của từng phút bằng một bulk_write
+
+        Args:
+            rollups: {(tour_id, minute, type, scene_id, hotspot_id): [count, dwell_ms, dwell_count]}
+        """
+        if not rollups:
+            return 0
+        operations = []
+        for (tour_id, minute, type, scene_id, hotspot_id), (count, dwell_ms, dwell_count) in rollups.items():
+            operations.append(UpdateOne(
+                {"_id": f"{tour_id}|{minute:%Y%m%d%H%M}|{type}|{scene_id or ''}|{hotspot_id or ''}"},
+                {
+                    "$inc": {"count": count, "dwell_ms": dwell_ms, "dwell_count": dwell_count},
+                    "$setOnInsert": {
+                        "tour_id": tour_id,
+                        "minute": minute,
+                        "hour": minute.replace(minute=0),
+                        "day": minute.replace(hour=0, minute=0),
+                        "type": type,
+                        "scene_id": scene_id,
+                        "hotspot_id": hotspot_id,
+                    },
+                },
+                upsert=True,
+            ))
+        await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def aggregate_totals(self, tour_id: str, start: datetime, end: datetime) -> List[Dict]:
+        """Tổng count/dwell theo (type, scene_id, hotspot_id) trong khoảng [start, end)"""
+        pipeline = [
+            {"$match": {"tour_id": tour_id, "minute": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {"type": "$type", "scene_id": "$scene_id", "hotspot_id": "$hotspot_id"},
+                "count": {"$sum": "$count"},
+                "dwell_ms": {"$sum": "$dwell_ms"},
+                "dwell_count": {"$sum": "$dwell_count"},
+            }},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def aggregate_series(
+        self,
+        tour_id: str,
+        type: str,
+        start: datetime,
+        end: datetime,
+        bucket: str,
+        scene_id: Optional[str] = None,
+        hotspot_id: Optional[str] = None,
+    ) -> List[Dict]:
+        """Tổng count/dwell theo bucket (minute | hour | day), sắp xếp theo thời gian"""
+        match: Dict = {"tour_id": tour_id, "type": type, "minute": {"$gte": start, "$lt": end}}
+        if scene_id:
+            match["scene_id"] = scene_id
+        if hotspot_id:
+            match["hotspot_id"] = hotspot_id
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": f"${bucket}",
+                "count": {"$sum": "$count"},
+                "dwell_ms": {"$sum": "$dwell_ms"},
+                "dwell_count": {"$sum": "$dwell_count"},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
@@ -1,17 +1,87 @@
-from typing import Any, Dict, List, Optional, TypeVar
+from typing import Any, AsyncIterator, Dict, List, Optional, TypeVar
+from datetime import datetime
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.core.exceptions import NotFoundError
+from app.core.database import get_database
+from app.core.exceptions import ConflictError, NotFoundError
+from app.core.tracing import instrument
 
 T = TypeVar("T")
 
 
+# Projection chỉ lấy change stamp của document
+STAMP_PROJECTION = {"_id": 1, "version": 1, "updated_at": 1}
+
+
+def versioned_filter(id: str, versions: Optional[Dict[str, int]] = None) -> Dict:
+    """Filter theo _id, kèm version nếu đã biết"""
+    filter_dict: Dict[str, Any] = {"_id": ObjectId(id)}
+    if versions and versions.get(id) is not None:
+        filter_dict["version"] = versions[id]
+    return filter_dict
+
+
+def change_stamp() -> Dict:
+    """Các field $set cho mỗi lần ghi (kèm $inc version)"""
+    return {"updated_at": datetime.utcnow()}
+
+
+@instrument
 class BaseRepository:
     """Base repository cho MongoDB operations"""
 
-    def __init__(self, collection: AsyncIOMotorCollection):
-        self.collection = collection
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Span cho mỗi async method public khi TRACING_ENABLED
+        instrument(cls)
+
+    # Index cần tạo khi khởi động
+    indexes: List[IndexModel] = []
+
+    # Projection mặc định khi đọc document (None = mọi field)
+    projection: Optional[Dict] = None
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self._db = None
+        self._collection: Optional[AsyncIOMotorCollection] = None
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        """Collection được lấy khi dùng lần đầu (khởi tạo repository không kết nối database)"""
+        db = get_database()
+        if db is not self._db:
+            self._db = db
+            self._collection = db[self.collection_name]
+        return self._collection
+
+    async def ensure_indexes(self):
+        """Tạo các index khai báo trong `indexes`"""
+        if self.indexes:
+            await self.collection.create_indexes(self.indexes)
+
+    # Chuyển đổi giữa document trả về cho service và dạng lưu trong database.
+    # Mặc định hai dạng giống nhau, chỉ _id được đổi sang string khi đọc.
+
+    def to_document(self, data: Dict) -> Dict:
+        """Document cần lưu từ dữ liệu của service"""
+        return data
+
+    def to_fields(self, fields: Dict) -> Dict:
+        """Các field $set ở dạng lưu trong database"""
+        return fields
+
+    def to_filter(self, filter_dict: Dict) -> Dict:
+        """Filter khớp được mọi dạng document đang lưu"""
+        return filter_dict
+
+    def from_document(self, doc: Dict) -> Dict:
+        """Document trả về cho service từ document đọc từ database"""
+        doc["_id"] = str(doc["_id"])
+        return doc
 
     async def find_all(
         self,
@@ -21,8 +91,8 @@ class BaseRepository:
         sort: Optional[List] = None
     ) -> List[Dict]:
         """Tìm tất cả documents"""
-        filter_dict = filter_dict or {}
-        cursor = self.collection.find(filter_dict)
+        filter_dict = self.to_filter(filter_dict or {})
+        cursor = self.collection.find(filter_dict, self.projection)
         
         if sort:
             cursor = cursor.sort(sort)
@@ -31,67 +101,250 @@ class BaseRepository:
         documents = await cursor.to_list(length=limit)
         
         # Convert ObjectId to string
-        for doc in documents:
-            doc["_id"] = str(doc["_id"])
-        
-        return documents
+        return [self.from_document(doc) for doc in documents]
+
+    async def iter_all(
+        self,
+        filter_dict: Optional[Dict] = None,
+        limit: int = 0,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict]:
+        """
+        Duyệt documents bằng cursor (theo thứ tự _id), mỗi lần chỉ giữ một
+        batch trong bộ nhớ thay vì to_list toàn bộ kết quả
+        """
+        cursor = (
+            self.collection.find(self.to_filter(filter_dict or {}), self.projection)
+            .sort("_id", 1)
+            .limit(limit)
+            .batch_size(batch_size)
+        )
+        try:
+            async for doc in cursor:
+                yield self.from_document(doc)
+        finally:
+            # Client ngắt giữa chừng: đóng cursor trên server
+            await cursor.close()
 
     async def count(self, filter_dict: Optional[Dict] = None) -> int:
         """Đếm số documents"""
-        filter_dict = filter_dict or {}
+        filter_dict = self.to_filter(filter_dict or {})
         return await self.collection.count_documents(filter_dict)
 
     async def find_by_id(self, id: str) -> Optional[Dict]:
         """Tìm document theo ID"""
         try:
-            doc = await self.collection.find_one({"_id": ObjectId(id)})
+            doc = await self.collection.find_one({"_id": ObjectId(id)}, self.projection)
             if doc:
-                doc["_id"] = str(doc["_id"])
+                doc = self.from_document(doc)
             return doc
         except Exception:
             return None
 
+    async def find_stamp_by_id(self, id: str) -> Optional[Dict]:
+        """Lấy change stamp (version, updated_at) của một document"""
+        if not ObjectId.is_valid(id):
+            return None
+        doc = await self.collection.find_one({"_id": ObjectId(id)}, STAMP_PROJECTION)
+        if doc:
+            doc["_id"] = str(doc["_id"])
+        return doc
+
+    async def find_stamps(self, filter_dict: Dict, limit: int = 100) -> List[Dict]:
+        """Lấy change stamps của các document khớp filter (theo thứ tự _id)"""
+        cursor = (
+            self.collection.find(self.to_filter(filter_dict), STAMP_PROJECTION)
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        documents = await cursor.to_list(length=limit)
+        for doc in documents:
+            doc["_id"] = str(doc["_id"])
+        return documents
+
     async def find_one(self, filter_dict: Dict) -> Optional[Dict]:
         """Tìm một document theo filter"""
-        doc = await self.collection.find_one(filter_dict)
+        doc = await self.collection.find_one(self.to_filter(filter_dict), self.projection)
         if doc:
-            doc["_id"] = str(doc["_id"])
+            doc = self.from_document(doc)
         return doc
 
     async def create(self, data: Dict) -> Dict:
         """Tạo document mới"""
-        result = await self.collection.insert_one(data)
+        data.update(change_stamp())
+        data["version"] = 1
+        result = await self.collection.insert_one(self.to_document(data))
         data["_id"] = str(result.inserted_id)
         return data
 
-    async def update(self, id: str, data: Dict) -> Optional[Dict]:
-        """Cập nhật document"""
+    async def insert_many(
+        self, documents: List[Dict], skip_duplicates: bool = False
+    ) -> List[Dict]:
+        """
+        Tạo nhiều documents bằng một insert_many (unordered)
+
+        Args:
+            documents: Documents cần tạo, có thể có sẵn _id
+            skip_duplicates: Bỏ qua document trùng _id thay vì raise
+
+        Returns:
+            Các documents đã được tạo
+        """
+        if not documents:
+            return []
+        stamp = change_stamp()
+        for doc in documents:
+            doc.update(stamp)
+            doc.setdefault("version", 1)
+            doc.setdefault("_id", ObjectId())
+        try:
+            await self.collection.insert_many(
+                [self.to_document(doc) for doc in documents], ordered=False
+            )
+            return documents
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not skip_duplicates or any(err.get("code") != 11000 for err in errors):
+                raise
+            failed = {err["index"] for err in errors}
+            return [doc for i, doc in enumerate(documents) if i not in failed]
+
+    async def apply_diff(
+        self,
+        inserts: List[Dict],
+        updates: Dict[str, Dict],
+        delete_ids: List[str],
+        delete_filter: Optional[Dict] = None,
+        session=None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict:
+        """
+        Áp dụng một diff bằng một bulk_write (unordered)
+
+        Args:
+            inserts: Documents mới (có thể có sẵn _id)
+            updates: Dict {id: các field cần $set}
+            delete_ids: ID các documents cần xóa
+            delete_filter: Filter xóa thêm (vd: con của documents bị xóa)
+            session: Session của transaction đang mở (nếu có)
+            versions: Dict {id: version đã đọc}; nếu có, mỗi update/delete chỉ
+                khớp document còn đúng version đó (delete_filter được ghi
+                bằng bulk_write riêng để đếm được)
+
+        Returns:
+            Dict với số document inserted, modified, deleted và conflicts
+            (số update/delete không khớp document nào, chỉ khi có versions)
+        """
+        stamp = change_stamp()
+        operations: List[Any] = []
+        for doc in inserts:
+            doc.update(stamp)
+            doc["version"] = 1
+            doc.setdefault("_id", ObjectId())
+            operations.append(InsertOne(self.to_document(doc)))
+        for id, fields in updates.items():
+            operations.append(
+                UpdateOne(
+                    versioned_filter(id, versions),
+                    {"$set": {**self.to_fields(fields), **stamp}, "$inc": {"version": 1}},
+                )
+            )
+        if versions is not None:
+            operations.extend(DeleteOne(versioned_filter(id, versions)) for id in delete_ids)
+        elif delete_ids:
+            operations.append(
+                DeleteMany({"_id": {"$in": [ObjectId(id) for id in delete_ids]}})
+            )
+        if delete_filter and versions is None:
+            operations.append(DeleteMany(self.to_filter(delete_filter)))
+
+        inserted = modified = deleted = conflicts = 0
+        if operations:
+            result = await self.collection.bulk_write(operations, ordered=False, session=session)
+            inserted, modified, deleted = (
+                result.inserted_count, result.modified_count, result.deleted_count
+            )
+            if versions is not None:
+                conflicts = len(updates) - result.matched_count + len(delete_ids) - deleted
+        if delete_filter and versions is not None:
+            result = await self.collection.delete_many(self.to_filter(delete_filter), session=session)
+            deleted += result.deleted_count
+        return {"inserted": inserted, "modified": modified, "deleted": deleted, "conflicts": conflicts}
+
+    async def update(
+        self, id: str, data: Dict, expected_version: Optional[int] = None
+    ) -> Dict:
+        """
+        Cập nhật document bằng một find_one_and_update
+
+        Args:
+            id: ID document
+            data: Các field cần cập nhật (field None bị bỏ qua)
+            expected_version: Version client đang giữ; nếu document đã bị
+                ghi bởi request khác thì raise ConflictError (409)
+
+        Returns:
+            Document sau khi cập nhật
+        """
+        if not ObjectId.is_valid(id):
+            raise NotFoundError(f"Document not found: {id}")
+
+        filter_dict: Dict[str, Any] = {"_id": ObjectId(id)}
+        if expected_version is not None:
+            filter_dict["version"] = expected_version
+
         # Loại bỏ các field None
         update_data = {k: v for k, v in data.items() if v is not None}
-        
         if not update_data:
-            return await self.find_by_id(id)
+            doc = await self.collection.find_one(filter_dict, self.projection)
+            if doc is None:
+                await self._raise_write_miss(id, expected_version)
+            return self.from_document(doc)
 
-        result = await self.collection.update_one(
-            {"_id": ObjectId(id)},
-            {"$set": update_data}
+        update_data = self.to_fields(update_data)
+        update_data.update(change_stamp())
+
+        doc = await self.collection.find_one_and_update(
+            filter_dict,
+            {"$set": update_data, "$inc": {"version": 1}},
+            projection=self.projection,
+            return_document=ReturnDocument.AFTER,
         )
-        
-        if result.modified_count == 0:
-            existing = await self.find_by_id(id)
-            if not existing:
-                raise NotFoundError(f"Document not found: {id}")
-        
-        return await self.find_by_id(id)
+        if doc is None:
+            await self._raise_write_miss(id, expected_version)
+        return self.from_document(doc)
+
+    async def delete(self, id: str, expected_version: Optional[int] = None) -> Dict:
+        """
+        Xóa document bằng một find_one_and_delete
 
-    async def delete(self, id: str) -> bool:
-        """Xóa document"""
-        result = await self.collection.delete_one({"_id": ObjectId(id)})
-        if result.deleted_count == 0:
+        Returns:
+            Document đã xóa
+        """
+        if not ObjectId.is_valid(id):
             raise NotFoundError(f"Document not found: {id}")
-        return True
+
+        filter_dict: Dict[str, Any] = {"_id": ObjectId(id)}
+        if expected_version is not None:
+            filter_dict["version"] = expected_version
+
+        doc = await self.collection.find_one_and_delete(filter_dict, projection=self.projection)
+        if doc is None:
+            await self._raise_write_miss(id, expected_version)
+        return self.from_document(doc)
+
+    async def _raise_write_miss(self, id: str, expected_version: Optional[int]):
+        """Write không khớp document: 409 nếu document còn tồn tại, ngược lại 404"""
+        if expected_version is not None:
+            current = await self.find_stamp_by_id(id)
+            if current:
+                raise ConflictError(
+                    f"Version conflict: expected {expected_version}, "
+                    f"current {current.get('version')}"
+                )
+        raise NotFoundError(f"Document not found: {id}")
 
     async def delete_many(self, filter_dict: Dict) -> int:
         """Xóa nhiều documents"""
-        result = await self.collection.delete_many(filter_dict)
+        result = await self.collection.delete_many(self.to_filter(filter_dict))
         return result.deleted_count
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import IndexModel, ReturnDocument
+
+from app.repository.base_repository import BaseRepository
+from app.core.config import configs
+from app.core.database import get_database
+
+
+class ChangeRepository(BaseRepository):
+    """
+    Change log theo tour: mỗi entry là một delta với seq tăng dần trong tour.
+    Seq được cấp từ bộ đếm trong collection tour_change_seqs (không hết hạn).
+    """
+
+    indexes = [
+        IndexModel([("tour_id", 1), ("seq", 1)], unique=True),
+        # Entry cũ hơn CHANGE_LOG_TTL_HOURS bị xóa, client cũ hơn phải resync
+        IndexModel(
+            [("created_at", 1)],
+            expireAfterSeconds=int(configs.CHANGE_LOG_TTL_HOURS * 3600),
+        ),
+    ]
+
+    def __init__(self):
+        super().__init__("tour_changes")
+
+    @property
+    def counters(self):
+        return get_database()["tour_change_seqs"]
+
+    async def append(self, tour_id: str, deltas: List[Dict]) -> List[Dict]:
+        """
+        Ghi các delta của tour, cấp seq liên tiếp bằng một lần $inc
+
+        Returns:
+            Các entry đã ghi (delta kèm seq)
+        """
+        now = datetime.utcnow()
+        counter = await self.counters.find_one_and_update(
+            {"_id": tour_id},
+            {"$inc": {"seq": len(deltas)}, "$set": {"updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        first = counter["seq"] - len(deltas) + 1
+        entries = [
+            {**delta, "tour_id": tour_id, "seq": first + i, "created_at": now}
+            for i, delta in enumerate(deltas)
+        ]
+        await self.collection.insert_many([dict(entry) for entry in entries], ordered=False)
+        return entries
+
+    async def get_counter(self, tour_id: str) -> Optional[Dict]:
+        """Bộ đếm của tour: seq của thay đổi mới nhất và thời điểm cấp"""
+        return await self.counters.find_one({"_id": tour_id})
+
+    async def has_seq(self, tour_id: str, seq: int) -> bool:
+        """Entry seq của tour còn trong log"""
+        return await self.collection.count_documents({"tour_id": tour_id, "seq": seq}, limit=1) > 0
+
+    async def find_since(self, tour_id: str, since: int, limit: int) -> List[Dict]:
+        """Các entry có seq > since theo thứ tự seq"""
+        cursor = (
+            self.collection.find({"tour_id": tour_id, "seq": {"$gt": since}}, {"_id": 0})
+            .sort("seq", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
@@ -1,19 +1,701 @@
-from typing import Optional, Dict, List
+from typing import Any, AsyncIterator, Optional, Dict, List, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import IndexModel, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.write_concern import WriteConcern
 
-from app.repository.base_repository import BaseRepository
-from app.core.database import get_database
+from app.repository.base_repository import (
+    BaseRepository,
+    STAMP_PROJECTION,
+    change_stamp,
+    versioned_filter,
+)
+from app.core.config import configs
+from app.core.exceptions import NotFoundError
+
+# Write concern cho các write không cần read-after-write
+RELAXED_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# Dạng compact: type lưu theo chỉ số trong tuple này (type lạ giữ nguyên string)
+HOTSPOT_TYPES = ("click", "zoom")
+
+# Field tham chiếu scene, lưu dạng ObjectId ở dạng compact
+REFERENCE_FIELDS = ("scene_id", "target_scene")
+
+# Chế độ lưu hotspots (HOTSPOT_STORAGE)
+STORAGE_COLLECTION = "collection"  # collection "hotspots" riêng
+STORAGE_DUAL = "dual"  # ghi vào scene, đọc cả scene lẫn collection (trong lúc migrate)
+STORAGE_EMBEDDED = "embedded"  # mảng "hotspots" trong document scene
+
+
+def _to_object_id(value: Any) -> Any:
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def _encode_type(value: Any) -> Any:
+    return HOTSPOT_TYPES.index(value) if value in HOTSPOT_TYPES else value
+
+
+def encode_hotspot_fields(fields: Dict) -> Dict:
+    """
+    Chuyển field hotspot sang dạng compact: scene_id/target_scene là ObjectId,
+    position là mảng [x, y, z], type là số
+    """
+    encoded = dict(fields)
+    for field in REFERENCE_FIELDS:
+        if field in encoded:
+            encoded[field] = _to_object_id(encoded[field])
+    position = encoded.get("position")
+    if isinstance(position, dict):
+        encoded["position"] = [
+            float(position.get("x", 0)),
+            float(position.get("y", 0)),
+            float(position.get("z", 0)),
+        ]
+    if "type" in encoded:
+        encoded["type"] = _encode_type(encoded["type"])
+    return encoded
+
+
+def encode_hotspot(doc: Dict) -> Dict:
+    """Document hotspot dạng compact (fov_trigger None không được lưu)"""
+    encoded = encode_hotspot_fields(doc)
+    if encoded.get("fov_trigger", 0) is None:
+        del encoded["fov_trigger"]
+    return encoded
+
+
+def encode_element(doc: Dict) -> Dict:
+    """
+    Hotspot nhúng trong mảng `hotspots` của scene: luôn ở dạng compact (chỉ
+    instance mới đọc được dạng nhúng) và không lưu scene_id
+    """
+    element = encode_hotspot(doc)
+    element.pop("scene_id", None)
+    element["_id"] = _to_object_id(element["_id"])
+    return element
+
+
+def decode_hotspot(doc: Dict) -> Dict:
+    """Đọc document hotspot ở cả dạng cũ lẫn dạng compact về dạng cũ"""
+    doc["_id"] = str(doc["_id"])
+    for field in REFERENCE_FIELDS:
+        if isinstance(doc.get(field), ObjectId):
+            doc[field] = str(doc[field])
+    position = doc.get("position")
+    if isinstance(position, list):
+        x, y, z = position
+        doc["position"] = {"x": x, "y": y, "z": z}
+        doc.setdefault("fov_trigger", None)
+    if isinstance(doc.get("type"), int):
+        doc["type"] = HOTSPOT_TYPES[doc["type"]]
+    return doc
+
+
+def _match_any_format(field: str, value: Any) -> Any:
+    """Điều kiện filter khớp giá trị ở cả dạng cũ lẫn dạng compact"""
+    if field in REFERENCE_FIELDS:
+        encode = _to_object_id
+    elif field == "type":
+        encode = _encode_type
+    else:
+        return value
+
+    if isinstance(value, dict):
+        if set(value) != {"$in"}:
+            return value
+        values = value["$in"]
+    else:
+        values = [value]
+    matches = []
+    for v in values:
+        matches.append(v)
+        encoded = encode(v)
+        if encoded is not v:
+            matches.append(encoded)
+    return matches[0] if len(matches) == 1 else {"$in": matches}
 
 
 class HotspotRepository(BaseRepository):
-    """Repository cho Hotspot"""
+    """
+    Repository cho Hotspot
+
+    Theo HOTSPOT_STORAGE, hotspots nằm trong collection "hotspots" hoặc được
+    nhúng trong scene (mảng `hotspots`, ghi bằng $push/$pull và $set theo vị
+    trí). Ở chế độ dual, hotspot mới được nhúng còn hotspot cũ vẫn được đọc,
+    sửa, xóa trong collection cho đến khi migration 002 chuyển hết sang scene.
+    """
+
+    indexes = [
+        IndexModel([("scene_id", 1), ("_id", 1), ("version", 1), ("updated_at", 1)]),
+    ]
+
+    # Index trên scenes cho hotspots nhúng (tìm scene chứa một hotspot)
+    embedded_indexes = [IndexModel([("hotspots._id", 1)])]
 
     def __init__(self):
-        db = get_database()
-        super().__init__(db["hotspots"])
+        super().__init__("hotspots")
+
+    @property
+    def storage(self) -> str:
+        return configs.HOTSPOT_STORAGE
+
+    @property
+    def scenes(self) -> AsyncIOMotorCollection:
+        """Collection scenes (chứa hotspots nhúng)"""
+        return self.collection.database["scenes"]
+
+    async def ensure_indexes(self):
+        await super().ensure_indexes()
+        if self.storage != STORAGE_COLLECTION:
+            await self.scenes.create_indexes(self.embedded_indexes)
+
+    def to_document(self, data: Dict) -> Dict:
+        if not configs.HOTSPOT_COMPACT_WRITES:
+            return data
+        return encode_hotspot(data)
+
+    def to_fields(self, fields: Dict) -> Dict:
+        if not configs.HOTSPOT_COMPACT_WRITES:
+            return fields
+        return encode_hotspot_fields(fields)
+
+    def to_filter(self, filter_dict: Dict) -> Dict:
+        # Trong lúc migrate, cùng một giá trị có thể được lưu ở hai dạng
+        return {
+            field: _match_any_format(field, value)
+            for field, value in filter_dict.items()
+        }
+
+    def from_document(self, doc: Dict) -> Dict:
+        return decode_hotspot(doc)
+
+    # Hotspots nhúng trong scenes
+
+    def _element_fields(self, fields: Dict) -> Dict:
+        """Các field $set của hotspot nhúng (toán tử vị trí $)"""
+        fields = encode_hotspot_fields(fields)
+        fields.pop("scene_id", None)
+        return {f"hotspots.$.{field}": value for field, value in fields.items()}
+
+    def _element(self, scene: Optional[Dict]) -> Optional[Dict]:
+        """Hotspot từ document scene đã project bằng $elemMatch"""
+        if not scene or not scene.get("hotspots"):
+            return None
+        element = scene["hotspots"][0]
+        element["scene_id"] = scene["_id"]
+        return self.from_document(element)
+
+    def _scene_match(self, filter_dict: Dict) -> Dict:
+        """Filter trên scenes: chỉ các scene có thể chứa hotspot khớp filter"""
+        match: Dict[str, Any] = {"hotspots.0": {"$exists": True}}
+        if "scene_id" in filter_dict:
+            match["_id"] = _match_any_format("scene_id", filter_dict["scene_id"])
+        if "_id" in filter_dict:
+            match["hotspots._id"] = filter_dict["_id"]
+        return match
+
+    def _pipeline(
+        self,
+        filter_dict: Dict,
+        sort: Optional[List] = None,
+        skip: int = 0,
+        limit: int = 0,
+        projection: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Aggregation tách hotspots nhúng thành từng document (kèm scene_id)"""
+        pipeline: List[Dict] = [
+            {"$match": self._scene_match(filter_dict)},
+            {"$unwind": "$hotspots"},
+            {"$addFields": {"hotspots.scene_id": "$_id"}},
+            {"$replaceRoot": {"newRoot": "$hotspots"}},
+        ]
+        if filter_dict:
+            pipeline.append({"$match": self.to_filter(filter_dict)})
+        if sort:
+            pipeline.append({"$sort": dict(sort)})
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if projection:
+            pipeline.append({"$project": projection})
+        return pipeline
+
+    async def _find_embedded(
+        self,
+        filter_dict: Dict,
+        skip: int = 0,
+        limit: int = 0,
+        sort: Optional[List] = None,
+        projection: Optional[Dict] = None,
+    ) -> List[Dict]:
+        pipeline = self._pipeline(filter_dict, sort or [("_id", 1)], skip, limit, projection)
+        return await self.scenes.aggregate(pipeline).to_list(length=None)
+
+    async def _count_embedded(self, filter_dict: Dict) -> int:
+        pipeline = self._pipeline(filter_dict) + [{"$count": "count"}]
+        result = await self.scenes.aggregate(pipeline).to_list(length=1)
+        return result[0]["count"] if result else 0
+
+    def _delete_update(self, filter_dict: Dict) -> Tuple[Dict, Dict]:
+        """Filter trên scenes và update $pull các hotspots nhúng khớp filter"""
+        element_filter = {
+            field: value
+            for field, value in self.to_filter(filter_dict).items()
+            if field != "scene_id"
+        }
+        update = (
+            {"$pull": {"hotspots": element_filter}}
+            if element_filter
+            else {"$set": {"hotspots": []}}
+        )
+        return self._scene_match(filter_dict), update
+
+    @staticmethod
+    def _merge(embedded: List[Dict], stored: List[Dict], skip: int, limit: int) -> List[Dict]:
+        """Gộp kết quả từ scenes và collection (chế độ dual) theo thứ tự _id"""
+        docs = sorted(embedded + stored, key=lambda doc: doc["_id"])
+        return docs[skip:skip + limit] if limit else docs[skip:]
+
+    # Đọc
+
+    async def find_all(
+        self,
+        filter_dict: Optional[Dict] = None,
+        skip: int = 0,
+        limit: int = 20,
+        sort: Optional[List] = None
+    ) -> List[Dict]:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().find_all(filter_dict, skip, limit, sort)
+        filter_dict = filter_dict or {}
+        if self.storage == STORAGE_EMBEDDED:
+            docs = await self._find_embedded(filter_dict, skip, limit, sort)
+            return [self.from_document(doc) for doc in docs]
+
+        # Dual: lấy skip + limit documents đầu tiên ở mỗi nơi rồi gộp
+        window = skip + limit if limit else 0
+        embedded = [
+            self.from_document(doc)
+            for doc in await self._find_embedded(filter_dict, 0, window)
+        ]
+        stored = await super().find_all(filter_dict, 0, window, [("_id", 1)])
+        return self._merge(embedded, stored, skip, limit)
+
+    async def iter_all(
+        self,
+        filter_dict: Optional[Dict] = None,
+        limit: int = 0,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict]:
+        """
+        Duyệt hotspots bằng cursor; ở chế độ dual hotspots nhúng được trả về
+        trước, sau đó đến hotspots còn trong collection
+        """
+        count = 0
+        if self.storage != STORAGE_COLLECTION:
+            cursor = self.scenes.aggregate(
+                self._pipeline(filter_dict or {}, [("_id", 1)], limit=limit),
+                batchSize=batch_size,
+            )
+            try:
+                async for doc in cursor:
+                    count += 1
+                    yield self.from_document(doc)
+            finally:
+                await cursor.close()
+        if self.storage == STORAGE_EMBEDDED or (limit and count >= limit):
+            return
+        async for doc in super().iter_all(
+            filter_dict, limit - count if limit else 0, batch_size
+        ):
+            yield doc
+
+    async def count(self, filter_dict: Optional[Dict] = None) -> int:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().count(filter_dict)
+        count = await self._count_embedded(filter_dict or {})
+        if self.storage == STORAGE_DUAL:
+            count += await super().count(filter_dict)
+        return count
+
+    async def find_by_id(self, id: str) -> Optional[Dict]:
+        if self.storage == STORAGE_COLLECTION or not ObjectId.is_valid(id):
+            return await super().find_by_id(id)
+        oid = ObjectId(id)
+        doc = self._element(
+            await self.scenes.find_one(
+                {"hotspots._id": oid}, {"hotspots": {"$elemMatch": {"_id": oid}}}
+            )
+        )
+        if doc is None and self.storage == STORAGE_DUAL:
+            return await super().find_by_id(id)
+        return doc
+
+    async def find_stamp_by_id(self, id: str) -> Optional[Dict]:
+        if self.storage == STORAGE_COLLECTION or not ObjectId.is_valid(id):
+            return await super().find_stamp_by_id(id)
+        oid = ObjectId(id)
+        scene = await self.scenes.find_one(
+            {"hotspots._id": oid}, {"hotspots": {"$elemMatch": {"_id": oid}}}
+        )
+        if scene and scene.get("hotspots"):
+            element = scene["hotspots"][0]
+            return {
+                "_id": id,
+                "version": element.get("version"),
+                "updated_at": element.get("updated_at"),
+            }
+        if self.storage == STORAGE_DUAL:
+            return await super().find_stamp_by_id(id)
+        return None
+
+    async def find_stamps(self, filter_dict: Dict, limit: int = 100) -> List[Dict]:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().find_stamps(filter_dict, limit)
+        stamps = await self._find_embedded(filter_dict, 0, limit, projection=STAMP_PROJECTION)
+        for doc in stamps:
+            doc["_id"] = str(doc["_id"])
+        if self.storage == STORAGE_DUAL:
+            stamps = self._merge(stamps, await super().find_stamps(filter_dict, limit), 0, limit)
+        return stamps
+
+    async def find_one(self, filter_dict: Dict) -> Optional[Dict]:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().find_one(filter_dict)
+        docs = await self.find_all(filter_dict, limit=1)
+        return docs[0] if docs else None
 
     async def find_by_scene_id(self, scene_id: str) -> List[Dict]:
         """Tìm tất cả hotspots của một scene"""
-        return await self.find_all({"scene_id": scene_id}, limit=100)
+        if self.storage == STORAGE_COLLECTION:
+            return await self.find_all({"scene_id": scene_id}, limit=100, sort=[("_id", 1)])
+        grouped = await self.find_grouped_by_scene([scene_id])
+        return grouped[scene_id][:100]
+
+    async def find_grouped_by_scene(self, scene_ids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Hotspots của nhiều scenes, nhóm theo scene_id (theo thứ tự _id), đọc
+        bằng một query thay vì một query cho mỗi scene
+        """
+        grouped: Dict[str, List[Dict]] = {scene_id: [] for scene_id in scene_ids}
+        if not scene_ids:
+            return grouped
+        if self.storage != STORAGE_COLLECTION:
+            ids = [ObjectId(id) for id in scene_ids if ObjectId.is_valid(id)]
+            cursor = self.scenes.find(
+                {"_id": {"$in": ids}, "hotspots.0": {"$exists": True}}, {"hotspots": 1}
+            )
+            async for scene in cursor:
+                for element in scene["hotspots"]:
+                    element["scene_id"] = scene["_id"]
+                    grouped[str(scene["_id"])].append(self.from_document(element))
+        if self.storage != STORAGE_EMBEDDED:
+            async for doc in super().iter_all({"scene_id": {"$in": list(scene_ids)}}):
+                grouped[doc["scene_id"]].append(doc)
+        for hotspots in grouped.values():
+            hotspots.sort(key=lambda doc: doc["_id"])
+        return grouped
+
+    async def find_scene_ids(self, ids: List[str]) -> Dict[str, str]:
+        """scene_id của các hotspots: {hotspot_id: scene_id}"""
+        oids = [ObjectId(id) for id in ids if ObjectId.is_valid(id)]
+        scene_ids: Dict[str, str] = {}
+        if not oids:
+            return scene_ids
+        if self.storage != STORAGE_COLLECTION:
+            wanted = set(oids)
+            cursor = self.scenes.find({"hotspots._id": {"$in": oids}}, {"hotspots._id": 1})
+            async for scene in cursor:
+                for element in scene["hotspots"]:
+                    if element["_id"] in wanted:
+                        scene_ids[str(element["_id"])] = str(scene["_id"])
+        if self.storage != STORAGE_EMBEDDED:
+            cursor = self.collection.find({"_id": {"$in": oids}}, {"scene_id": 1})
+            async for doc in cursor:
+                scene_ids.setdefault(str(doc["_id"]), str(doc["scene_id"]))
+        return scene_ids
+
+    async def find_stamps_by_scene_id(self, scene_id: str) -> List[Dict]:
+        """Lấy change stamps các hotspots của một scene"""
+        return await self.find_stamps({"scene_id": scene_id}, limit=100)
+
+    # Ghi
+
+    async def create(self, data: Dict) -> Dict:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().create(data)
+        data.update(change_stamp())
+        data["version"] = 1
+        data["_id"] = ObjectId()
+        result = await self.scenes.update_one(
+            {"_id": _to_object_id(data["scene_id"])},
+            {"$push": {"hotspots": encode_element(data)}},
+        )
+        if not result.matched_count:
+            raise NotFoundError(f"Scene not found: {data['scene_id']}")
+        data["_id"] = str(data["_id"])
+        return data
+
+    async def insert_many(
+        self, documents: List[Dict], skip_duplicates: bool = False
+    ) -> List[Dict]:
+        """
+        Tạo nhiều hotspots; ở chế độ nhúng mỗi scene nhận một $push $each.
+        Với skip_duplicates, hotspot trùng _id hoặc thuộc scene không tồn tại
+        bị bỏ qua.
+        """
+        if self.storage == STORAGE_COLLECTION:
+            return await super().insert_many(documents, skip_duplicates)
+        if not documents:
+            return []
+        stamp = change_stamp()
+        for doc in documents:
+            doc.update(stamp)
+            doc.setdefault("version", 1)
+            doc.setdefault("_id", ObjectId())
+        scene_ids = list({_to_object_id(doc["scene_id"]) for doc in documents})
+        hotspot_ids = [_to_object_id(doc["_id"]) for doc in documents]
+
+        # Scene đang có và _id hotspot đã tồn tại (đọc trước, không ghi trùng)
+        found_scenes = set()
+        existing = set()
+        async for scene in self.scenes.find({"_id": {"$in": scene_ids}}, {"hotspots._id": 1}):
+            found_scenes.add(scene["_id"])
+            existing.update(element["_id"] for element in scene.get("hotspots", []))
+        if self.storage == STORAGE_DUAL:
+            async for doc in self.collection.find({"_id": {"$in": hotspot_ids}}, {"_id": 1}):
+                existing.add(doc["_id"])
+
+        accepted: List[Dict] = []
+        by_scene: Dict[ObjectId, List[Dict]] = {}
+        for doc, hotspot_id in zip(documents, hotspot_ids):
+            scene_id = _to_object_id(doc["scene_id"])
+            if scene_id not in found_scenes or hotspot_id in existing:
+                if not skip_duplicates:
+                    if scene_id not in found_scenes:
+                        raise NotFoundError(f"Scene not found: {doc['scene_id']}")
+                    raise DuplicateKeyError(f"Duplicate hotspot id: {hotspot_id}")
+                continue
+            existing.add(hotspot_id)
+            accepted.append(doc)
+            by_scene.setdefault(scene_id, []).append(encode_element(doc))
+
+        if by_scene:
+            await self.scenes.bulk_write(
+                [
+                    UpdateOne({"_id": scene_id}, {"$push": {"hotspots": {"$each": elements}}})
+                    for scene_id, elements in by_scene.items()
+                ],
+                ordered=False,
+            )
+        return accepted
+
+    async def apply_diff(
+        self,
+        inserts: List[Dict],
+        updates: Dict[str, Dict],
+        delete_ids: List[str],
+        delete_filter: Optional[Dict] = None,
+        session=None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict:
+        """
+        Áp dụng diff; ở chế độ nhúng là một bulk_write trên scenes ($push theo
+        scene, $set theo vị trí, $pull)
+        """
+        if self.storage == STORAGE_COLLECTION:
+            return await super().apply_diff(
+                inserts, updates, delete_ids, delete_filter, session, versions
+            )
+        stamp = change_stamp()
+        by_scene: Dict[Any, List[Dict]] = {}
+        for doc in inserts:
+            doc.update(stamp)
+            doc["version"] = 1
+            doc.setdefault("_id", ObjectId())
+            by_scene.setdefault(_to_object_id(doc["scene_id"]), []).append(encode_element(doc))
+        operations: List[Any] = [
+            UpdateOne({"_id": scene_id}, {"$push": {"hotspots": {"$each": elements}}})
+            for scene_id, elements in by_scene.items()
+        ]
+        for id, fields in updates.items():
+            operations.append(
+                UpdateOne(
+                    {"hotspots": {"$elemMatch": versioned_filter(id, versions)}},
+                    {
+                        "$set": self._element_fields({**fields, **stamp}),
+                        "$inc": {"hotspots.$.version": 1},
+                    },
+                )
+            )
+        deleted = 0
+        if versions is not None:
+            # Mỗi hotspot một $pull để đếm được hotspot không còn đúng version
+            operations.extend(
+                UpdateOne(
+                    {"hotspots": {"$elemMatch": versioned_filter(id, versions)}},
+                    {"$pull": {"hotspots": {"_id": ObjectId(id)}}},
+                )
+                for id in delete_ids
+            )
+        elif delete_ids:
+            ids = [ObjectId(id) for id in delete_ids]
+            deleted += await self._count_embedded({"_id": {"$in": ids}})
+            operations.append(
+                UpdateMany(
+                    {"hotspots._id": {"$in": ids}},
+                    {"$pull": {"hotspots": {"_id": {"$in": ids}}}},
+                )
+            )
+        if delete_filter and versions is None:
+            deleted += await self._count_embedded(delete_filter)
+            operations.append(UpdateMany(*self._delete_update(delete_filter)))
+
+        conflicts = 0
+        if operations:
+            result = await self.scenes.bulk_write(operations, ordered=False, session=session)
+            if versions is not None:
+                matched = len(by_scene) + len(updates) + len(delete_ids)
+                conflicts = matched - result.matched_count
+                deleted += len(delete_ids) - max(conflicts, 0)
+        if delete_filter and versions is not None:
+            deleted += await self._count_embedded(delete_filter)
+            await self.scenes.update_many(*self._delete_update(delete_filter), session=session)
+
+        if self.storage == STORAGE_DUAL and (updates or delete_ids or delete_filter):
+            # Bản trong collection chỉ là bản phụ: conflict tính theo bản nhúng
+            stored = await super().apply_diff([], updates, delete_ids, delete_filter, session)
+            deleted += stored["deleted"]
+        return {
+            "inserted": len(inserts),
+            "modified": len(updates),
+            "deleted": deleted,
+            "conflicts": conflicts,
+        }
+
+    async def update(
+        self, id: str, data: Dict, expected_version: Optional[int] = None
+    ) -> Dict:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().update(id, data, expected_version)
+        if not ObjectId.is_valid(id):
+            raise NotFoundError(f"Document not found: {id}")
+
+        oid = ObjectId(id)
+        element_filter: Dict[str, Any] = {"_id": oid}
+        if expected_version is not None:
+            element_filter["version"] = expected_version
+        query = {"hotspots": {"$elemMatch": element_filter}}
+        projection = {"hotspots": {"$elemMatch": {"_id": oid}}}
+
+        update_data = {k: v for k, v in data.items() if v is not None}
+        if update_data:
+            scene = await self.scenes.find_one_and_update(
+                query,
+                {
+                    "$set": self._element_fields({**update_data, **change_stamp()}),
+                    "$inc": {"hotspots.$.version": 1},
+                },
+                projection=projection,
+                return_document=ReturnDocument.AFTER,
+            )
+        else:
+            scene = await self.scenes.find_one(query, projection)
+
+        doc = self._element(scene)
+        if doc is None:
+            if self.storage == STORAGE_DUAL:
+                return await super().update(id, data, expected_version)
+            await self._raise_write_miss(id, expected_version)
+        return doc
+
+    async def delete(self, id: str, expected_version: Optional[int] = None) -> Dict:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().delete(id, expected_version)
+        if not ObjectId.is_valid(id):
+            raise NotFoundError(f"Document not found: {id}")
+
+        oid = ObjectId(id)
+        element_filter: Dict[str, Any] = {"_id": oid}
+        if expected_version is not None:
+            element_filter["version"] = expected_version
+        scene = await self.scenes.find_one_and_update(
+            {"hotspots": {"$elemMatch": element_filter}},
+            {"$pull": {"hotspots": {"_id": oid}}},
+            projection={"hotspots": {"$elemMatch": {"_id": oid}}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        doc = self._element(scene)
+        if doc is None:
+            if self.storage == STORAGE_DUAL:
+                return await super().delete(id, expected_version)
+            await self._raise_write_miss(id, expected_version)
+        return doc
+
+    async def delete_many(self, filter_dict: Dict) -> int:
+        if self.storage == STORAGE_COLLECTION:
+            return await super().delete_many(filter_dict)
+        deleted = await self._count_embedded(filter_dict)
+        if deleted:
+            await self.scenes.update_many(*self._delete_update(filter_dict))
+        if self.storage == STORAGE_DUAL:
+            deleted += await super().delete_many(filter_dict)
+        return deleted
+
+    async def bulk_update_positions(
+        self, positions: Dict[str, Dict], relaxed: bool = False
+    ) -> Dict:
+        """
+        Cập nhật vị trí nhiều hotspots bằng một bulk_write (mỗi nơi lưu)
+
+        Args:
+            positions: Dict {hotspot_id: position}
+            relaxed: Dùng write concern nới lỏng (w=1, không chờ journal)
+
+        Returns:
+            Dict với số document matched và modified
+        """
+        totals = {"matched": 0, "modified": 0}
+        if not positions:
+            return totals
+
+        stamp = change_stamp()
+        writes = []
+        if self.storage != STORAGE_EMBEDDED:
+            writes.append((self.collection, [
+                UpdateOne(
+                    {"_id": ObjectId(id)},
+                    {
+                        "$set": {**self.to_fields({"position": position}), **stamp},
+                        "$inc": {"version": 1},
+                    },
+                )
+                for id, position in positions.items()
+            ]))
+        if self.storage != STORAGE_COLLECTION:
+            writes.append((self.scenes, [
+                UpdateOne(
+                    {"hotspots._id": ObjectId(id)},
+                    {
+                        "$set": self._element_fields({"position": position, **stamp}),
+                        "$inc": {"hotspots.$.version": 1},
+                    },
+                )
+                for id, position in positions.items()
+            ]))
+
+        for collection, operations in writes:
+            if relaxed:
+                collection = collection.with_options(write_concern=RELAXED_WRITE_CONCERN)
+            result = await collection.bulk_write(operations, ordered=False)
+            totals["matched"] += result.matched_count
+            totals["modified"] += result.modified_count
+        return totals
 
     async def delete_by_scene_id(self, scene_id: str) -> int:
         """Xóa tất cả hotspots của một scene"""
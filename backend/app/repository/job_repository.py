@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel, DESCENDING
+
+from app.repository.base_repository import BaseRepository
+from app.core.config import configs
+
+
+class JobRepository(BaseRepository):
+    """Repository cho background jobs"""
+
+    indexes = [
+        # Idempotency-Key chỉ trùng trong cùng một loại job
+        IndexModel(
+            [("type", 1), ("idempotency_key", 1)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}},
+        ),
+        IndexModel([("status", 1), ("created_at", DESCENDING)]),
+        # Tự xóa job đã kết thúc sau JOB_RETENTION_DAYS
+        IndexModel(
+            [("finished_at", 1)],
+            expireAfterSeconds=configs.JOB_RETENTION_DAYS * 24 * 3600,
+        ),
+    ]
+
+    def __init__(self):
+        super().__init__("jobs")
+
+    async def find_by_idempotency_key(self, job_type: str, key: str) -> Optional[Dict]:
+        """Tìm job theo loại job và idempotency key"""
+        return await self.find_one({"type": job_type, "idempotency_key": key})
+
+    async def set_fields(self, id: str, fields: Dict) -> None:
+        """Ghi đè một số field của job (không trả về document)"""
+        await self.collection.update_one({"_id": ObjectId(id)}, {"$set": fields})
+
+    async def transition(self, id: str, from_status: List[str], fields: Dict) -> bool:
+        """Đổi trạng thái job nếu trạng thái hiện tại nằm trong from_status"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(id), "status": {"$in": from_status}}, {"$set": fields}
+        )
+        return result.modified_count == 1
+
+    async def heartbeat(self, ids: List[str]) -> None:
+        """Cập nhật heartbeat_at cho các job process này đang giữ"""
+        if not ids:
+            return
+        await self.collection.update_many(
+            {"_id": {"$in": [ObjectId(id) for id in ids]}},
+            {"$set": {"heartbeat_at": datetime.utcnow()}},
+        )
+
+    async def fail_stale(self, before: datetime, reason: str) -> int:
+        """Đánh dấu failed các job queued/running mất heartbeat (process đã chết)"""
+        result = await self.collection.update_many(
+            {"status": {"$in": ["queued", "running"]}, "heartbeat_at": {"$lt": before}},
+            {
+                "$set": {
+                    "status": "failed",
+                    "error": reason,
+                    "finished_at": datetime.utcnow(),
+                }
+            },
+        )
+        return result.modified_count
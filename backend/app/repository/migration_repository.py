@@ -0,0 +1,85 @@
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.repository.base_repository import BaseRepository
+
+
+class MigrationRepository(BaseRepository):
+    """Repository cho trạng thái các schema migration (_id là ID migration)"""
+
+    def __init__(self):
+        super().__init__("migrations")
+
+    async def find_state(self, id: str) -> Optional[Dict]:
+        """Trạng thái của một migration"""
+        return await self.find_one({"_id": id})
+
+    async def claim(self, id: str, lease_seconds: int, defaults: Dict) -> Optional[Dict]:
+        """
+        Giữ quyền chạy migration trong lease_seconds giây
+
+        Returns:
+            Trạng thái migration, None nếu migration đã hoàn tất hoặc đang
+            được chạy ở nơi khác (lease chưa hết hạn)
+        """
+        now = datetime.utcnow()
+        try:
+            doc = await self.collection.find_one_and_update(
+                {
+                    "_id": id,
+                    "status": {"$ne": "completed"},
+                    "$or": [
+                        {"lease_until": {"$lt": now}},
+                        {"lease_until": {"$exists": False}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "status": "running",
+                        "lease_until": now + timedelta(seconds=lease_seconds),
+                    },
+                    "$setOnInsert": {**defaults, "started_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None
+        return doc
+
+    async def checkpoint(self, id: str, lease_seconds: int, fields: Dict[str, Any]):
+        """Lưu tiến độ (last_id, processed, ...) và gia hạn lease"""
+        fields["lease_until"] = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        await self.collection.update_one({"_id": id}, {"$set": fields})
+
+    async def finish(self, id: str, status: str, fields: Dict[str, Any]):
+        """Kết thúc lần chạy (completed hoặc failed), trả lease"""
+        await self.collection.update_one(
+            {"_id": id},
+            {
+                "$set": {**fields, "status": status, "finished_at": datetime.utcnow()},
+                "$unset": {"lease_until": ""},
+            },
+        )
+
+    def target(self, name: str) -> AsyncIOMotorCollection:
+        """Collection mà migration chạy trên đó"""
+        return self.collection.database[name]
+
+    async def collection_sizes(self, name: str) -> Optional[Dict]:
+        """Kích thước dữ liệu và index của collection (bytes), None nếu không lấy được"""
+        try:
+            stats = await self.collection.database.command("collStats", name)
+        except Exception:
+            return None
+        return {
+            "count": stats.get("count", 0),
+            "size": stats.get("size", 0),
+            "avg_obj_size": stats.get("avgObjSize", 0),
+            "storage_size": stats.get("storageSize", 0),
+            "total_index_size": stats.get("totalIndexSize", 0),
+            "index_sizes": stats.get("indexSizes", {}),
+        }
@@ -1,19 +1,69 @@
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List
+from bson import ObjectId
+from pymongo import IndexModel
 
 from app.repository.base_repository import BaseRepository
-from app.core.database import get_database
 
 
 class SceneRepository(BaseRepository):
     """Repository cho Scene"""
 
+    indexes = [
+        IndexModel([("tour_id", 1), ("_id", 1), ("version", 1), ("updated_at", 1)]),
+    ]
+
+    # Hotspots nhúng (HOTSPOT_STORAGE=embedded) được đọc qua HotspotRepository
+    projection = {"hotspots": 0}
+
     def __init__(self):
-        db = get_database()
-        super().__init__(db["scenes"])
+        super().__init__("scenes")
 
     async def find_by_tour_id(self, tour_id: str) -> List[Dict]:
         """Tìm tất cả scenes của một tour"""
-        return await self.find_all({"tour_id": tour_id}, limit=100)
+        return await self.find_all({"tour_id": tour_id}, limit=100, sort=[("_id", 1)])
+
+    async def find_stamps_by_tour_id(self, tour_id: str) -> List[Dict]:
+        """Lấy change stamps các scenes của một tour"""
+        return await self.find_stamps({"tour_id": tour_id}, limit=100)
+
+    async def iter_image_refs(self) -> AsyncIterator[Dict]:
+        """Duyệt ảnh (public_id, URL) và thumbnail mà các scenes đang dùng"""
+        cursor = self.collection.find(
+            {},
+            {
+                "image_public_id": 1,
+                "image_url": 1,
+                "preview.thumbnail_public_id": 1,
+                "preview.thumbnail_url": 1,
+            },
+        ).batch_size(1000)
+        async for doc in cursor:
+            yield doc
+
+    async def find_used_image_ids(self, public_ids: List[str]) -> set:
+        """Các public_id trong danh sách vẫn còn scene dùng (ảnh hoặc thumbnail)"""
+        used = set()
+        cursor = self.collection.find(
+            {
+                "$or": [
+                    {"image_public_id": {"$in": public_ids}},
+                    {"preview.thumbnail_public_id": {"$in": public_ids}},
+                ]
+            },
+            {"image_public_id": 1, "preview.thumbnail_public_id": 1},
+        )
+        async for doc in cursor:
+            used.add(doc.get("image_public_id"))
+            used.add((doc.get("preview") or {}).get("thumbnail_public_id"))
+        return used
+
+    async def find_tour_ids(self, scene_ids: List[str]) -> Dict[str, str]:
+        """tour_id của các scenes: {scene_id: tour_id}"""
+        ids = [ObjectId(id) for id in scene_ids if ObjectId.is_valid(id)]
+        if not ids:
+            return {}
+        cursor = self.collection.find({"_id": {"$in": ids}}, {"tour_id": 1})
+        return {str(doc["_id"]): str(doc.get("tour_id")) async for doc in cursor}
 
     async def delete_by_tour_id(self, tour_id: str) -> int:
         """Xóa tất cả scenes của một tour"""
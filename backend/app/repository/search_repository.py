@@ -0,0 +1,133 @@
+import re
+from typing import Dict, List, Optional
+from datetime import datetime
+from pymongo import IndexModel, ReplaceOne, TEXT
+
+from app.repository.base_repository import BaseRepository
+
+
+class SearchRepository(BaseRepository):
+    """Repository cho search index (tours, scenes, hotspots)"""
+
+    indexes = [
+        IndexModel([("prefixes", 1), ("kind", 1)]),
+        # Fallback chuỗi con của filter tên (regex quét key index, không đọc document)
+        IndexModel([("kind", 1), ("title_folded", 1)]),
+        IndexModel([("ref_id", 1)]),
+        IndexModel([("parent_id", 1)]),
+        IndexModel(
+            [("title_folded", TEXT), ("body_folded", TEXT)],
+            weights={"title_folded": 10, "body_folded": 2},
+            default_language="none",
+            name="search_text",
+        ),
+    ]
+
+    def __init__(self):
+        super().__init__("search_index")
+
+    async def upsert(self, doc: Dict) -> None:
+        """Ghi đè entry search theo _id ("<kind>:<ref_id>")"""
+        doc["updated_at"] = datetime.utcnow()
+        await self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+
+    async def bulk_upsert(self, docs: List[Dict]) -> int:
+        """Ghi đè nhiều entry bằng một bulk_write"""
+        if not docs:
+            return 0
+        now = datetime.utcnow()
+        operations = []
+        for doc in docs:
+            doc["updated_at"] = now
+            operations.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def find_by_prefixes(
+        self,
+        prefixes: List[str],
+        kinds: Optional[List[str]],
+        limit: int,
+        scan_limit: int,
+    ) -> List[Dict]:
+        """
+        Tìm entry chứa tất cả prefix (dùng multikey index trên prefixes)
+
+        Chỉ `scan_limit` entry đầu tiên theo index được chấm điểm ước lượng: mỗi
+        prefix là nguyên từ trong tiêu đề (3), đầu một từ trong tiêu đề (2) hay
+        chỉ ở nội dung (1), rồi tiêu đề ngắn hơn; trả về `limit` entry điểm cao nhất.
+        """
+        filter_dict: Dict = {"prefixes": {"$all": prefixes}}
+        if kinds:
+            filter_dict["kind"] = {"$in": kinds}
+        title_scores = [
+            {
+                "$cond": [
+                    self._title_match(rf"(^| ){re.escape(prefix)}( |$)"),
+                    3,
+                    {"$cond": [self._title_match(rf"(^| ){re.escape(prefix)}"), 2, 1]},
+                ]
+            }
+            for prefix in prefixes
+        ]
+        pipeline = [
+            {"$match": filter_dict},
+            # Giới hạn trước khi chấm điểm: prefix ngắn, phổ biến không quét hết index
+            {"$limit": scan_limit},
+            {"$project": {"prefixes": 0}},
+            {
+                "$addFields": {
+                    "rank": {"$add": title_scores},
+                    "title_length": {"$strLenCP": "$title_folded"},
+                }
+            },
+            {"$sort": {"rank": -1, "title_length": 1, "ref_id": 1}},
+            {"$limit": limit},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+    @staticmethod
+    def _title_match(pattern: str) -> Dict:
+        return {"$regexMatch": {"input": "$title_folded", "regex": pattern}}
+
+    async def exists(self, filter_dict: Dict) -> bool:
+        """Có ít nhất một entry khớp filter"""
+        return await self.collection.find_one(filter_dict, {"_id": 1}) is not None
+
+    async def find_ref_ids(
+        self, filter_dict: Dict, skip: int = 0, limit: int = 0
+    ) -> List[str]:
+        """ID document gốc của các entry khớp filter, theo thứ tự ref_id (limit=0: tất cả)"""
+        cursor = (
+            self.collection.find(filter_dict, {"ref_id": 1})
+            .sort("ref_id", 1)
+            .skip(skip)
+            .limit(limit)
+        )
+        return [doc["ref_id"] async for doc in cursor]
+
+    async def find_by_text(
+        self, query: str, kinds: Optional[List[str]], limit: int
+    ) -> List[Dict]:
+        """Tìm entry bằng text index, sắp xếp theo textScore"""
+        filter_dict: Dict = {"$text": {"$search": query}}
+        if kinds:
+            filter_dict["kind"] = {"$in": kinds}
+        cursor = (
+            self.collection.find(
+                filter_dict, {"prefixes": 0, "score": {"$meta": "textScore"}}
+            )
+            .sort([("score", {"$meta": "textScore"})])
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def delete_by_refs(self, ids: List[str]) -> int:
+        """Xóa entry của các document và con trực tiếp của chúng"""
+        return await self.delete_many(
+            {"$or": [{"ref_id": {"$in": ids}}, {"parent_id": {"$in": ids}}]}
+        )
+
+    async def delete_children(self, parent_id: str) -> int:
+        """Xóa entry con trực tiếp của một document"""
+        return await self.delete_many({"parent_id": parent_id})
@@ -1,28 +1,48 @@
 from typing import Optional, Dict, List
 from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel, UpdateOne, DESCENDING
 
 from app.repository.base_repository import BaseRepository
-from app.core.database import get_database
 
 
 class TourRepository(BaseRepository):
     """Repository cho Tour"""
 
+    indexes = [IndexModel([("views", DESCENDING)])]
+
+    # Lượt xem không đổi version nên không nằm trong response có ETag/cache
+    projection = {"views": 0}
+
     def __init__(self):
-        db = get_database()
-        super().__init__(db["tours"])
+        super().__init__("tours")
 
     async def create(self, data: Dict) -> Dict:
         """Tạo tour mới với timestamps"""
         data["created_at"] = datetime.utcnow()
-        data["updated_at"] = datetime.utcnow()
         return await super().create(data)
 
-    async def update(self, id: str, data: Dict) -> Optional[Dict]:
-        """Cập nhật tour với timestamp"""
-        data["updated_at"] = datetime.utcnow()
-        return await super().update(id, data)
-
     async def find_by_name(self, name: str) -> Optional[Dict]:
         """Tìm tour theo tên"""
         return await self.find_one({"name": name})
+
+    async def increment_views(self, counts: Dict[str, int]) -> int:
+        """
+        Cộng lượt xem cho nhiều tours bằng một bulk_write
+
+        Lượt xem không phải thay đổi nội dung nên không đổi version/updated_at.
+        """
+        operations = [
+            UpdateOne({"_id": ObjectId(id)}, {"$inc": {"views": count}})
+            for id, count in counts.items()
+            if ObjectId.is_valid(id)
+        ]
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def find_most_viewed(self, limit: int) -> List[str]:
+        """ID của limit tours có nhiều lượt xem nhất"""
+        cursor = self.collection.find({}, {"_id": 1}).sort("views", DESCENDING).limit(limit)
+        return [str(doc["_id"]) async for doc in cursor]
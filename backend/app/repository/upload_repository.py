@@ -0,0 +1,36 @@
+from typing import Dict, List
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+from app.repository.base_repository import BaseRepository
+
+
+class UploadRepository(BaseRepository):
+    """Repository cho session resumable upload"""
+
+    indexes = [IndexModel([("expires_at", 1)])]
+
+    def __init__(self):
+        super().__init__("uploads")
+
+    async def unmark_chunk(self, id: str, index: int) -> None:
+        """Bỏ chunk khỏi danh sách đã nhận (trước khi ghi đè)"""
+        await self.collection.update_one(
+            {"_id": ObjectId(id)}, {"$pull": {"received": index}}
+        )
+
+    async def mark_chunk(self, id: str, index: int, expires_at: datetime) -> None:
+        """Đánh dấu chunk đã ghi xong, gia hạn session"""
+        await self.collection.update_one(
+            {"_id": ObjectId(id), "status": "uploading"},
+            {"$addToSet": {"received": index}, "$set": {"expires_at": expires_at}},
+        )
+
+    async def set_fields(self, id: str, fields: Dict) -> None:
+        """Ghi đè một số field của session (không trả về document)"""
+        await self.collection.update_one({"_id": ObjectId(id)}, {"$set": fields})
+
+    async def find_expired(self, now: datetime, limit: int = 100) -> List[Dict]:
+        """Các session đã hết hạn"""
+        return await self.find_all({"expires_at": {"$lt": now}}, limit=limit)
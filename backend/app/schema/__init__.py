@@ -1,3 +1,6 @@
 from app.schema.tour_schema import *
 from app.schema.scene_schema import *
 from app.schema.hotspot_schema import *
+from app.schema.search_schema import *
+from app.schema.job_schema import *
+from app.schema.upload_schema import *
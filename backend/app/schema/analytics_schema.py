@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.core.config import configs
+
+EventType = Literal["scene_enter", "scene_exit", "hotspot_click", "dwell"]
+
+
+class AnalyticsEvent(BaseModel):
+    """Một event của viewer"""
+
+    type: EventType = Field(..., description="scene_enter | scene_exit | hotspot_click | dwell")
+    tour_id: str = Field(..., min_length=1, max_length=64)
+    scene_id: Optional[str] = Field(None, max_length=64)
+    hotspot_id: Optional[str] = Field(None, max_length=64, description="Hotspot được click")
+    session_id: Optional[str] = Field(None, max_length=64, description="Phiên xem của viewer")
+    ts: Optional[datetime] = Field(None, description="Thời điểm phía client (mặc định giờ server)")
+    dwell_ms: Optional[int] = Field(None, ge=0, le=86400000, description="Thời gian ở lại scene (ms)")
+
+
+class AnalyticsBatch(BaseModel):
+    """Batch event gửi một lần"""
+
+    events: List[AnalyticsEvent] = Field(..., max_length=configs.ANALYTICS_MAX_BATCH)
+
+
+class AnalyticsIngestResult(BaseModel):
+    accepted: int
+    dropped: int = Field(..., description="Event bị bỏ do buffer đầy")
+
+
+class SceneStats(BaseModel):
+    scene_id: str
+    enters: int
+    exits: int
+    hotspot_clicks: int
+    dwell_avg_ms: Optional[float] = None
+
+
+class HotspotStats(BaseModel):
+    hotspot_id: str
+    scene_id: Optional[str] = None
+    clicks: int
+
+
+class AnalyticsSummary(BaseModel):
+    """Thống kê scenes và hotspots của tour trong khoảng thời gian"""
+
+    tour_id: str
+    start: datetime
+    end: datetime
+    scenes: List[SceneStats] = []
+    hotspots: List[HotspotStats] = []
+
+
+class AnalyticsPoint(BaseModel):
+    ts: datetime = Field(..., description="Đầu bucket (UTC)")
+    count: int
+    dwell_avg_ms: Optional[float] = None
+
+
+class AnalyticsTimeseries(BaseModel):
+    """Số event theo thời gian"""
+
+    tour_id: str
+    type: EventType
+    bucket: str
+    start: datetime
+    end: datetime
+    points: List[AnalyticsPoint] = []
@@ -0,0 +1,53 @@
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.core.config import configs
+
+
+class BatchOperation(BaseModel):
+    """Một thao tác trong batch"""
+
+    op: Literal["create", "update", "delete"]
+    resource: Literal["tour", "scene", "hotspot"]
+    id: Optional[str] = Field(
+        None, description="ID (update/delete), hoặc `$<ref>` của document tạo trong batch"
+    )
+    ref: Optional[str] = Field(
+        None, description="ID tạm của document tạo mới, các thao tác khác dùng `$<ref>`"
+    )
+    data: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Field như body của POST/PATCH tương ứng; tour_id, scene_id, "
+        "target_scene, entry_scene có thể là `$<ref>`",
+    )
+    version: Optional[int] = Field(None, description="Version đang giữ (409 nếu đã bị sửa)")
+
+
+class BatchRequest(BaseModel):
+    """Danh sách thao tác theo thứ tự"""
+
+    operations: List[BatchOperation] = Field(
+        ..., min_length=1, max_length=configs.BATCH_MAX_OPERATIONS
+    )
+
+
+class BatchOperationResult(BaseModel):
+    """Kết quả của một thao tác"""
+
+    index: int
+    op: str
+    resource: str
+    ref: Optional[str] = None
+    id: Optional[str] = None
+    status: int = Field(..., description="201 created, 200 updated/deleted, hoặc mã lỗi")
+    version: Optional[int] = Field(None, description="Version sau batch (None nếu đã xóa)")
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    """Kết quả batch: hoặc mọi thao tác được ghi, hoặc không thao tác nào"""
+
+    applied: bool
+    transaction: bool = Field(..., description="Các write được ghi trong một transaction")
+    refs: Dict[str, str] = Field({}, description="ID của các document tạo mới theo ref")
+    results: List[BatchOperationResult] = []
@@ -31,6 +31,7 @@ class HotspotUpdate(BaseModel):
     target_scene: Optional[str] = None
     label: Optional[str] = None
     fov_trigger: Optional[float] = None
+    version: Optional[int] = Field(None, description="Version đang giữ (409 nếu đã bị sửa)")
 
 
 class HotspotInDB(HotspotBase):
@@ -47,6 +48,30 @@ class HotspotResponse(HotspotBase):
     """Schema response cho hotspot"""
     id: str
     scene_id: str
+    version: Optional[int] = None
+
+
+class HotspotPositionUpdate(BaseModel):
+    """Vị trí mới của một hotspot trong batch"""
+    id: str = Field(..., description="ID của hotspot")
+    position: Position = Field(..., description="Tọa độ 3D mới")
+
+
+class HotspotBatchPositionUpdate(BaseModel):
+    """Schema để cập nhật vị trí nhiều hotspots"""
+    items: List[HotspotPositionUpdate] = Field(..., description="Danh sách vị trí mới")
+    relaxed: bool = Field(
+        default=False,
+        description="Gom write phía server và không chờ ghi xong (không cần read-after-write)",
+    )
+
+
+class HotspotBatchPositionResult(BaseModel):
+    """Kết quả cập nhật vị trí nhiều hotspots"""
+    accepted: int
+    queued: bool
+    matched: Optional[int] = None
+    modified: Optional[int] = None
 
 
 class FindHotspot(FindBase):
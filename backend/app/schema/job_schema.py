@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class JobProgress(BaseModel):
+    """Tiến độ của job"""
+    done: int = 0
+    total: int = 0
+    message: str = ""
+
+
+class JobResponse(BaseModel):
+    """Schema response cho background job"""
+    id: str
+    type: str
+    status: str = Field(..., description="queued, running, succeeded, failed hoặc cancelled")
+    params: Dict[str, Any] = {}
+    progress: JobProgress = Field(default_factory=JobProgress)
+    error: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class FindJobResult(BaseModel):
+    """Danh sách jobs"""
+    items: List[JobResponse] = []
+    total: int
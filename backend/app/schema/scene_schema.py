@@ -1,5 +1,5 @@
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from app.schema.base_schema import FindBase, SearchOptions
 from app.schema.hotspot_schema import HotspotResponse
 
@@ -12,6 +12,31 @@ class InitialView(BaseModel):
     fov: float = Field(default=100, description="Field of View")
 
 
+class ScenePreview(BaseModel):
+    """Preview tạo khi upload ảnh (hiển thị trước khi tải panorama)"""
+
+    thumbnail_url: Optional[str] = Field(None, description="URL thumbnail JPEG nhỏ")
+    blurhash: Optional[str] = Field(None, description="Blurhash của ảnh")
+    dominant_color: Optional[str] = Field(None, description="Màu chủ đạo (#rrggbb)")
+    width: Optional[int] = Field(None, description="Chiều rộng ảnh gốc")
+    height: Optional[int] = Field(None, description="Chiều cao ảnh gốc")
+
+
+class ImageTranscode(BaseModel):
+    """Báo cáo transcode ảnh panorama khi upload"""
+
+    source_format: Optional[str] = Field(None, description="Định dạng file upload")
+    source_width: Optional[int] = None
+    source_height: Optional[int] = None
+    source_bytes: Optional[int] = Field(None, description="Dung lượng file upload")
+    format: Optional[str] = Field(None, description="Định dạng ảnh đã lưu")
+    width: Optional[int] = None
+    height: Optional[int] = None
+    quality: Optional[int] = Field(None, description="Quality encode (None nếu giữ file gốc)")
+    bytes: Optional[int] = Field(None, description="Dung lượng ảnh đã lưu")
+    saved_bytes: Optional[int] = Field(None, description="Số byte tiết kiệm được")
+
+
 class SceneBase(BaseModel):
     """Base schema cho Scene"""
 
@@ -36,6 +61,7 @@ class SceneUpdate(BaseModel):
     description: Optional[str] = None
     image_url: Optional[str] = None
     initial_view: Optional[InitialView] = None
+    version: Optional[int] = Field(None, description="Version đang giữ (409 nếu đã bị sửa)")
 
 
 class SceneInDB(SceneBase):
@@ -57,6 +83,15 @@ class SceneResponse(SceneBase):
     id: str
     tour_id: str
     image_url: Optional[str] = None
+    preview: Optional[ScenePreview] = None
+    image_transcode: Optional[ImageTranscode] = None
+    version: Optional[int] = None
+
+    @field_validator("preview", mode="before")
+    @classmethod
+    def empty_preview(cls, value):
+        # Scene đổi ảnh qua URL lưu preview rỗng
+        return value or None
 
 
 class SceneWithHotspots(SceneResponse):
@@ -0,0 +1,18 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class SearchHit(BaseModel):
+    """Một kết quả tìm kiếm"""
+    kind: str = Field(..., description="Loại: tour, scene hoặc hotspot")
+    id: str = Field(..., description="ID của document")
+    parent_id: Optional[str] = Field(None, description="tour_id của scene, scene_id của hotspot")
+    title: str = Field(..., description="Tên tour/scene hoặc nhãn hotspot")
+    body: str = Field("", description="Mô tả scene")
+    score: float = Field(..., description="Điểm xếp hạng")
+
+
+class SearchResult(BaseModel):
+    """Kết quả tìm kiếm"""
+    items: List[SearchHit] = []
+    total: int
@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
 from app.schema.base_schema import BaseSchema, FindBase, SearchOptions
@@ -20,6 +20,7 @@ class TourUpdate(BaseModel):
     """Schema để cập nhật tour"""
     name: Optional[str] = None
     entry_scene: Optional[str] = None
+    version: Optional[int] = Field(None, description="Version đang giữ (409 nếu đã bị sửa)")
 
 
 class TourInDB(TourBase):
@@ -36,6 +37,7 @@ class TourInDB(TourBase):
 class TourResponse(TourBase):
     """Schema response cho tour"""
     id: str
+    version: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -52,6 +54,28 @@ class TourExport(BaseModel):
     scenes: Dict[str, dict]
 
 
+class TourChange(BaseModel):
+    """Thay đổi (đã gộp) của một document từ seq since"""
+    id: str
+    op: str = Field(..., description="create | update | delete")
+    scene_id: Optional[str] = Field(None, description="Scene chứa hotspot")
+    version: Optional[int] = None
+    fields: Optional[Dict[str, Any]] = Field(
+        None, description="create: cả document, update: các field đã đổi"
+    )
+
+
+class TourChanges(BaseModel):
+    """Delta sync: thay đổi của tour sau seq since"""
+    tour_id: str
+    since: int
+    seq: int = Field(..., description="Seq dùng cho lần gọi sau (since=seq)")
+    resync: bool = Field(False, description="True: tải lại cả tour (export/full)")
+    tour: Optional[TourChange] = None
+    scenes: List[TourChange] = []
+    hotspots: List[TourChange] = []
+
+
 class FindTour(FindBase):
     """Schema để tìm kiếm tour"""
     name: Optional[str] = None
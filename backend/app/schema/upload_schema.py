@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class UploadCreate(BaseModel):
+    """Schema để bắt đầu resumable upload"""
+
+    filename: str = Field(..., description="Tên file")
+    size: int = Field(..., gt=0, description="Dung lượng file (bytes)")
+    content_type: str = Field("image/jpeg", description="MIME type, phải là image/*")
+    sha256: Optional[str] = Field(None, description="SHA-256 (hex) của cả file, kiểm tra khi complete")
+
+
+class UploadResponse(BaseModel):
+    """Trạng thái resumable upload"""
+
+    id: str
+    filename: str
+    content_type: str
+    size: int
+    chunk_size: int = Field(..., description="Kích thước mỗi chunk (chunk cuối có thể nhỏ hơn)")
+    total_chunks: int
+    status: str = Field(..., description="uploading hoặc completed")
+    received_bytes: int = 0
+    missing: List[int] = Field([], description="Các chunk chưa nhận được")
+    sha256: Optional[str] = None
+    expires_at: Optional[datetime] = None
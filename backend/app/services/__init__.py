@@ -1,3 +1,11 @@
 from app.services.tour_service import TourService
 from app.services.scene_service import SceneService
 from app.services.hotspot_service import HotspotService
+from app.services.search_service import SearchService
+from app.services.job_service import JobService
+from app.services.bundle_service import BundleService
+from app.services.backup_service import BackupService
+from app.services.migration_service import MigrationService
+from app.services.image_service import ImageService
+from app.services.upload_service import UploadService
+from app.services.image_gc_service import ImageGCService
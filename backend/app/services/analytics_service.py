@@ -0,0 +1,236 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.repository.analytics_repository import AnalyticsRepository
+from app.core.config import configs
+from app.core.exceptions import BadRequestError
+from app.core.tracing import instrument
+
+# Event có ts lệch về tương lai quá mức này được tính theo giờ server
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+# Số điểm tối đa của một timeseries
+MAX_SERIES_POINTS = 10000
+
+BUCKET_MINUTES = {"minute": 1, "hour": 60, "day": 1440}
+
+
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    """Datetime UTC không kèm tzinfo (dạng lưu trong database)"""
+    if ts is not None and ts.tzinfo is not None:
+        ts = (ts - ts.utcoffset()).replace(tzinfo=None)
+    return ts
+
+
+def _dwell_avg(dwell_ms: int, dwell_count: int) -> Optional[float]:
+    return round(dwell_ms / dwell_count, 1) if dwell_count else None
+
+
+@instrument
+class AnalyticsService:
+    """
+    Viewer analytics: event (vào/rời scene, click hotspot, dwell) được gom
+    trong bộ nhớ, cộng dồn rollup theo phút ngay khi nhận và flush định kỳ
+    (insert_many event gốc + upsert rollup) mà không chờ database trong request
+
+    Buffer chỉ được đọc/ghi trên event loop nên không cần lock; flush đổi
+    buffer mới trước khi ghi nên event đến trong lúc flush vào lần sau.
+    """
+
+    def __init__(self):
+        self.repository = AnalyticsRepository()
+        self._events: List[Dict] = []
+        self._rollups: Dict[tuple, List[int]] = {}
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.accepted = 0
+        self.dropped = 0
+        self.flushed_events = 0
+        self.flushed_rollups = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+
+    def ingest(self, events: List[Dict]) -> Dict:
+        """
+        Nhận một batch event, trả về ngay (không I/O)
+
+        Buffer đầy (ANALYTICS_BUFFER_SIZE event chờ flush) thì event bị bỏ và
+        đếm vào `dropped` thay vì làm chậm request.
+        """
+        now = datetime.utcnow()
+        skew_limit = now + MAX_CLOCK_SKEW
+        room = configs.ANALYTICS_BUFFER_SIZE - self._pending
+        accepted = events[:max(room, 0)]
+        store = configs.ANALYTICS_STORE_EVENTS
+        rollups = self._rollups
+
+        for event in accepted:
+            ts = _utc(event.get("ts"))
+            if ts is None or ts > skew_limit:
+                ts = now
+            dwell_ms = event.get("dwell_ms")
+            key = (
+                event["tour_id"],
+                ts.replace(second=0, microsecond=0),
+                event["type"],
+                event.get("scene_id"),
+                event.get("hotspot_id"),
+            )
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = [0, 0, 0]
+            rollup[0] += 1
+            if dwell_ms is not None:
+                rollup[1] += dwell_ms
+                rollup[2] += 1
+            if store:
+                event["ts"] = ts
+                event["received_at"] = now
+                self._events.append(event)
+
+        self._pending += len(accepted)
+        self.accepted += len(accepted)
+        self.dropped += len(events) - len(accepted)
+        if accepted and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return {"accepted": len(accepted), "dropped": len(events) - len(accepted)}
+
+    async def _run(self):
+        # Lặp lại nếu có event mới đến trong lúc đang flush
+        while self._pending:
+            try:
+                # close() đánh thức để flush ngay
+                await asyncio.wait_for(self._wake.wait(), configs.ANALYTICS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        """Ghi các event và rollup đang chờ (lỗi chỉ được log và đếm)"""
+        if not self._pending:
+            return
+        events, self._events = self._events, []
+        rollups, self._rollups = self._rollups, {}
+        pending, self._pending = self._pending, 0
+
+        start = time.perf_counter()
+        try:
+            # Rollup trước: query chỉ đọc rollup, event gốc để phân tích sau
+            self.flushed_rollups += await self.repository.upsert_rollups(rollups)
+            self.flushed_events += await self.repository.insert_events(events)
+        except Exception as e:
+            self.failed += pending
+            print(f"Analytics flush failed ({pending} events): {e}")
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    async def close(self):
+        """Chờ lần flush đang chạy và flush phần còn lại"""
+        self._wake.set()
+        if self._task and not self._task.done():
+            await self._task
+        await self.flush()
+
+    def _range(self, start: Optional[datetime], end: Optional[datetime], days: int):
+        end = _utc(end) or datetime.utcnow()
+        start = _utc(start) or end - timedelta(days=days)
+        if start >= end:
+            raise BadRequestError("start must be before end")
+        return start, end
+
+    async def summary(
+        self, tour_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Thống kê của tour trong [start, end) (mặc định 7 ngày gần nhất)
+
+        Returns:
+            Dict với scenes (lượt vào/rời, dwell, số click hotspot trong scene)
+            và hotspots (số click), sắp xếp giảm dần
+        """
+        start, end = self._range(start, end, 7)
+        scenes: Dict[str, Dict] = {}
+        hotspots: Dict[str, Dict] = {}
+        for row in await self.repository.aggregate_totals(tour_id, start, end):
+            key = row["_id"]
+            scene_id = key.get("scene_id")
+            if scene_id:
+                scene = scenes.setdefault(scene_id, {
+                    "scene_id": scene_id,
+                    "enters": 0,
+                    "exits": 0,
+                    "hotspot_clicks": 0,
+                    "dwell_ms": 0,
+                    "dwell_count": 0,
+                })
+                if key["type"] == "scene_enter":
+                    scene["enters"] += row["count"]
+                elif key["type"] == "scene_exit":
+                    scene["exits"] += row["count"]
+                elif key["type"] == "hotspot_click":
+                    scene["hotspot_clicks"] += row["count"]
+                scene["dwell_ms"] += row["dwell_ms"]
+                scene["dwell_count"] += row["dwell_count"]
+            if key["type"] == "hotspot_click" and key.get("hotspot_id"):
+                hotspot = hotspots.setdefault(key["hotspot_id"], {
+                    "hotspot_id": key["hotspot_id"], "scene_id": scene_id, "clicks": 0
+                })
+                hotspot["clicks"] += row["count"]
+
+        for scene in scenes.values():
+            scene["dwell_avg_ms"] = _dwell_avg(scene.pop("dwell_ms"), scene.pop("dwell_count"))
+        return {
+            "tour_id": tour_id,
+            "start": start,
+            "end": end,
+            "scenes": sorted(scenes.values(), key=lambda s: s["enters"], reverse=True),
+            "hotspots": sorted(hotspots.values(), key=lambda h: h["clicks"], reverse=True),
+        }
+
+    async def timeseries(
+        self,
+        tour_id: str,
+        type: str,
+        bucket: str = "hour",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        scene_id: Optional[str] = None,
+        hotspot_id: Optional[str] = None,
+    ) -> Dict:
+        """Số event (và dwell trung bình) theo bucket minute | hour | day"""
+        start, end = self._range(start, end, 1)
+        if (end - start) / timedelta(minutes=BUCKET_MINUTES[bucket]) > MAX_SERIES_POINTS:
+            raise BadRequestError(f"Range too large for bucket {bucket} (max {MAX_SERIES_POINTS} points)")
+        rows = await self.repository.aggregate_series(
+            tour_id, type, start, end, bucket, scene_id, hotspot_id
+        )
+        return {
+            "tour_id": tour_id,
+            "type": type,
+            "bucket": bucket,
+            "start": start,
+            "end": end,
+            "points": [
+                {
+                    "ts": row["_id"],
+                    "count": row["count"],
+                    "dwell_avg_ms": _dwell_avg(row["dwell_ms"], row["dwell_count"]),
+                }
+                for row in rows
+            ],
+        }
+
+    def stats(self) -> Dict:
+        """Số event đã nhận/bỏ/ghi và phần đang chờ flush"""
+        return {
+            "pending": self._pending,
+            "pending_rollups": len(self._rollups),
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "flushed_events": self.flushed_events,
+            "flushed_rollups": self.flushed_rollups,
+            "failed": self.failed,
+            "last_flush_ms": self.last_flush_ms,
+        }
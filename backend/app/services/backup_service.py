@@ -0,0 +1,314 @@
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from starlette.concurrency import run_in_threadpool
+
+from app.repository.tour_repository import TourRepository
+from app.repository.scene_repository import SceneRepository
+from app.repository.hotspot_repository import HotspotRepository
+from app.services.search_service import SearchService
+from app.services.change_service import ChangeService
+from app.services.tour_service import (
+    ProgressCallback,
+    _noop_progress,
+    format_scene,
+    preview_fields,
+)
+from app.core.cache import tour_payload_cache
+from app.core.config import configs
+from app.core.container import container
+from app.core.exceptions import BadRequestError
+from app.core.tracing import instrument
+
+BACKUP_FORMAT = "novaland-backup"
+BACKUP_VERSION = 1
+
+# Số dòng đọc (và parse) mỗi lần chạy trong threadpool khi restore
+READ_LINES = 200
+
+
+def _dumps(data: Dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _read_entries(reader: BinaryIO, count: int) -> List[Tuple[Dict, Optional[bytes]]]:
+    """Đọc và parse tối đa count dòng, kèm bytes chuẩn hóa của data (dòng tour)"""
+    entries = []
+    for line in reader:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            raise BadRequestError("Invalid backup: malformed line")
+        data = _dumps(entry["data"]) if entry.get("type") == "tour" else None
+        entries.append((entry, data))
+        if len(entries) >= count:
+            break
+    return entries
+
+
+@instrument
+class BackupService:
+    """
+    Backup/restore nhiều tours dạng archive NDJSON nén gzip
+
+    Archive gồm nhiều gzip member nối tiếp (mỗi member ~BACKUP_CHUNK_BYTES):
+    dòng header, mỗi tour một dòng (format export + id, kèm sha256) và dòng
+    trailer chứa số lượng và sha256 của toàn bộ các dòng tour.
+    """
+
+    def __init__(self):
+        self.tour_repository = TourRepository()
+        self.scene_repository = SceneRepository()
+        self.hotspot_repository = HotspotRepository()
+        self.search_service = container.get(SearchService)
+
+    async def stream_backup(self, filter_dict: Optional[Dict] = None) -> AsyncIterator[bytes]:
+        """Stream archive backup các tours khớp filter (tất cả nếu không có)"""
+        filter_dict = filter_dict or {}
+        digest = hashlib.sha256()
+        counts = {"tours": 0, "scenes": 0, "hotspots": 0}
+        buffer = bytearray()
+
+        header = {
+            "type": "header",
+            "format": BACKUP_FORMAT,
+            "version": BACKUP_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "tours": await self.tour_repository.count(filter_dict),
+        }
+        buffer += _dumps(header) + b"\n"
+
+        async for record in self._iter_records(filter_dict):
+            data = _dumps(record)
+            line = b'{"type":"tour","sha256":"%s","data":%s}\n' % (
+                hashlib.sha256(data).hexdigest().encode(),
+                data,
+            )
+            digest.update(data)
+            counts["tours"] += 1
+            counts["scenes"] += len(record["scenes"])
+            counts["hotspots"] += sum(len(s["hotspots"]) for s in record["scenes"].values())
+
+            buffer += line
+            if len(buffer) >= configs.BACKUP_CHUNK_BYTES:
+                yield await run_in_threadpool(gzip.compress, bytes(buffer), 6)
+                buffer.clear()
+
+        trailer = {"type": "trailer", **counts, "sha256": digest.hexdigest()}
+        buffer += _dumps(trailer) + b"\n"
+        yield await run_in_threadpool(gzip.compress, bytes(buffer), 6)
+
+    async def _iter_records(self, filter_dict: Dict) -> AsyncIterator[Dict]:
+        """
+        Tạo record export của từng tour theo thứ tự _id, tối đa
+        BACKUP_WORKERS tours được đọc song song
+        """
+        window = max(1, configs.BACKUP_WORKERS)
+        pending: deque = deque()
+        tours = self.tour_repository.iter_all(filter_dict)
+        try:
+            async for tour in tours:
+                pending.append(asyncio.create_task(self._load_record(tour)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await tours.aclose()
+
+    async def _load_record(self, tour: Dict) -> Dict:
+        """Record export của một tour: 2 truy vấn (scenes, hotspots theo $in)"""
+        scenes = [s async for s in self.scene_repository.iter_all({"tour_id": tour["_id"]})]
+        hotspots_by_scene: Dict[str, List[Dict]] = {s["_id"]: [] for s in scenes}
+        if scenes:
+            async for hotspot in self.hotspot_repository.iter_all(
+                {"scene_id": {"$in": list(hotspots_by_scene)}}
+            ):
+                hotspots_by_scene[hotspot["scene_id"]].append(hotspot)
+
+        records = {}
+        for scene in scenes:
+            record = format_scene(scene, hotspots_by_scene[scene["_id"]])
+            if scene.get("image_public_id"):
+                record["imagePublicId"] = scene["image_public_id"]
+            if (scene.get("preview") or {}).get("thumbnail_public_id"):
+                record["preview"]["thumbnailPublicId"] = scene["preview"]["thumbnail_public_id"]
+            records[scene["_id"]] = record
+
+        created_at = tour.get("created_at")
+        return {
+            "id": tour["_id"],
+            "name": tour.get("name", ""),
+            "entryScene": tour.get("entry_scene") or "",
+            "createdAt": created_at.isoformat() if created_at else None,
+            "scenes": records,
+        }
+
+    async def restore(
+        self,
+        file: BinaryIO,
+        remap: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict:
+        """
+        Restore archive backup bằng các batch insert_many
+
+        Args:
+            file: Archive (.ndjson.gz) đã mở ở chế độ binary
+            remap: Tạo ID mới thay vì giữ ID trong archive
+            progress: Callback báo tiến độ (số tours đã restore)
+
+        Returns:
+            Số tours/scenes/hotspots đã tạo và số document bị bỏ qua do trùng ID
+        """
+        progress = progress or _noop_progress
+        reader = gzip.GzipFile(fileobj=file, mode="rb")
+        restorer = _Restorer(self, remap)
+        digest = hashlib.sha256()
+        header: Optional[Dict] = None
+        trailer: Optional[Dict] = None
+
+        try:
+            while True:
+                entries = await run_in_threadpool(_read_entries, reader, READ_LINES)
+                if not entries:
+                    break
+                for entry, data in entries:
+                    if header is None:
+                        if entry.get("type") != "header" or entry.get("format") != BACKUP_FORMAT:
+                            raise BadRequestError("Invalid backup: missing header")
+                        header = entry
+                    elif data is not None:
+                        if hashlib.sha256(data).hexdigest() != entry.get("sha256"):
+                            raise BadRequestError(
+                                f"Invalid backup: checksum mismatch for tour "
+                                f"{entry['data'].get('id')} (after "
+                                f"{restorer.counts['tours']} tours restored)"
+                            )
+                        digest.update(data)
+                        restorer.add(entry["data"])
+                    elif entry.get("type") == "trailer":
+                        trailer = entry
+
+                if restorer.pending >= configs.RESTORE_BATCH_SIZE:
+                    await restorer.flush()
+                    await progress(restorer.counts["tours"], header["tours"], "restoring")
+        except (OSError, EOFError):
+            raise BadRequestError("Invalid backup: not a gzip archive or truncated")
+
+        await restorer.flush()
+        if header is None:
+            raise BadRequestError("Invalid backup: empty archive")
+        if trailer is None or trailer.get("sha256") != digest.hexdigest():
+            raise BadRequestError(
+                f"Invalid backup: archive incomplete "
+                f"({restorer.counts['tours']} tours restored)"
+            )
+        await progress(restorer.counts["tours"], header["tours"], "restored")
+        return restorer.counts
+
+
+class _Restorer:
+    """Gom documents của nhiều tours rồi ghi theo batch"""
+
+    def __init__(self, service: BackupService, remap: bool):
+        self.service = service
+        self.remap = remap
+        self.tours: List[Dict] = []
+        self.scenes: List[Dict] = []
+        self.hotspots: List[Dict] = []
+        self.counts = {"tours": 0, "scenes": 0, "hotspots": 0, "skipped": 0}
+
+    @property
+    def pending(self) -> int:
+        return len(self.tours) + len(self.scenes) + len(self.hotspots)
+
+    def _id(self, old_id: Optional[str]) -> ObjectId:
+        if not self.remap and old_id and ObjectId.is_valid(old_id):
+            return ObjectId(old_id)
+        return ObjectId()
+
+    def add(self, record: Dict):
+        """Chuyển record export của một tour thành documents"""
+        tour_id = self._id(record.get("id"))
+        scenes = record.get("scenes", {})
+        scene_id_map = {old_id: str(self._id(old_id)) for old_id in scenes}
+
+        created_at = record.get("createdAt")
+        self.tours.append(
+            {
+                "_id": tour_id,
+                "name": record.get("name", "Imported Tour"),
+                "entry_scene": scene_id_map.get(record.get("entryScene")),
+                "created_at": (
+                    datetime.fromisoformat(created_at) if created_at else datetime.utcnow()
+                ),
+            }
+        )
+
+        for old_scene_id, scene in scenes.items():
+            scene_id = scene_id_map[old_scene_id]
+            scene_doc = {
+                "_id": ObjectId(scene_id),
+                "tour_id": str(tour_id),
+                "name": scene.get("name", ""),
+                "description": scene.get("description", ""),
+                "image_url": scene.get("image", ""),
+                "initial_view": scene.get(
+                    "initialView", {"yaw": 0, "pitch": 0, "fov": 100}
+                ),
+            }
+            if scene.get("imagePublicId"):
+                scene_doc["image_public_id"] = scene["imagePublicId"]
+            if scene.get("preview"):
+                scene_doc["preview"] = preview_fields(scene["preview"])
+            self.scenes.append(scene_doc)
+
+            for hotspot in scene.get("hotspots", []):
+                target_scene = hotspot.get("targetScene")
+                self.hotspots.append(
+                    {
+                        "_id": self._id(hotspot.get("id")),
+                        "scene_id": scene_id,
+                        "type": hotspot.get("type", "click"),
+                        "position": hotspot.get("position", {"x": 0, "y": 0, "z": 0}),
+                        "target_scene": scene_id_map.get(target_scene, target_scene),
+                        "label": hotspot.get("label", ""),
+                        "fov_trigger": hotspot.get("fovTrigger"),
+                    }
+                )
+
+    async def flush(self):
+        """Ghi các documents đang gom (insert_many) và search index tương ứng"""
+        service = self.service
+        batches = (
+            ("tours", "tour", service.tour_repository, self.tours),
+            ("scenes", "scene", service.scene_repository, self.scenes),
+            ("hotspots", "hotspot", service.hotspot_repository, self.hotspots),
+        )
+        for key, kind, repository, documents in batches:
+            if not documents:
+                continue
+            inserted = await repository.insert_many(documents, skip_duplicates=True)
+            self.counts[key] += len(inserted)
+            self.counts["skipped"] += len(documents) - len(inserted)
+            await service.search_service.repository.bulk_upsert(
+                [service.search_service.build_entry(kind, doc) for doc in inserted]
+            )
+
+        if not self.remap:
+            tour_ids = [str(doc["_id"]) for doc in self.tours]
+            tour_payload_cache.invalidate(*tour_ids)
+            await container.get(ChangeService).resync(*tour_ids)
+        self.tours, self.scenes, self.hotspots = [], [], []
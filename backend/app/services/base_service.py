@@ -1,11 +1,26 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 
 from app.repository.base_repository import BaseRepository
+from app.services.change_service import ChangeService
+from app.core.cache import tour_payload_cache
+from app.core.config import configs
+from app.core.container import container
+from app.core.live import make_delta
+from app.core.tracing import instrument
 
 
+@instrument
 class BaseService:
     """Base service class"""
 
+    # Loại entity trong change log/kênh live (None = không ghi)
+    live_entity: Optional[str] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Span cho mỗi async method public khi TRACING_ENABLED
+        instrument(cls)
+
     def __init__(self, repository: BaseRepository):
         self.repository = repository
 
@@ -33,18 +48,66 @@ class BaseService:
             }
         }
 
+    def stream(
+        self, filter_dict: Optional[Dict] = None, limit: int = 0
+    ) -> AsyncIterator[Dict]:
+        """Stream toàn bộ kết quả (không phân trang) từ cursor"""
+        return self.repository.iter_all(
+            filter_dict, limit=limit, batch_size=configs.STREAM_BATCH_SIZE
+        )
+
     async def get_by_id(self, id: str) -> Optional[Dict]:
         """Lấy theo ID"""
         return await self.repository.find_by_id(id)
 
+    async def get_stamp(self, id: str) -> Optional[Dict]:
+        """Lấy change stamp (version, updated_at) theo ID"""
+        return await self.repository.find_stamp_by_id(id)
+
     async def create(self, data: Dict) -> Dict:
         """Tạo mới"""
-        return await self.repository.create(data)
+        result = await self.repository.create(data)
+        await self.after_write(result)
+        await self.publish("create", result)
+        return result
+
+    async def update(
+        self, id: str, data: Dict, expected_version: Optional[int] = None
+    ) -> Dict:
+        """Cập nhật (409 nếu expected_version không còn khớp)"""
+        result = await self.repository.update(id, data, expected_version)
+        tour_payload_cache.invalidate(id)
+        await self.after_write(result, fields=data.keys())
+        await self.publish("update", result, data.keys())
+        return result
+
+    async def delete(self, id: str, expected_version: Optional[int] = None) -> Dict:
+        """Xóa, trả về document đã xóa"""
+        result = await self.repository.delete(id, expected_version)
+        tour_payload_cache.invalidate(id)
+        await self.after_delete(id)
+        await self.publish("delete", result)
+        return result
+
+    async def after_write(self, doc: Dict, fields: Optional[Iterable[str]] = None):
+        """Hook sau khi tạo/cập nhật document (fields=None khi tạo mới)"""
+
+    async def after_delete(self, id: str):
+        """Hook sau khi xóa document"""
 
-    async def update(self, id: str, data: Dict) -> Optional[Dict]:
-        """Cập nhật"""
-        return await self.repository.update(id, data)
+    async def live_tour_id(self, doc: Dict) -> Optional[str]:
+        """Tour có change log chứa delta của document"""
+        return doc.get("tour_id")
 
-    async def delete(self, id: str) -> bool:
-        """Xóa"""
-        return await self.repository.delete(id)
+    async def publish(self, op: str, doc: Dict, fields: Optional[Iterable[str]] = None):
+        """Ghi delta vào change log của tour và gửi qua kênh live (lỗi không chặn write)"""
+        if self.live_entity is None:
+            return
+        try:
+            tour_id = await self.live_tour_id(doc)
+            if tour_id:
+                await container.get(ChangeService).record(
+                    tour_id, [make_delta(self.live_entity, op, doc, fields)]
+                )
+        except Exception as e:
+            print(f"Change publish failed: {e}")
@@ -0,0 +1,508 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.repository.base_repository import change_stamp
+from app.repository.tour_repository import TourRepository
+from app.repository.scene_repository import SceneRepository
+from app.repository.hotspot_repository import HotspotRepository
+from app.services.search_service import SearchService
+from app.services.change_service import ChangeService
+from app.services.scene_service import SceneService
+from app.schema.tour_schema import TourCreate, TourUpdate
+from app.schema.scene_schema import SceneCreate, SceneUpdate
+from app.schema.hotspot_schema import HotspotCreate, HotspotUpdate
+from app.core.cache import tour_payload_cache
+from app.core.config import configs
+from app.core.container import container
+from app.core.database import mongodb
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.core.live import make_delta
+from app.core.tracing import instrument
+
+RESOURCES = ("tour", "scene", "hotspot")
+
+# Schema của `data` theo (resource, op), giống body của endpoint tương ứng
+SCHEMAS = {
+    ("tour", "create"): TourCreate,
+    ("tour", "update"): TourUpdate,
+    ("scene", "create"): SceneCreate,
+    ("scene", "update"): SceneUpdate,
+    ("hotspot", "create"): HotspotCreate,
+    ("hotspot", "update"): HotspotUpdate,
+}
+
+# Field tham chiếu document khác, nhận `$<ref>` của document tạo trong batch
+REFERENCE_FIELDS = ("tour_id", "scene_id", "target_scene", "entry_scene")
+
+# resource -> (field cha, resource cha)
+PARENTS = {"scene": ("tour_id", "tour"), "hotspot": ("scene_id", "scene")}
+
+# Thao tác không được ghi vì thao tác khác trong batch bị lỗi
+STATUS_NOT_APPLIED = 424
+
+# Document tạo rồi xóa trong cùng batch: không ghi gì
+DROPPED = "dropped"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+@instrument
+class BatchService:
+    """
+    Ghi nhiều thao tác create/update/delete trên tours, scenes, hotspots
+
+    Các thao tác được gộp theo document (tạo rồi sửa = tạo, tạo rồi xóa = bỏ)
+    và kiểm tra hết (404, 409, field sai) trước khi ghi; sau đó mỗi collection
+    được ghi bằng một bulk_write (`apply_diff`), trong một transaction nếu
+    MongoDB hỗ trợ. Xóa tour/scene xóa cả scenes/hotspots con như các
+    endpoint xóa.
+    """
+
+    def __init__(self):
+        self.repositories = {
+            "tour": TourRepository(),
+            "scene": SceneRepository(),
+            "hotspot": HotspotRepository(),
+        }
+        self.search_service = container.get(SearchService)
+        self.change_service = container.get(ChangeService)
+        self.scene_service = container.get(SceneService)
+
+    async def execute(self, operations: List[Dict]) -> Dict:
+        """
+        Thực hiện các thao tác theo thứ tự
+
+        Args:
+            operations: Dict {op, resource, id, ref, data, version}
+
+        Returns:
+            Dict với applied, transaction, refs (ref -> ID mới) và kết quả
+            từng thao tác (status, id, version sau batch hoặc error). Nếu một
+            thao tác lỗi thì không thao tác nào được ghi (status 424).
+        """
+        results = [
+            {
+                "index": index,
+                "op": operation["op"],
+                "resource": operation["resource"],
+                "ref": operation.get("ref"),
+                "id": None,
+                "status": 201 if operation["op"] == "create" else 200,
+            }
+            for index, operation in enumerate(operations)
+        ]
+        errors: Dict[int, HTTPException] = {}
+
+        refs = self._assign_ids(operations, results, errors)
+        prepared = self._prepare(operations, refs, results, errors)
+        if errors:
+            return self._failed(refs, results, errors)
+
+        current = await self._load(prepared)
+        docs = self._fold(prepared, current, errors)
+        if errors:
+            return self._failed(refs, results, errors)
+
+        plan = await self._plan(docs, current, errors)
+        if errors:
+            return self._failed(refs, results, errors)
+
+        transaction = configs.BATCH_TRANSACTIONS and await mongodb.supports_transactions()
+        try:
+            if transaction:
+                async with mongodb.transaction() as session:
+                    await self._write(plan, session)
+            else:
+                await self._write(plan)
+        except ConflictError as conflict:
+            await self._find_conflicts(docs, errors)
+            if not errors:
+                errors[min(index for doc in docs.values() for index in doc["indices"])] = conflict
+            return self._failed(refs, results, errors, transaction)
+
+        after = self._after_docs(docs, plan)
+        await self._after_write(docs, plan, after)
+
+        for key, doc in docs.items():
+            version = None if doc["op"] in ("delete", DROPPED) else after[key].get("version")
+            for index in doc["indices"]:
+                results[index]["version"] = version
+        return {"applied": True, "transaction": transaction, "refs": refs, "results": results}
+
+    def _assign_ids(
+        self, operations: List[Dict], results: List[Dict], errors: Dict[int, HTTPException]
+    ) -> Dict[str, str]:
+        """Cấp ID cho các document tạo mới (trước khi ghi, để tham chiếu được)"""
+        refs: Dict[str, str] = {}
+        for index, operation in enumerate(operations):
+            if operation["op"] != "create":
+                continue
+            id = str(ObjectId())
+            ref = operation.get("ref")
+            if ref:
+                if ref in refs:
+                    errors[index] = BadRequestError(f"Duplicate ref: {ref}")
+                    continue
+                refs[ref] = id
+            results[index]["id"] = id
+        return refs
+
+    def _prepare(
+        self,
+        operations: List[Dict],
+        refs: Dict[str, str],
+        results: List[Dict],
+        errors: Dict[int, HTTPException],
+    ) -> Dict[int, Tuple[str, str, str, Dict, Optional[int]]]:
+        """Thay `$<ref>` bằng ID và validate data: {index: (resource, op, id, data, version)}"""
+
+        def resolve(value: Any) -> Any:
+            if isinstance(value, str) and value.startswith("$"):
+                if value[1:] not in refs:
+                    raise BadRequestError(f"Unknown ref: {value}")
+                return refs[value[1:]]
+            return value
+
+        prepared = {}
+        for index, operation in enumerate(operations):
+            if index in errors:
+                continue
+            resource, op = operation["resource"], operation["op"]
+            version = operation.get("version")
+            try:
+                if op != "create":
+                    if not operation.get("id"):
+                        raise BadRequestError("id is required")
+                    results[index]["id"] = resolve(operation["id"])
+                data: Dict = {}
+                if op != "delete":
+                    data = {
+                        field: resolve(value) if field in REFERENCE_FIELDS else value
+                        for field, value in operation.get("data", {}).items()
+                    }
+                    try:
+                        model = SCHEMAS[(resource, op)].model_validate(data)
+                    except ValidationError as e:
+                        raise BadRequestError(_validation_message(e))
+                    data = model.model_dump(exclude_none=op == "update")
+                    if op == "update":
+                        version = data.pop("version", version) if version is None else version
+                        data.pop("version", None)
+                        if not data:
+                            raise BadRequestError("No fields to update")
+            except HTTPException as e:
+                errors[index] = e
+                continue
+            prepared[index] = (resource, op, results[index]["id"], data, version)
+        return prepared
+
+    async def _load(self, prepared: Dict) -> Dict[str, Dict[str, Dict]]:
+        """Documents hiện có mà batch sửa, xóa hoặc dùng làm cha: {resource: {id: doc}}"""
+        created: Dict[str, Set[str]] = {resource: set() for resource in RESOURCES}
+        wanted: Dict[str, Set[str]] = {resource: set() for resource in RESOURCES}
+        for resource, op, id, data, _ in prepared.values():
+            (created if op == "create" else wanted)[resource].add(id)
+            if resource in PARENTS and data.get(PARENTS[resource][0]):
+                wanted[PARENTS[resource][1]].add(data[PARENTS[resource][0]])
+
+        current: Dict[str, Dict[str, Dict]] = {}
+        for resource in RESOURCES:
+            ids = [ObjectId(id) for id in wanted[resource] - created[resource] if ObjectId.is_valid(id)]
+            docs = (
+                await self.repositories[resource].find_all({"_id": {"$in": ids}}, limit=len(ids))
+                if ids
+                else []
+            )
+            current[resource] = {doc["_id"]: doc for doc in docs}
+        return current
+
+    def _fold(
+        self, prepared: Dict, current: Dict[str, Dict[str, Dict]], errors: Dict[int, HTTPException]
+    ) -> Dict[Tuple[str, str], Dict]:
+        """
+        Gộp các thao tác theo document: {(resource, id): {op, fields, current, indices}}
+
+        `version` được so với version của document trước batch.
+        """
+        docs: Dict[Tuple[str, str], Dict] = {}
+        for index, (resource, op, id, data, version) in prepared.items():
+            key = (resource, id)
+            doc = docs.get(key)
+            try:
+                if doc is None:
+                    if op == "create":
+                        doc = {"op": "create", "fields": data, "current": None}
+                    else:
+                        existing = current[resource].get(id)
+                        if existing is None:
+                            raise NotFoundError(f"{resource.capitalize()} not found: {id}")
+                        doc = {"op": None, "fields": {}, "current": existing}
+                elif doc["op"] in ("delete", DROPPED):
+                    raise NotFoundError(f"{resource.capitalize()} already deleted in batch: {id}")
+                if version is not None and doc["current"] is not None:
+                    if doc["current"].get("version") != version:
+                        raise ConflictError(
+                            f"Version conflict on {resource} {id}: expected {version}, "
+                            f"current {doc['current'].get('version')}"
+                        )
+            except HTTPException as e:
+                errors[index] = e
+                continue
+
+            if op == "update":
+                doc["fields"].update(data)
+                doc["op"] = doc["op"] or "update"
+            elif op == "delete":
+                doc["op"] = "delete" if doc["current"] is not None else DROPPED
+            doc.setdefault("indices", []).append(index)
+            docs[key] = doc
+        return docs
+
+    async def _plan(
+        self,
+        docs: Dict[Tuple[str, str], Dict],
+        current: Dict[str, Dict[str, Dict]],
+        errors: Dict[int, HTTPException],
+    ) -> Dict:
+        """Kiểm tra document cha của các document tạo mới, tính diff và phần xóa theo cascade"""
+
+        def gone(resource: str) -> Set[str]:
+            return {id for (r, id), doc in docs.items() if r == resource and doc["op"] in ("delete", DROPPED)}
+
+        deleted_tours = {id for id in gone("tour") if docs[("tour", id)]["op"] == "delete"}
+        cascade_scenes = (
+            [s async for s in self.repositories["scene"].iter_all({"tour_id": {"$in": list(deleted_tours)}})]
+            if deleted_tours
+            else []
+        )
+        gone_tours = gone("tour")
+        gone_scenes = gone("scene") | {scene["_id"] for scene in cascade_scenes} | {
+            id
+            for (resource, id), doc in docs.items()
+            if resource == "scene" and doc["op"] == "create" and doc["fields"].get("tour_id") in gone_tours
+        }
+        gone_parents = {"tour": gone_tours, "scene": gone_scenes}
+
+        for (resource, id), doc in docs.items():
+            if doc["op"] != "create" or resource not in PARENTS:
+                continue
+            field, parent = PARENTS[resource]
+            parent_id = doc["fields"].get(field)
+            parent_doc = docs.get((parent, parent_id))
+            if parent_id not in current[parent] and not (parent_doc and parent_doc["op"] == "create"):
+                errors[doc["indices"][0]] = NotFoundError(f"{parent.capitalize()} not found: {parent_id}")
+            elif parent_id in gone_parents[parent]:
+                errors[doc["indices"][0]] = BadRequestError(
+                    f"{parent.capitalize()} {parent_id} is deleted in the same batch"
+                )
+
+        # Sửa rồi bị xóa theo cascade: chỉ còn là xóa
+        for (resource, id), doc in docs.items():
+            if doc["op"] != "update" or resource not in PARENTS:
+                continue
+            field, parent = PARENTS[resource]
+            if doc["current"].get(field) in gone_parents[parent]:
+                doc["op"] = "delete"
+
+        plan: Dict[str, Any] = {
+            resource: {"inserts": [], "updates": {}, "deletes": [], "versions": {}}
+            for resource in RESOURCES
+        }
+        replaced_images: List[Dict] = []
+        for (resource, id), doc in docs.items():
+            diff = plan[resource]
+            if doc["op"] == "create":
+                insert = {"_id": ObjectId(id), **doc["fields"]}
+                if resource == "tour":
+                    insert["created_at"] = datetime.utcnow()
+                diff["inserts"].append(insert)
+            elif doc["op"] == "update":
+                fields = doc["fields"]
+                if resource == "scene" and "image_url" in fields:
+                    scene = doc["current"]
+                    if fields["image_url"] != scene.get("image_url"):
+                        # Ảnh ngoài: public_id, preview, transcode của ảnh cũ không còn đúng
+                        fields.update(image_public_id=None, preview={}, image_transcode=None)
+                        replaced_images.append(scene)
+                diff["updates"][id] = fields
+                diff["versions"][id] = doc["current"].get("version")
+            elif doc["op"] == "delete":
+                if resource == "hotspot" and doc["current"].get("scene_id") in gone_scenes:
+                    # Xóa theo scene (hotspot nhúng mất cùng scene)
+                    continue
+                diff["deletes"].append(id)
+                diff["versions"][id] = doc["current"].get("version")
+
+        deleted_scenes = [docs[("scene", id)]["current"] for id in plan["scene"]["deletes"]]
+        deleted_scenes += [scene for scene in cascade_scenes if ("scene", scene["_id"]) not in docs]
+        plan.update(
+            deleted_tours=list(deleted_tours),
+            deleted_scenes=deleted_scenes,
+            replaced_images=replaced_images,
+        )
+        return plan
+
+    async def _write(self, plan: Dict, session=None):
+        """
+        Một bulk_write cho mỗi collection: tours, scenes rồi hotspots (scene có
+        trước hotspot nhúng); xóa theo cascade là một delete_many riêng
+
+        Update/delete chỉ khớp document còn đúng version đã đọc, nếu không thì
+        raise ConflictError (transaction bị abort).
+        """
+        deleted_scene_ids = [scene["_id"] for scene in plan["deleted_scenes"]]
+        delete_filters = {
+            "tour": None,
+            "scene": {"tour_id": {"$in": plan["deleted_tours"]}} if plan["deleted_tours"] else None,
+            "hotspot": {"scene_id": {"$in": deleted_scene_ids}} if deleted_scene_ids else None,
+        }
+        for resource in RESOURCES:
+            diff = plan[resource]
+            if diff["inserts"] or diff["updates"] or diff["deletes"] or delete_filters[resource]:
+                result = await self.repositories[resource].apply_diff(
+                    diff["inserts"],
+                    diff["updates"],
+                    diff["deletes"],
+                    delete_filters[resource],
+                    session=session,
+                    versions=diff["versions"],
+                )
+                if result["conflicts"]:
+                    raise ConflictError(
+                        f"{result['conflicts']} {resource}(s) changed or deleted during the batch"
+                    )
+
+    async def _find_conflicts(
+        self, docs: Dict[Tuple[str, str], Dict], errors: Dict[int, HTTPException]
+    ):
+        """Thao tác trên document đã bị sửa/xóa sau khi batch đọc (409)"""
+        for resource in RESOURCES:
+            targets = {
+                id: doc
+                for (r, id), doc in docs.items()
+                if r == resource and doc["op"] in ("update", "delete")
+            }
+            if not targets:
+                continue
+            ids = [ObjectId(id) for id in targets]
+            stored = {
+                doc["_id"]: doc.get("version")
+                for doc in await self.repositories[resource].find_all(
+                    {"_id": {"$in": ids}}, limit=len(ids)
+                )
+            }
+            for id, doc in targets.items():
+                version = doc["current"].get("version")
+                if id not in stored:
+                    errors[doc["indices"][0]] = ConflictError(
+                        f"{resource.capitalize()} {id} was deleted during the batch"
+                    )
+                elif stored[id] != version:
+                    errors[doc["indices"][0]] = ConflictError(
+                        f"Version conflict on {resource} {id}: expected {version}, current {stored[id]}"
+                    )
+
+    def _after_docs(self, docs: Dict[Tuple[str, str], Dict], plan: Dict) -> Dict[Tuple[str, str], Dict]:
+        """Document sau batch (document đã xóa: bản trước khi xóa)"""
+        inserted = {
+            (resource, str(doc["_id"])): doc for resource in RESOURCES for doc in plan[resource]["inserts"]
+        }
+        stamp = change_stamp()
+        after: Dict[Tuple[str, str], Dict] = {}
+        for key, doc in docs.items():
+            if doc["op"] == "create":
+                after[key] = {**inserted[key], "_id": key[1]}
+            elif doc["op"] == "update":
+                current = doc["current"]
+                after[key] = {
+                    **current,
+                    **doc["fields"],
+                    **stamp,
+                    "version": (current.get("version") or 0) + 1,
+                }
+            elif doc["current"] is not None:
+                after[key] = doc["current"]
+        return after
+
+    async def _after_write(
+        self, docs: Dict[Tuple[str, str], Dict], plan: Dict, after: Dict[Tuple[str, str], Dict]
+    ):
+        """Cache, search index, ảnh bị thay/xóa và change log như khi ghi qua từng service"""
+        deleted_tours = set(plan["deleted_tours"])
+        deleted_ids = [
+            *deleted_tours,
+            *(scene["_id"] for scene in plan["deleted_scenes"]),
+            *plan["hotspot"]["deletes"],
+        ]
+        changed = [
+            (key, after[key]) for key, doc in docs.items() if doc["op"] in ("create", "update")
+        ]
+
+        # Payload cache phụ thuộc vào tour, scenes, hotspots (document mới: theo cha)
+        tour_payload_cache.invalidate(
+            *(id for _, id in docs),
+            *(doc.get(field) for _, doc in changed for field in ("tour_id", "scene_id") if doc.get(field)),
+        )
+
+        await self.search_service.remove(*deleted_ids)
+        entries = [self.search_service.build_entry(resource, doc) for (resource, _), doc in changed]
+        await self.search_service.repository.bulk_upsert(entries)
+
+        for scene in plan["deleted_scenes"] + plan["replaced_images"]:
+            self.scene_service.discard_images(scene)
+
+        # Change log theo tour (xóa tour/scene không ghi delta cho con của nó)
+        scene_tours = {
+            id: doc.get("tour_id") for (resource, id), doc in after.items() if resource == "scene"
+        }
+        missing = [
+            str(doc.get("scene_id"))
+            for (resource, _), doc in after.items()
+            if resource == "hotspot" and str(doc.get("scene_id")) not in scene_tours
+        ]
+        if missing:
+            scene_tours.update(await self.repositories["scene"].find_tour_ids(missing))
+
+        deltas: Dict[str, List[Dict]] = {}
+        for (resource, id), doc in docs.items():
+            if doc["op"] not in ("create", "update", "delete"):
+                continue
+            if resource == "tour":
+                tour_id = id
+            elif resource == "scene":
+                tour_id = after[(resource, id)].get("tour_id")
+            else:
+                tour_id = scene_tours.get(str(after[(resource, id)].get("scene_id")))
+            if not tour_id or (resource != "tour" and tour_id in deleted_tours):
+                continue
+            fields = doc["fields"].keys() if doc["op"] == "update" else None
+            deltas.setdefault(tour_id, []).append(
+                make_delta(resource, doc["op"], after[(resource, id)], fields)
+            )
+        for tour_id, tour_deltas in deltas.items():
+            await self.change_service.record(tour_id, tour_deltas)
+
+    @staticmethod
+    def _failed(
+        refs: Dict[str, str],
+        results: List[Dict],
+        errors: Dict[int, HTTPException],
+        transaction: bool = False,
+    ) -> Dict:
+        """Kết quả khi batch không được ghi: lỗi của từng thao tác, còn lại 424"""
+        for result in results:
+            error = errors.get(result["index"])
+            if error is None:
+                result["status"] = STATUS_NOT_APPLIED
+                result["error"] = "Not applied: another operation in the batch failed"
+            else:
+                result["status"] = error.status_code
+                result["error"] = error.detail
+        return {"applied": False, "transaction": transaction, "refs": refs, "results": results}
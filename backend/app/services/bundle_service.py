@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Set
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from app.services.tour_service import ProgressCallback, TourService, _noop_progress
+from app.services.image_gc_service import ImageGCService
+from app.core.storage import get_storage
+from app.core.config import configs
+from app.core.container import container
+from app.core.exceptions import BadRequestError
+from app.core.tracing import instrument
+
+BUNDLE_FORMAT = "novaland-tour-bundle"
+BUNDLE_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+MAX_REDIRECTS = 5
+
+# Host của storage ảnh (Cloudinary)
+STORAGE_HOSTS = ("res.cloudinary.com",)
+
+
+def _fetch_hosts() -> Set[str]:
+    """Host (kèm port) được phép tải ảnh khi tạo bundle"""
+    hosts = {
+        urlparse(configs.FRONTEND_URL).netloc,
+        urlparse(configs.LOCAL_STORAGE_BASE_URL).netloc,
+        *STORAGE_HOSTS,
+        *(host.strip() for host in configs.BUNDLE_FETCH_HOSTS.split(",")),
+    }
+    return {host.lower() for host in hosts if host}
+
+
+class _ZipSink:
+    """File-like không seek được, gom bytes zipfile ghi ra để stream đi"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class _FetchedImage:
+    """Ảnh đã tải về file tạm (spool), kèm hash và kích thước"""
+
+    def __init__(self, scene_id: str, source: str):
+        self.scene_id = scene_id
+        self.source = source
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=configs.BUNDLE_SPOOL_MAX_BYTES
+        )
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.extension = os.path.splitext(urlparse(source).path)[1].lower()
+        self.error: Optional[str] = None
+
+    @property
+    def arcname(self) -> str:
+        return f"images/{self.scene_id}{self.extension}"
+
+
+@instrument
+class BundleService:
+    """
+    Export/import tour offline dạng ZIP: tour.json, ảnh panorama, manifest.json
+
+    ZIP được tạo trong lúc stream, ảnh tải song song (giới hạn bởi
+    BUNDLE_FETCH_CONCURRENCY) vào file tạm nên bộ nhớ không phụ thuộc kích
+    thước tour.
+    """
+
+    def __init__(self):
+        self.tour_service = container.get(TourService)
+        self.fetch_hosts = _fetch_hosts()
+
+    async def prepare_export(self, tour_id: str) -> Dict:
+        """Lấy dữ liệu export (raise NotFoundError trước khi bắt đầu stream)"""
+        return await self.tour_service.export_tour_json(tour_id)
+
+    async def stream_bundle(self, tour_id: str, export: Dict) -> AsyncIterator[bytes]:
+        """Stream ZIP bundle của tour"""
+        sink = _ZipSink()
+        files: Dict[str, Dict] = {}
+        missing: List[Dict] = []
+
+        async with httpx.AsyncClient(timeout=60) as client:
+            with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+                async for image in self._fetch_images(client, export.get("scenes", {})):
+                    try:
+                        if image.error:
+                            missing.append(
+                                {
+                                    "scene_id": image.scene_id,
+                                    "source": image.source,
+                                    "error": image.error,
+                                }
+                            )
+                            continue
+
+                        info = zipfile.ZipInfo(image.arcname, time.localtime()[:6])
+                        info.compress_type = zipfile.ZIP_STORED
+                        image.file.seek(0)
+                        with zf.open(info, "w", force_zip64=True) as entry:
+                            while chunk := image.file.read(CHUNK_SIZE):
+                                entry.write(chunk)
+                                yield sink.drain()
+                        files[image.arcname] = {
+                            "sha256": image.sha256.hexdigest(),
+                            "size": image.size,
+                            "source": image.source,
+                        }
+                        export["scenes"][image.scene_id]["image"] = image.arcname
+                    finally:
+                        image.file.close()
+
+                tour_json = json.dumps(export, ensure_ascii=False, indent=2).encode("utf-8")
+                zf.writestr("tour.json", tour_json, compress_type=zipfile.ZIP_DEFLATED)
+                files["tour.json"] = {
+                    "sha256": hashlib.sha256(tour_json).hexdigest(),
+                    "size": len(tour_json),
+                }
+
+                manifest = {
+                    "format": BUNDLE_FORMAT,
+                    "version": BUNDLE_VERSION,
+                    "tour_id": tour_id,
+                    "created_at": datetime.utcnow().isoformat(),
+                    "files": files,
+                    "missing": missing,
+                }
+                zf.writestr(
+                    "manifest.json",
+                    json.dumps(manifest, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED,
+                )
+            # Central directory được ghi khi đóng ZipFile
+            yield sink.drain()
+
+    async def _fetch_images(
+        self, client: httpx.AsyncClient, scenes: Dict
+    ) -> AsyncIterator[_FetchedImage]:
+        """
+        Tải ảnh các scenes theo thứ tự, tối đa BUNDLE_FETCH_CONCURRENCY ảnh
+        đang tải hoặc chờ ghi cùng lúc
+        """
+        sources = [
+            (scene_id, scene["image"])
+            for scene_id, scene in scenes.items()
+            if scene.get("image")
+        ]
+        window = max(1, configs.BUNDLE_FETCH_CONCURRENCY)
+        pending: deque = deque()
+        index = 0
+        try:
+            while index < len(sources) or pending:
+                while index < len(sources) and len(pending) < window:
+                    scene_id, source = sources[index]
+                    pending.append(
+                        asyncio.create_task(self._fetch(client, scene_id, source))
+                    )
+                    index += 1
+                yield await pending.popleft()
+        finally:
+            # Client ngắt kết nối: hủy các lượt tải còn lại và dọn file tạm
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                try:
+                    (await task).file.close()
+                except BaseException:
+                    pass
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, scene_id: str, source: str
+    ) -> _FetchedImage:
+        """Tải một ảnh về file tạm, tính sha256 trong lúc tải"""
+        image = _FetchedImage(scene_id, source)
+        url = urljoin(configs.FRONTEND_URL.rstrip("/") + "/", source)
+        try:
+            # Redirect được theo thủ công để kiểm tra host ở mỗi bước
+            for _ in range(MAX_REDIRECTS + 1):
+                self._check_url(url)
+                async with client.stream("GET", url) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers["location"])
+                        continue
+                    response.raise_for_status()
+                    if not image.extension:
+                        content_type = response.headers.get("content-type", "").split(";")[0]
+                        image.extension = mimetypes.guess_extension(content_type) or ".jpg"
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        image.sha256.update(chunk)
+                        image.size += len(chunk)
+                        await run_in_threadpool(image.file.write, chunk)
+                    break
+            else:
+                raise ValueError(f"Too many redirects: {source}")
+        except Exception as e:
+            image.error = str(e)
+        return image
+
+    def _check_url(self, url: str):
+        """Chỉ tải từ frontend và storage ảnh (không tải từ host tùy ý do scene chỉ định)"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc.lower() not in self.fetch_hosts:
+            raise ValueError(f"Image host not allowed: {parsed.netloc or url}")
+
+    async def import_bundle(
+        self, file: BinaryIO, progress: Optional[ProgressCallback] = None
+    ) -> Dict:
+        """
+        Import tour từ ZIP bundle: kiểm tra hash, upload ảnh song song lên
+        storage rồi tạo tour/scenes/hotspots
+
+        Args:
+            file: File ZIP (seek được)
+            progress: Callback báo tiến độ upload ảnh và import
+
+        Returns:
+            Kết quả import kèm số ảnh đã upload
+        """
+        progress = progress or _noop_progress
+        try:
+            zf = zipfile.ZipFile(file)
+        except zipfile.BadZipFile:
+            raise BadRequestError("Invalid bundle: not a ZIP file")
+
+        with zf:
+            try:
+                manifest = json.loads(zf.read("manifest.json"))
+                tour_bytes = zf.read("tour.json")
+            except KeyError as e:
+                raise BadRequestError(f"Invalid bundle: missing {e}")
+            if manifest.get("format") != BUNDLE_FORMAT:
+                raise BadRequestError("Invalid bundle: unknown format")
+
+            files = manifest.get("files", {})
+            self._verify(files, "tour.json", tour_bytes)
+            data = json.loads(tour_bytes)
+
+            semaphore = asyncio.Semaphore(max(1, configs.BUNDLE_FETCH_CONCURRENCY))
+            uploaded: List[str] = []
+
+            async def upload(scene: Dict):
+                arcname = scene["image"]
+                async with semaphore:
+                    content = await run_in_threadpool(zf.read, arcname)
+                    self._verify(files, arcname, content)
+                    result = await get_storage().upload_bytes(
+                        content, folder="novaland/scenes/bundles"
+                    )
+                uploaded.append(result["public_id"])
+                scene["image"] = result["url"]
+                scene["imagePublicId"] = result["public_id"]
+                await progress(len(uploaded), len(scenes), "uploading images")
+
+            scenes = [
+                scene
+                for scene in data.get("scenes", {}).values()
+                if str(scene.get("image", "")).startswith("images/")
+            ]
+            outcomes = await asyncio.gather(
+                *(upload(scene) for scene in scenes), return_exceptions=True
+            )
+            errors = [o for o in outcomes if isinstance(o, BaseException)]
+            try:
+                if errors:
+                    raise errors[0]
+                result = await self.tour_service.import_tour_json(data, progress)
+            except BaseException:
+                # Ảnh đã upload được xóa nền nếu import thất bại
+                container.get(ImageGCService).discard(uploaded)
+                raise
+
+        return {**result, "images_uploaded": len(uploaded)}
+
+    @staticmethod
+    def _verify(files: Dict, arcname: str, content: bytes):
+        expected = files.get(arcname, {}).get("sha256")
+        if expected and hashlib.sha256(content).hexdigest() != expected:
+            raise BadRequestError(f"Invalid bundle: checksum mismatch for {arcname}")
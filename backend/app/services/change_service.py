@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.repository.change_repository import ChangeRepository
+from app.core.config import configs
+from app.core.live import live_hub
+from app.core.tracing import instrument
+
+# Khoảng trống seq (seq đã cấp nhưng entry chưa được ghi) lâu hơn thời gian
+# này được coi là entry bị mất (hết hạn hoặc write lỗi): client phải resync
+GAP_TIMEOUT_SECONDS = 10
+
+
+def _merge(current: Optional[Dict], entry: Dict) -> Optional[Dict]:
+    """Gộp entry vào thay đổi đã gộp của cùng document (None = bỏ hẳn)"""
+    if entry["op"] == "delete":
+        # Tạo rồi xóa trong khoảng since..seq: client chưa từng thấy document
+        if current is not None and current["op"] == "create":
+            return None
+        return {"id": entry["id"], "op": "delete"}
+    if current is None or current["op"] == "delete":
+        return {
+            key: entry[key]
+            for key in ("id", "scene_id", "op", "version", "fields")
+            if entry.get(key) is not None
+        }
+    # Write đồng thời có thể ghi log lệch thứ tự: không để version cũ đè version mới
+    if entry.get("version") is not None and current.get("version") is not None:
+        if entry["version"] < current["version"]:
+            return current
+    current["fields"] = {**current.get("fields", {}), **entry.get("fields", {})}
+    if entry.get("version") is not None:
+        current["version"] = entry["version"]
+    return current
+
+
+@instrument
+class ChangeService:
+    """
+    Change log theo tour cho delta sync: mỗi write ghi một delta (seq tăng dần
+    trong tour) và gửi nó qua kênh live; `changes` trả về các thay đổi từ một
+    seq đã gộp theo document
+    """
+
+    def __init__(self):
+        self.repository = ChangeRepository()
+
+    async def record(self, tour_id: str, deltas: List[Dict]) -> List[Dict]:
+        """Ghi delta vào change log rồi gửi qua kênh live (lỗi không chặn write)"""
+        if not deltas:
+            return []
+        tour_id = str(tour_id)
+        try:
+            entries = await self.repository.append(tour_id, deltas)
+        except Exception as e:
+            print(f"Change log append failed for tour {tour_id}: {e}")
+            live_hub.resync(tour_id)
+            return []
+        for entry in entries:
+            live_hub.publish(tour_id, {k: v for k, v in entry.items() if k != "created_at"})
+        return entries
+
+    async def resync(self, *tour_ids: str):
+        """Thay đổi hàng loạt (sync, restore): client phải tải lại tour"""
+        for tour_id in tour_ids:
+            await self.record(tour_id, [{"op": "resync"}])
+
+    async def current_seq(self, tour_id: str) -> int:
+        """Seq mới nhất của tour (dùng khi mở kênh live)"""
+        counter = await self.repository.get_counter(tour_id)
+        return counter["seq"] if counter else 0
+
+    async def changes(self, tour_id: str, since: int) -> Dict:
+        """
+        Thay đổi của tour sau seq since, gộp theo document
+
+        Returns:
+            Dict với seq mới nhất đã trả về, tour/scenes/hotspots đã đổi (create
+            có cả document, update chỉ có các field đã đổi, delete chỉ có id) và
+            resync=True khi client phải tải lại cả tour: log đã bị xóa (quá
+            CHANGE_LOG_TTL_HOURS), quá CHANGE_LOG_MAX_ENTRIES thay đổi, hoặc có
+            thay đổi hàng loạt
+        """
+        counter = await self.repository.get_counter(tour_id) or {"seq": 0}
+        result = {
+            "tour_id": tour_id,
+            "since": since,
+            "seq": since,
+            "resync": False,
+            "tour": None,
+            "scenes": [],
+            "hotspots": [],
+        }
+        resync = {**result, "seq": counter["seq"], "resync": True}
+        if since > counter["seq"]:
+            return resync
+        if since == counter["seq"]:
+            return result
+
+        entries = await self.repository.find_since(
+            tour_id, since, configs.CHANGE_LOG_MAX_ENTRIES + 1
+        )
+        if len(entries) > configs.CHANGE_LOG_MAX_ENTRIES:
+            return resync
+
+        # Chỉ trả về đoạn seq liên tiếp từ since + 1: seq bị thiếu có thể là
+        # write đang ghi log (lấy ở lần sau) hoặc entry đã mất (resync)
+        contiguous = []
+        for entry in entries:
+            if entry["seq"] != since + len(contiguous) + 1:
+                break
+            contiguous.append(entry)
+        if len(contiguous) < counter["seq"] - since:
+            # TTL xóa log từ entry cũ nhất: thiếu ngay từ since + 1 mà entry since
+            # cũng không còn thì phần đầu đã hết hạn
+            if not contiguous and (since == 0 or not await self.repository.has_seq(tour_id, since)):
+                return resync
+            gap_cutoff = datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT_SECONDS)
+            following = entries[len(contiguous)] if len(entries) > len(contiguous) else counter
+            if following.get("created_at", following.get("updated_at")) < gap_cutoff:
+                return resync
+
+        merged: Dict[str, Dict[str, Optional[Dict]]] = {"tour": {}, "scene": {}, "hotspot": {}}
+        for entry in contiguous:
+            if entry["op"] == "resync":
+                return resync
+            changes = merged[entry["entity"]]
+            changes[entry["id"]] = _merge(changes.get(entry["id"]), entry)
+
+        tour = [change for change in merged["tour"].values() if change]
+        return {
+            **result,
+            "seq": since + len(contiguous),
+            "tour": tour[0] if tour else None,
+            "scenes": [change for change in merged["scene"].values() if change],
+            "hotspots": [change for change in merged["hotspot"].values() if change],
+        }
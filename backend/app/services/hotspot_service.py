@@ -1,20 +1,47 @@
-from typing import Dict, Optional, List
+from typing import Dict, Iterable, Optional, List
+from bson import ObjectId
 
 from app.services.base_service import BaseService
 from app.repository.hotspot_repository import HotspotRepository
-from app.core.exceptions import NotFoundError
+from app.repository.scene_repository import SceneRepository
+from app.services.search_service import SearchService
+from app.services.change_service import ChangeService
+from app.core.config import configs
+from app.core.container import container
+from app.core.cache import tour_payload_cache
+from app.core.exceptions import NotFoundError, BadRequestError
+from app.core.write_coalescer import WriteCoalescer
+
+
+def _report_flush_error(future):
+    """Log lỗi của lần flush không có ai chờ kết quả"""
+    if not future.cancelled() and future.exception():
+        print(f"Hotspot position flush failed: {future.exception()}")
 
 
 class HotspotService(BaseService):
     """Service cho Hotspot"""
 
+    live_entity = "hotspot"
+
     def __init__(self):
         self.repository = HotspotRepository()
+        self.scene_repository = SceneRepository()
+        self.search_service = container.get(SearchService)
+        self.change_service = container.get(ChangeService)
+        self.position_coalescer = WriteCoalescer(
+            self._flush_positions,
+            window=configs.HOTSPOT_POSITION_COALESCE_MS / 1000,
+        )
 
     async def get_hotspots_by_scene(self, scene_id: str) -> List[Dict]:
         """Lấy tất cả hotspots của một scene"""
         return await self.repository.find_by_scene_id(scene_id)
 
+    async def get_hotspot_stamps_by_scene(self, scene_id: str) -> List[Dict]:
+        """Lấy change stamps các hotspots của một scene"""
+        return await self.repository.find_stamps_by_scene_id(scene_id)
+
     async def create_hotspot(self, data: Dict) -> Dict:
         """Tạo hotspot mới"""
         # Validate required fields
@@ -27,11 +54,103 @@ class HotspotService(BaseService):
         if "type" not in data:
             data["type"] = "click"
         
-        return await self.repository.create(data)
+        result = await self.repository.create(data)
+        tour_payload_cache.invalidate(data["scene_id"])
+        await self.after_write(result)
+        await self.publish("create", result)
+        return result
+
+    async def after_write(self, doc: Dict, fields: Optional[Iterable[str]] = None):
+        """Cập nhật search index của hotspot"""
+        await self.search_service.index("hotspot", doc, fields)
+
+    async def after_delete(self, id: str):
+        """Xóa search index của hotspot"""
+        await self.search_service.remove(id)
+
+    async def live_tour_id(self, doc: Dict) -> Optional[str]:
+        """Tour của scene chứa hotspot"""
+        scene_id = str(doc.get("scene_id"))
+        return (await self.scene_repository.find_tour_ids([scene_id])).get(scene_id)
+
+    async def publish_positions(self, positions: Dict[str, Dict]):
+        """Ghi delta vị trí mới của nhiều hotspots vào change log của các tour"""
+        try:
+            scene_ids = await self.repository.find_scene_ids(list(positions))
+            tour_ids = await self.scene_repository.find_tour_ids(list(set(scene_ids.values())))
+            deltas: Dict[str, List[Dict]] = {}
+            for hotspot_id, position in positions.items():
+                scene_id = scene_ids.get(hotspot_id)
+                if scene_id in tour_ids:
+                    deltas.setdefault(tour_ids[scene_id], []).append({
+                        "op": "update",
+                        "entity": "hotspot",
+                        "id": hotspot_id,
+                        "scene_id": scene_id,
+                        "fields": {"position": position},
+                    })
+            for tour_id, tour_deltas in deltas.items():
+                await self.change_service.record(tour_id, tour_deltas)
+        except Exception as e:
+            print(f"Change publish failed: {e}")
 
-    async def update_hotspot_position(self, hotspot_id: str, position: Dict) -> Dict:
+    async def update(
+        self, id: str, data: Dict, expected_version: Optional[int] = None
+    ) -> Dict:
+        """Cập nhật hotspot, vị trí mới không bị buffer coalescing ghi đè"""
+        if "position" in data:
+            await self.position_coalescer.settle([id])
+        return await super().update(id, data, expected_version)
+
+    async def update_hotspot_position(
+        self, hotspot_id: str, position: Dict, expected_version: Optional[int] = None
+    ) -> Dict:
         """Cập nhật vị trí hotspot"""
-        return await self.repository.update(hotspot_id, {"position": position})
+        return await self.update(hotspot_id, {"position": position}, expected_version)
+
+    async def batch_update_positions(
+        self, updates: List[Dict], relaxed: bool = False
+    ) -> Dict:
+        """
+        Cập nhật vị trí nhiều hotspots, chỉ giữ vị trí cuối cùng của mỗi hotspot
+
+        Args:
+            updates: List các dict {"id": ..., "position": {...}}
+            relaxed: True thì đưa vào buffer coalescing và trả về ngay,
+                False thì ghi ngay với write concern mặc định
+        """
+        positions = {}
+        for update in updates:
+            hotspot_id = update["id"]
+            if not ObjectId.is_valid(hotspot_id):
+                raise BadRequestError(f"Invalid hotspot id: {hotspot_id}")
+            positions[hotspot_id] = update["position"]
+
+        if relaxed:
+            future = self.position_coalescer.submit_many(positions)
+            future.add_done_callback(_report_flush_error)
+            # Delta được ghi trong _flush_positions, khi vị trí đã được lưu
+            return {"accepted": len(positions), "queued": True}
+
+        # Write trực tiếp mới hơn mọi write trong buffer: bỏ write đang chờ,
+        # chờ batch đang ghi xong để nó không đè lên vị trí mới
+        await self.position_coalescer.settle(positions.keys())
+        result = await self.repository.bulk_update_positions(positions)
+        tour_payload_cache.invalidate(*positions.keys())
+        await self.publish_positions(positions)
+        return {"accepted": len(positions), "queued": False, **result}
+
+    async def _flush_positions(self, positions: Dict[str, Dict]) -> Dict:
+        """Flush buffer vị trí xuống database"""
+        result = await self.repository.bulk_update_positions(positions, relaxed=True)
+        # Sau khi ghi: request đọc trong lúc chờ flush không cache lại vị trí cũ
+        tour_payload_cache.invalidate(*positions.keys())
+        await self.publish_positions(positions)
+        return result
+
+    async def close(self):
+        """Flush các vị trí còn trong buffer"""
+        await self.position_coalescer.close()
 
     async def bulk_create(self, hotspots: List[Dict]) -> List[Dict]:
         """Tạo nhiều hotspots cùng lúc"""
@@ -43,4 +162,10 @@ class HotspotService(BaseService):
 
     async def bulk_delete_by_scene(self, scene_id: str) -> int:
         """Xóa tất cả hotspots của một scene"""
-        return await self.repository.delete_by_scene_id(scene_id)
+        tour_payload_cache.invalidate(scene_id)
+        await self.search_service.remove_children(scene_id)
+        deleted = await self.repository.delete_by_scene_id(scene_id)
+        await self.change_service.resync(
+            *(await self.scene_repository.find_tour_ids([scene_id])).values()
+        )
+        return deleted
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.repository.scene_repository import SceneRepository
+from app.core.config import configs
+from app.core.storage import DELETE_BATCH_SIZE, get_storage
+from app.core.write_coalescer import WriteCoalescer
+from app.core.tracing import instrument
+
+# Số public_id orphan trả về trong báo cáo
+REPORT_SAMPLE_SIZE = 100
+
+
+async def _noop_progress(done: int, total: int, message: str = ""):
+    pass
+
+
+@instrument
+class ImageGCService:
+    """
+    Dọn ảnh không còn scene nào dùng
+
+    - `discard`: ảnh của scene vừa bị xóa/đổi ảnh được xóa nền, gom thành
+      batch DELETE_BATCH_SIZE public_id mỗi lần gọi storage
+    - `collect` (job gc_images): đối soát ảnh trong storage với scenes, xóa
+      ảnh orphan cũ hơn grace period (ảnh đang upload dở chưa gắn vào scene)
+    """
+
+    def __init__(self):
+        self.scene_repository = SceneRepository()
+        self._pending = WriteCoalescer(self._delete_pending, configs.IMAGE_GC_FLUSH_SECONDS)
+        self.deleted = 0
+        self.failed = 0
+
+    def discard(self, public_ids: Iterable[Optional[str]]):
+        """Xóa nền các ảnh (bỏ qua None), không chờ storage"""
+        ids = {public_id: True for public_id in public_ids if public_id}
+        if ids:
+            # _delete_pending không raise (lỗi được đếm trong `failed`)
+            self._pending.submit_many(ids)
+
+    async def _delete_pending(self, batch: Dict[str, bool]):
+        try:
+            # Scene khác có thể dùng chung ảnh (vd: restore với remap)
+            used = await self.scene_repository.find_used_image_ids(list(batch))
+        except Exception as e:
+            print(f"Image GC: failed to check {len(batch)} images, left for collect: {e}")
+            return
+        await self.delete([public_id for public_id in batch if public_id not in used])
+
+    async def delete(self, public_ids: List[str]) -> List[str]:
+        """Xóa ảnh theo batch, lỗi của một batch không chặn các batch khác"""
+        storage = get_storage()
+        deleted: List[str] = []
+        for start in range(0, len(public_ids), DELETE_BATCH_SIZE):
+            batch = public_ids[start:start + DELETE_BATCH_SIZE]
+            try:
+                deleted += await storage.delete_images(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"Image GC: failed to delete {len(batch)} images: {e}")
+        self.deleted += len(deleted)
+        return deleted
+
+    async def referenced(self) -> Dict[str, set]:
+        """public_id và URL của mọi ảnh/thumbnail scenes đang dùng"""
+        ids, urls = set(), set()
+        async for scene in self.scene_repository.iter_image_refs():
+            preview = scene.get("preview") or {}
+            ids.update(
+                id for id in (scene.get("image_public_id"), preview.get("thumbnail_public_id")) if id
+            )
+            urls.update(
+                url for url in (scene.get("image_url"), preview.get("thumbnail_url")) if url
+            )
+        return {"ids": ids, "urls": urls}
+
+    async def collect(
+        self,
+        dry_run: bool = True,
+        grace_hours: Optional[float] = None,
+        progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+    ) -> Dict:
+        """
+        Đối soát storage với scenes và xóa ảnh orphan
+
+        Ảnh được coi là đang dùng nếu public_id hoặc URL của nó nằm trên một
+        scene. Chỉ xét ảnh dưới IMAGE_GC_PREFIX.
+
+        Args:
+            dry_run: Chỉ báo cáo, không xóa
+            grace_hours: Bỏ qua ảnh mới hơn (mặc định IMAGE_GC_GRACE_HOURS)
+
+        Returns:
+            Báo cáo: số ảnh đã duyệt, orphan (số lượng, dung lượng, mẫu
+            public_id), số ảnh đã xóa
+        """
+        progress = progress or _noop_progress
+        grace_hours = configs.IMAGE_GC_GRACE_HOURS if grace_hours is None else grace_hours
+        cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+        storage = get_storage()
+
+        # Đọc references trước khi liệt kê storage: ảnh được gắn vào scene sau
+        # thời điểm này là ảnh mới, nằm trong grace period
+        refs = await self.referenced()
+        await progress(0, 0, "references loaded")
+
+        scanned = recent = orphan_bytes = 0
+        orphans: List[str] = []
+        async for image in storage.list_images(configs.IMAGE_GC_PREFIX):
+            scanned += 1
+            if image["public_id"] in refs["ids"] or image["url"] in refs["urls"]:
+                continue
+            if image["created_at"] > cutoff:
+                recent += 1
+                continue
+            orphans.append(image["public_id"])
+            orphan_bytes += image.get("bytes") or 0
+        await progress(0, len(orphans), f"scanned {scanned} images")
+
+        deleted: List[str] = []
+        if not dry_run:
+            for start in range(0, len(orphans), DELETE_BATCH_SIZE):
+                deleted += await self.delete(orphans[start:start + DELETE_BATCH_SIZE])
+                await progress(min(start + DELETE_BATCH_SIZE, len(orphans)), len(orphans), "deleting")
+
+        report = {
+            "dry_run": dry_run,
+            "storage": storage.name,
+            "prefix": configs.IMAGE_GC_PREFIX,
+            "grace_hours": grace_hours,
+            "scanned": scanned,
+            "referenced": scanned - recent - len(orphans),
+            "recent": recent,
+            "orphans": len(orphans),
+            "orphan_bytes": orphan_bytes,
+            "deleted": len(deleted),
+            "sample": orphans[:REPORT_SAMPLE_SIZE],
+        }
+        print(f"Image GC: {report['orphans']} orphans, {report['deleted']} deleted (dry_run={dry_run})")
+        return report
+
+    def stats(self) -> Dict:
+        """Số ảnh đã xóa/lỗi và số ảnh đang chờ xóa nền"""
+        return {
+            "pending": self._pending.pending_count,
+            "deleted": self.deleted,
+            "failed": self.failed,
+        }
+
+    async def close(self):
+        """Xóa nốt các ảnh đang chờ"""
+        await self._pending.close()
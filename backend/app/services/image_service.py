@@ -0,0 +1,356 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import configs
+from app.core.exceptions import BadRequestError
+from app.core.tracing import instrument
+
+try:
+    from PIL import Image, UnidentifiedImageError, features
+except ImportError:  # Pillow là optional, không có thì ảnh được lưu nguyên bản
+    Image = None
+
+
+# Số thành phần (x, y) của blurhash; panorama 2:1 nên x nhiều hơn y
+BLURHASH_COMPONENTS = (4, 3)
+# Kích thước ảnh dùng để tính blurhash và màu chủ đạo
+SAMPLE_SIZE = (64, 32)
+THUMBNAIL_QUALITY = 70
+
+# Encoder Pillow theo định dạng lưu panorama (PANORAMA_FORMAT)
+ENCODERS = {"webp": "WEBP", "avif": "AVIF", "jpeg": "JPEG"}
+# Sai lệch tỉ lệ 2:1 vẫn được coi là đúng (chỉ resize, không thêm viền)
+ASPECT_TOLERANCE = 0.01
+# Giới hạn khi tìm quality/kích thước vừa PANORAMA_MAX_BYTES
+MIN_QUALITY = 40
+MIN_BUDGET_WIDTH = 2048
+BUDGET_SCALE_STEP = 0.75
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(
+        BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length)
+    )
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exp: float) -> float:
+    return math.copysign(abs(value) ** exp, value)
+
+
+def blurhash_encode(
+    pixels: Sequence[Tuple[int, int, int]], width: int, height: int
+) -> str:
+    """Blurhash (https://blurha.sh) của ảnh RGB width x height (pixels theo hàng)"""
+    x_components, y_components = BLURHASH_COMPONENTS
+    linear = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in pixels]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = linear[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(v) for factor in ac for v in factor)
+        quantised_max = int(max(0, min(82, math.floor(actual_max * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1.0
+    result += _encode83(quantised_max, 1)
+    result += _encode83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]),
+        4,
+    )
+    for factor in ac:
+        q = [
+            int(max(0, min(18, math.floor(_sign_pow(v / maximum, 0.5) * 9 + 9.5))))
+            for v in factor
+        ]
+        result += _encode83(q[0] * 19 * 19 + q[1] * 19 + q[2], 2)
+    return result
+
+
+def _preview(image, thumbnail_width: int) -> Dict:
+    """Thumbnail (JPEG bytes), blurhash và màu chủ đạo của ảnh RGB"""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_width, thumbnail_width))
+    buffer = BytesIO()
+    thumbnail.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+
+    sample = thumbnail.resize(SAMPLE_SIZE)
+    palette_image = sample.quantize(colors=8)
+    palette = palette_image.getpalette()
+    _, index = max(palette_image.getcolors())
+    r, g, b = palette[index * 3:index * 3 + 3]
+
+    return {
+        "thumbnail": buffer.getvalue(),
+        "blurhash": blurhash_encode(list(sample.getdata()), *SAMPLE_SIZE),
+        "dominant_color": f"#{r:02x}{g:02x}{b:02x}",
+    }
+
+
+def normalize_panorama(image, max_width: int):
+    """
+    Đưa ảnh về equirectangular 2:1, chiều rộng tối đa max_width
+
+    Ảnh thấp hơn 2:1 (panorama không phủ hết chiều dọc) được thêm viền đen
+    trên/dưới, giữ đường chân trời ở giữa; ảnh cao hơn 2:1 bị co chiều cao.
+    """
+    width, height = image.size
+    scale = min(1.0, max_width / width)
+    target_width = max(2, int(width * scale) // 2 * 2)
+    target_height = target_width // 2
+    content_height = min(target_height, max(1, round(height * scale)))
+    if abs(content_height - target_height) <= target_height * ASPECT_TOLERANCE:
+        content_height = target_height
+
+    if (target_width, content_height) != image.size:
+        image = image.resize((target_width, content_height), Image.LANCZOS)
+    if content_height < target_height:
+        canvas = Image.new("RGB", (target_width, target_height))
+        canvas.paste(image, (0, (target_height - content_height) // 2))
+        image = canvas
+    return image
+
+
+def _encode(image, fmt: str, quality: int) -> bytes:
+    buffer = BytesIO()
+    options: Dict = {"quality": quality}
+    if fmt == "webp":
+        options["method"] = 4
+    elif fmt == "avif":
+        # Encoder AVIF mặc định rất chậm với panorama lớn
+        options["speed"] = 8
+    elif fmt == "jpeg":
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, ENCODERS[fmt], **options)
+    return buffer.getvalue()
+
+
+def encode_with_budget(image, fmt: str, quality: int, max_bytes: int) -> Tuple[bytes, int, object]:
+    """
+    Encode ảnh ở `quality`; nếu vượt max_bytes thì tìm quality cao nhất
+    (không dưới MIN_QUALITY) vừa budget, vẫn vượt thì thu nhỏ ảnh và thử lại
+
+    Returns:
+        (bytes, quality, ảnh đã encode)
+    """
+    data = _encode(image, fmt, quality)
+    while max_bytes and len(data) > max_bytes:
+        floor = _encode(image, fmt, MIN_QUALITY)
+        if len(floor) <= max_bytes:
+            # Binary search quality trong (MIN_QUALITY, quality)
+            low, high, best = MIN_QUALITY, quality - 1, (floor, MIN_QUALITY)
+            while low < high:
+                mid = (low + high + 1) // 2
+                candidate = _encode(image, fmt, mid)
+                if len(candidate) <= max_bytes:
+                    best, low = (candidate, mid), mid
+                else:
+                    high = mid - 1
+            return best[0], best[1], image
+        if image.width <= MIN_BUDGET_WIDTH:
+            # Budget không thể đạt: trả về bản nhỏ nhất
+            return floor, MIN_QUALITY, image
+        width = max(MIN_BUDGET_WIDTH, int(image.width * BUDGET_SCALE_STEP) // 2 * 2)
+        image = image.resize((width, width // 2), Image.LANCZOS)
+        data = _encode(image, fmt, quality)
+    return data, quality, image
+
+
+def process_image(source: Union[bytes, str], options: Dict) -> Dict:
+    """
+    Xử lý ảnh panorama upload (chạy trong process pool)
+
+    Args:
+        source: File ảnh gốc (bytes hoặc đường dẫn, file lớn không cần đọc
+            vào process chính)
+        options: format (webp/avif/jpeg/original), max_width, quality,
+            max_bytes, thumbnail_width (0 = không tạo preview)
+
+    Returns:
+        Dict với data (ảnh cần lưu, None nếu giữ nguyên file gốc), format,
+        transcode (báo cáo dung lượng, None nếu không transcode) và preview
+        (None nếu tắt)
+    """
+    if isinstance(source, bytes):
+        source_bytes = len(source)
+        source = BytesIO(source)
+    else:
+        source_bytes = os.path.getsize(source)
+
+    with Image.open(source) as source:
+        source_format = (source.format or "").lower()
+        width, height = source.size
+        fmt = options["format"]
+        if fmt != "original":
+            # JPEG: giải mã thẳng ở tỉ lệ nhỏ khi ảnh lớn hơn max_width
+            source.draft("RGB", (options["max_width"], options["max_width"] // 2))
+        elif options["thumbnail_width"]:
+            source.draft("RGB", (options["thumbnail_width"], options["thumbnail_width"]))
+        image = source.convert("RGB")
+
+    result: Dict = {"data": None, "format": source_format, "transcode": None, "preview": None}
+    if fmt != "original":
+        image = normalize_panorama(image, options["max_width"])
+        encoded, quality, image = encode_with_budget(
+            image, fmt, options["quality"], options["max_bytes"]
+        )
+        unchanged = (
+            (image.width, image.height) == (width, height)
+            and (not options["max_bytes"] or source_bytes <= options["max_bytes"])
+        )
+        if unchanged and len(encoded) >= source_bytes:
+            # Ảnh đã đúng kích thước và nhỏ hơn bản transcode: giữ nguyên
+            fmt, quality, stored_bytes = source_format, None, source_bytes
+        else:
+            result.update(data=encoded, format=fmt)
+            stored_bytes = len(encoded)
+        result["transcode"] = {
+            "source_format": source_format,
+            "source_width": width,
+            "source_height": height,
+            "source_bytes": source_bytes,
+            "format": fmt,
+            "width": image.width,
+            "height": image.height,
+            "quality": quality,
+            "bytes": stored_bytes,
+            "saved_bytes": source_bytes - stored_bytes,
+        }
+        width, height = image.size
+
+    if options["thumbnail_width"]:
+        result["preview"] = {
+            **_preview(image, options["thumbnail_width"]),
+            "width": width,
+            "height": height,
+        }
+    return result
+
+
+@instrument
+class ImageService:
+    """
+    Xử lý ảnh panorama upload (transcode, preview) trong process pool
+    IMAGE_WORKERS process để không chặn event loop
+    """
+
+    def __init__(self):
+        # Pool được tạo khi xử lý ảnh lần đầu
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.processed = 0
+        self.source_bytes = 0
+        self.stored_bytes = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: fork sau khi Motor/pymongo đã chạy thread có thể làm process con bị treo
+            self._pool = ProcessPoolExecutor(
+                max_workers=max(1, configs.IMAGE_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def options(self) -> Dict:
+        """Tham số của `process_image` theo cấu hình"""
+        fmt = configs.PANORAMA_FORMAT.lower()
+        if fmt == "avif" and Image is not None and not features.check("avif"):
+            # Pillow build không có AVIF encoder
+            fmt = "webp"
+        if fmt not in ENCODERS:
+            fmt = "original"
+        return {
+            "format": fmt,
+            "max_width": configs.PANORAMA_MAX_WIDTH,
+            "quality": configs.PANORAMA_QUALITY,
+            "max_bytes": configs.PANORAMA_MAX_BYTES,
+            "thumbnail_width": configs.SCENE_THUMBNAIL_WIDTH if configs.SCENE_PREVIEWS else 0,
+        }
+
+    async def process(self, source: Union[bytes, str]) -> Optional[Dict]:
+        """
+        Transcode panorama (bytes hoặc file trên đĩa) và tạo preview
+
+        Returns:
+            Kết quả của `process_image`, None nếu không cần xử lý (hoặc chưa
+            cài Pillow) - khi đó lưu nguyên file
+
+        Raises:
+            BadRequestError: File không phải ảnh đọc được
+        """
+        options = self.options()
+        if Image is None or (options["format"] == "original" and not options["thumbnail_width"]):
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor(), process_image, source, options)
+        except UnidentifiedImageError:
+            raise BadRequestError("File is not a readable image")
+        except Image.DecompressionBombError as e:
+            raise BadRequestError(str(e))
+        except (OSError, ValueError) as e:
+            # vd: ảnh bị cắt ("image file is truncated"), dữ liệu hỏng
+            raise BadRequestError(f"File is not a readable image: {e}")
+
+        self.processed += 1
+        report = result["transcode"]
+        if report:
+            self.source_bytes += report["source_bytes"]
+            self.stored_bytes += report["bytes"]
+            print(
+                f"Panorama transcoded: {report['source_format']} "
+                f"{report['source_width']}x{report['source_height']} {report['source_bytes']} B "
+                f"-> {report['format']} {report['width']}x{report['height']} {report['bytes']} B "
+                f"({report['saved_bytes']} B saved)"
+            )
+        return result
+
+    def stats(self) -> Dict:
+        """Tổng số ảnh đã xử lý và dung lượng trước/sau transcode"""
+        return {
+            "processed": self.processed,
+            "source_bytes": self.source_bytes,
+            "stored_bytes": self.stored_bytes,
+            "saved_bytes": self.source_bytes - self.stored_bytes,
+        }
+
+    def close(self):
+        """Dừng process pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.repository.job_repository import JobRepository
+from app.core.config import configs
+from app.core.exceptions import (
+    BadRequestError,
+    NotFoundError,
+    ServiceUnavailableError,
+    UnprocessableError,
+)
+from app.core.tracing import current_span, start_span
+
+# Handler của một loại job: (params, context) -> result
+JobHandler = Callable[[Dict, "JobContext"], Awaitable[Any]]
+# Tạo lại kết quả đầy đủ từ `result` đã lưu (result chỉ là tham chiếu): (result, request) -> response
+ResultLoader = Callable[[Any, Any], Awaitable[Any]]
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+HEARTBEAT_INTERVAL = 10
+STALE_AFTER = timedelta(seconds=HEARTBEAT_INTERVAL * 6)
+
+# Khoảng cách tối thiểu giữa hai lần ghi tiến độ xuống database
+PROGRESS_FLUSH_INTERVAL = 0.5
+
+
+def request_fingerprint(value: Any) -> str:
+    """Hash ổn định của tham số request, so khớp khi Idempotency-Key được dùng lại"""
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class JobContext:
+    """Context truyền cho handler để báo tiến độ"""
+
+    def __init__(self, service: "JobService", job_id: str):
+        self.service = service
+        self.job_id = job_id
+        self._last_flush = 0.0
+
+    async def progress(self, done: int, total: int, message: str = ""):
+        """Báo tiến độ, chỉ ghi database tối đa mỗi PROGRESS_FLUSH_INTERVAL giây"""
+        now = time.monotonic()
+        if done < total and now - self._last_flush < PROGRESS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        await self.service.repository.set_fields(
+            self.job_id,
+            {"progress": {"done": done, "total": total, "message": message}},
+        )
+
+
+class JobService:
+    """
+    Chạy các tác vụ nặng (import, export, cascade delete) trong nền
+
+    Job được lưu trong collection `jobs`, chạy bởi một pool worker giới hạn
+    trong process. Client nhận 202 kèm job id rồi poll trạng thái.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 100):
+        self.repository = JobRepository()
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self._handlers: Dict[str, JobHandler] = {}
+        self._result_loaders: Dict[str, ResultLoader] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._params: Dict[str, tuple] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._done_events: Dict[str, asyncio.Event] = {}
+
+    def register(
+        self, job_type: str, handler: JobHandler, result_loader: Optional[ResultLoader] = None
+    ):
+        """
+        Đăng ký handler cho một loại job
+
+        Args:
+            result_loader: Dùng khi kết quả quá lớn để lưu trong document job
+                (giới hạn 16MB): handler trả về tham chiếu, /jobs/{id}/result
+                gọi result_loader để tạo lại kết quả
+        """
+        self._handlers[job_type] = handler
+        if result_loader is not None:
+            self._result_loaders[job_type] = result_loader
+
+    async def load_result(self, job: Dict, request: Any) -> Any:
+        """Kết quả của job đã hoàn thành (tạo lại từ tham chiếu nếu có result_loader)"""
+        loader = self._result_loaders.get(job.get("type"))
+        if loader is None:
+            return job["result"]
+        return await loader(job["result"], request)
+
+    async def start(self):
+        """Khởi động worker pool và heartbeat"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.worker_count)
+        ]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        """Dừng worker, job đang chạy bị đánh dấu failed"""
+        tasks = list(self._workers)
+        if self._heartbeat_task:
+            tasks.append(self._heartbeat_task)
+        for job_id, task in list(self._running.items()):
+            await self.repository.transition(
+                job_id,
+                ["queued", "running"],
+                {
+                    "status": "failed",
+                    "error": "Server shutting down",
+                    "finished_at": datetime.utcnow(),
+                },
+            )
+            task.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat_task = None
+
+    async def submit(
+        self,
+        job_type: str,
+        params: Dict,
+        summary: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ) -> Dict:
+        """
+        Tạo job mới, hoặc trả về job cũ nếu idempotency key đã được dùng
+
+        Args:
+            job_type: Loại job đã đăng ký
+            params: Tham số truyền cho handler (giữ trong bộ nhớ)
+            summary: Thông tin ngắn gọn lưu kèm job để hiển thị
+            idempotency_key: Key do client gửi (header Idempotency-Key), riêng
+                cho từng loại job; dùng lại với tham số khác trả về 422
+            fingerprint: Hash của request (mặc định request_fingerprint(params)),
+                truyền vào khi params có giá trị không ổn định (vd: file tạm)
+        """
+        if job_type not in self._handlers:
+            raise BadRequestError(f"Unknown job type: {job_type}")
+        if self._queue is None:
+            raise ServiceUnavailableError("Job runner is not started")
+
+        fingerprint = fingerprint or request_fingerprint(params)
+        if idempotency_key:
+            existing = await self.find_existing(job_type, idempotency_key, fingerprint)
+            if existing:
+                return existing
+        if self._queue.full():
+            raise ServiceUnavailableError("Job queue is full", retry_after=5)
+
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "status": "queued",
+            "params": summary or {},
+            "progress": {"done": 0, "total": 0, "message": ""},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "heartbeat_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        if idempotency_key:
+            job["idempotency_key"] = idempotency_key
+            job["fingerprint"] = fingerprint
+        try:
+            job = await self.repository.create(job)
+        except DuplicateKeyError:
+            if not idempotency_key:
+                raise
+            # Request trùng key đến cùng lúc
+            return await self.find_existing(job_type, idempotency_key, fingerprint)
+
+        job_id = job["_id"]
+        # Span của request submit là span cha của job (cùng trace)
+        self._params[job_id] = (job_type, params, current_span())
+        self._done_events[job_id] = asyncio.Event()
+        self._queue.put_nowait(job_id)
+        return job
+
+    async def get_job(self, job_id: str) -> Dict:
+        """Lấy job theo ID"""
+        job = await self.repository.find_by_id(job_id)
+        if not job:
+            raise NotFoundError(f"Job not found: {job_id}")
+        return job
+
+    async def find_existing(
+        self, job_type: str, idempotency_key: str, fingerprint: str
+    ) -> Optional[Dict]:
+        """
+        Lấy job đã tạo với idempotency key (nếu có)
+
+        Raises:
+            UnprocessableError: Key đã dùng cho request có tham số khác
+        """
+        job = await self.repository.find_by_idempotency_key(job_type, idempotency_key)
+        if job and job.get("fingerprint") != fingerprint:
+            raise UnprocessableError(
+                "Idempotency-Key was already used with different parameters"
+            )
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Dict:
+        """Chờ job kết thúc tối đa timeout giây (long-poll), rồi trả về job"""
+        event = self._done_events.get(job_id)
+        if event is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get_job(job_id)
+
+    async def list_jobs(
+        self, status: Optional[str] = None, job_type: Optional[str] = None, limit: int = 50
+    ) -> List[Dict]:
+        """Danh sách job mới nhất"""
+        filter_dict = {}
+        if status:
+            filter_dict["status"] = status
+        if job_type:
+            filter_dict["type"] = job_type
+        return await self.repository.find_all(
+            filter_dict, limit=limit, sort=[("created_at", -1)]
+        )
+
+    async def cancel(self, job_id: str) -> Dict:
+        """Hủy job đang chờ hoặc đang chạy"""
+        job = await self.get_job(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            return job
+
+        cancelled = await self.repository.transition(
+            job_id,
+            ["queued"],
+            {"status": "cancelled", "finished_at": datetime.utcnow()},
+        )
+        if not cancelled:
+            # Đang chạy: hủy task nếu ở process này, nếu không để heartbeat
+            # của process đang giữ job xử lý
+            await self.repository.set_fields(job_id, {"cancel_requested": True})
+            task = self._running.get(job_id)
+            if task:
+                task.cancel()
+        return await self.get_job(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job_type, params, parent = self._params.pop(job_id)
+        started = await self.repository.transition(
+            job_id,
+            ["queued"],
+            {"status": "running", "started_at": datetime.utcnow()},
+        )
+        if not started:
+            self._finish(job_id)
+            return
+
+        handler = self._handlers[job_type]
+        with start_span(
+            f"job {job_type}", parent=parent, new_trace=True, **{"job.id": job_id}
+        ) as span:
+            # Task copy context hiện tại nên span của handler là con của span job
+            task = asyncio.create_task(handler(params, JobContext(self, job_id)))
+            self._running[job_id] = task
+
+            try:
+                result = await task
+                fields = {"status": "succeeded", "result": result}
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # Worker bị hủy (shutdown), không phải job
+                    raise
+                fields = {"status": "cancelled"}
+            except Exception as e:
+                fields = {"status": "failed", "error": str(getattr(e, "detail", e))}
+            finally:
+                self._running.pop(job_id, None)
+            if span is not None and fields["status"] != "succeeded":
+                span.error = fields.get("error") or fields["status"]
+
+        fields["finished_at"] = datetime.utcnow()
+        await self.repository.transition(job_id, ["running"], fields)
+        self._finish(job_id)
+
+    def _finish(self, job_id: str):
+        event = self._done_events.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                active = list(self._done_events.keys())
+                await self.repository.heartbeat(active)
+
+                # Hủy các job được yêu cầu cancel từ process khác
+                for job_id, task in list(self._running.items()):
+                    job = await self.repository.find_one(
+                        {"_id": ObjectId(job_id), "cancel_requested": True}
+                    )
+                    if job:
+                        task.cancel()
+
+                await self.repository.fail_stale(
+                    datetime.utcnow() - STALE_AFTER, "Worker lost (no heartbeat)"
+                )
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+# Singleton instance
+job_service = JobService(workers=configs.JOB_WORKERS, queue_size=configs.JOB_QUEUE_SIZE)
@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional
+
+from app.migrations import MIGRATIONS, Migration
+from app.repository.migration_repository import MigrationRepository
+from app.services.tour_service import ProgressCallback, _noop_progress
+from app.core.config import configs
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.core.tracing import instrument
+
+# Thời gian giữ quyền chạy một migration, được gia hạn sau mỗi batch
+LEASE_SECONDS = 300
+
+
+def _after(query: Dict, last_id) -> Dict:
+    """Filter của migration, chỉ lấy document sau checkpoint"""
+    if last_id is None:
+        return query
+    return {"$and": [query, {"_id": {"$gt": last_id}}]}
+
+
+@instrument
+class MigrationService:
+    """
+    Chạy các schema migration theo batch (MIGRATION_BATCH_SIZE documents mỗi
+    bulk_write), lưu checkpoint sau mỗi batch để chạy tiếp khi bị dừng
+    """
+
+    def __init__(self):
+        self.repository = MigrationRepository()
+        self.migrations: List[Migration] = sorted(MIGRATIONS, key=lambda m: m.id)
+
+    def _get(self, migration_id: str) -> Migration:
+        for migration in self.migrations:
+            if migration.id == migration_id:
+                return migration
+        raise NotFoundError(f"Migration not found: {migration_id}")
+
+    async def list_status(self) -> List[Dict]:
+        """Trạng thái các migration kèm số document chưa migrate"""
+        result = []
+        for migration in self.migrations:
+            state = await self.repository.find_state(migration.id) or {"status": "pending"}
+            state.pop("last_id", None)
+            state.pop("_id", None)
+            remaining = await self.repository.target(migration.collection).count_documents(
+                migration.query()
+            )
+            result.append(
+                {
+                    "id": migration.id,
+                    "collection": migration.collection,
+                    "description": migration.description,
+                    "enabled": migration.enabled(),
+                    **state,
+                    "remaining": remaining,
+                }
+            )
+        return result
+
+    async def run(
+        self,
+        migration_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[Dict]:
+        """
+        Chạy một migration (hoặc tất cả migration chưa hoàn tất theo thứ tự,
+        bỏ qua migration không áp dụng với cấu hình hiện tại)
+
+        Returns:
+            Kết quả từng migration: số document đã xử lý, kích thước
+            collection/index trước và sau
+        """
+        progress = progress or _noop_progress
+        if migration_id:
+            migration = self._get(migration_id)
+            if not migration.enabled():
+                raise BadRequestError(f"Migration is disabled by configuration: {migration_id}")
+            targets = [migration]
+        else:
+            targets = [migration for migration in self.migrations if migration.enabled()]
+        return [await self._run(migration, progress) for migration in targets]
+
+    async def _run(self, migration: Migration, progress: ProgressCallback) -> Dict:
+        state = await self.repository.claim(
+            migration.id,
+            LEASE_SECONDS,
+            {
+                "collection": migration.collection,
+                "description": migration.description,
+                "processed": 0,
+                "last_id": None,
+            },
+        )
+        if state is None:
+            current = await self.repository.find_state(migration.id)
+            if current and current.get("status") == "completed":
+                return {"id": migration.id, "status": "completed", "skipped": True}
+            raise ConflictError(f"Migration is already running: {migration.id}")
+
+        collection = self.repository.target(migration.collection)
+        if not state.get("sizes_before"):
+            state["sizes_before"] = await self.repository.collection_sizes(migration.collection)
+            await self.repository.checkpoint(
+                migration.id, LEASE_SECONDS, {"sizes_before": state["sizes_before"]}
+            )
+
+        last_id = state.get("last_id")
+        processed = state.get("processed", 0)
+        batch_size = configs.MIGRATION_BATCH_SIZE
+        total = processed + await collection.count_documents(_after(migration.query(), last_id))
+        try:
+            while True:
+                batch = await (
+                    collection.find(_after(migration.query(), last_id))
+                    .sort("_id", 1)
+                    .limit(batch_size)
+                    .to_list(length=batch_size)
+                )
+                if not batch:
+                    break
+                await migration.apply(collection, batch)
+
+                last_id = batch[-1]["_id"]
+                processed += len(batch)
+                await self.repository.checkpoint(
+                    migration.id, LEASE_SECONDS, {"last_id": last_id, "processed": processed}
+                )
+                await progress(processed, total, migration.id)
+        except Exception as e:
+            await self.repository.finish(migration.id, "failed", {"error": str(e)})
+            raise
+
+        sizes_after = await self.repository.collection_sizes(migration.collection)
+        await self.repository.finish(
+            migration.id, "completed", {"sizes_after": sizes_after, "error": None}
+        )
+        return {
+            "id": migration.id,
+            "status": "completed",
+            "processed": processed,
+            "sizes_before": state["sizes_before"],
+            "sizes_after": sizes_after,
+        }
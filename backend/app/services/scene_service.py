@@ -1,24 +1,56 @@
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Union
 from fastapi import UploadFile
 
 from app.services.base_service import BaseService
 from app.repository.scene_repository import SceneRepository
 from app.repository.hotspot_repository import HotspotRepository
-from app.core.cloudinary_config import cloudinary_service
+from app.services.search_service import SearchService
+from app.services.image_service import ImageService
+from app.services.upload_service import UploadService
+from app.services.image_gc_service import ImageGCService
+from app.core.storage import get_storage
+from app.core.container import container
+from app.core.cache import tour_payload_cache
 from app.core.exceptions import NotFoundError
 
 
 class SceneService(BaseService):
     """Service cho Scene"""
 
+    live_entity = "scene"
+
     def __init__(self):
         self.repository = SceneRepository()
         self.hotspot_repository = HotspotRepository()
+        self.search_service = container.get(SearchService)
+        self.image_service = container.get(ImageService)
+        self.upload_service = container.get(UploadService)
+        self.image_gc = container.get(ImageGCService)
 
     async def get_scenes_by_tour(self, tour_id: str) -> List[Dict]:
         """Lấy tất cả scenes của một tour"""
         return await self.repository.find_by_tour_id(tour_id)
 
+    async def create(self, data: Dict) -> Dict:
+        """Tạo scene mới"""
+        result = await self.repository.create(data)
+        tour_payload_cache.invalidate(data.get("tour_id"))
+        await self.after_write(result)
+        await self.publish("create", result)
+        return result
+
+    async def after_write(self, doc: Dict, fields: Optional[Iterable[str]] = None):
+        """Cập nhật search index của scene"""
+        await self.search_service.index("scene", doc, fields)
+
+    async def after_delete(self, id: str):
+        """Xóa search index của scene và hotspots của nó"""
+        await self.search_service.remove(id)
+
+    async def get_scene_stamps_by_tour(self, tour_id: str) -> List[Dict]:
+        """Lấy change stamps các scenes của một tour"""
+        return await self.repository.find_stamps_by_tour_id(tour_id)
+
     async def get_scene_with_hotspots(self, scene_id: str) -> Dict:
         """Lấy scene kèm hotspots"""
         scene = await self.repository.find_by_id(scene_id)
@@ -30,41 +62,80 @@ class SceneService(BaseService):
         return scene
 
     async def upload_image(self, file: UploadFile, tour_id: str) -> Dict:
+        """Lưu ảnh scene từ file upload multipart (xem `store_image`)"""
+        return await self.store_image(await file.read(), tour_id)
+
+    async def upload_from_session(self, upload_id: str, tour_id: str) -> Dict:
+        """Lưu ảnh scene từ resumable upload đã complete rồi xóa upload"""
+        path = await self.upload_service.completed_path(upload_id)
+        result = await self.store_image(path, tour_id)
+        await self.upload_service.discard(upload_id)
+        return result
+
+    async def store_image(self, source: Union[bytes, str], tour_id: str) -> Dict:
         """
-        Upload ảnh scene lên Cloudinary
+        Transcode ảnh scene (2:1, PANORAMA_FORMAT) và tạo preview trong
+        process pool rồi lưu vào storage (STORAGE_BACKEND)
+
+        Args:
+            source: Nội dung ảnh hoặc đường dẫn file trên đĩa
 
         Returns:
-            Dict với url và public_id
+            Dict với url, public_id, preview ({} nếu không tạo được) và
+            transcode (báo cáo dung lượng, None nếu không transcode)
         """
-        result = await cloudinary_service.upload_image(
-            file,
-            folder=f"novaland/scenes/{tour_id}",
-        )
+        folder = f"novaland/scenes/{tour_id}"
+        processed = await self.image_service.process(source) or {}
+        if processed.get("data"):
+            result = await get_storage().upload_bytes(processed["data"], folder=folder)
+        elif isinstance(source, bytes):
+            result = await get_storage().upload_bytes(source, folder=folder)
+        else:
+            result = await get_storage().upload_file(source, folder=folder)
         return {
             "url": result["url"],
             "public_id": result["public_id"],
+            "preview": await self._store_preview(processed.get("preview"), folder),
+            "transcode": processed.get("transcode"),
         }
 
-    async def delete_image(self, public_id: str) -> bool:
-        """Xóa ảnh scene trên Cloudinary"""
+    async def _store_preview(self, preview: Optional[Dict], folder: str) -> Dict:
+        """Upload thumbnail, trả về field `preview` lưu trên scene"""
+        if not preview:
+            return {}
         try:
-            return cloudinary_service.delete_image(public_id)
-        except Exception:
-            return False
+            thumbnail = await get_storage().upload_bytes(
+                preview.pop("thumbnail"), folder=f"{folder}/thumbnails"
+            )
+        except Exception as e:
+            print(f"Scene thumbnail upload failed: {e}")
+            return {}
+        return {
+            **preview,
+            "thumbnail_url": thumbnail["url"],
+            "thumbnail_public_id": thumbnail["public_id"],
+        }
 
-    async def delete_scene_cascade(self, scene_id: str) -> bool:
-        """Xóa scene và tất cả hotspots liên quan"""
-        scene = await self.repository.find_by_id(scene_id)
-        if not scene:
-            raise NotFoundError(f"Scene not found: {scene_id}")
+    @staticmethod
+    def image_ids(scene: Dict) -> List[Optional[str]]:
+        """public_id ảnh và thumbnail của scene"""
+        return [scene.get("image_public_id"), (scene.get("preview") or {}).get("thumbnail_public_id")]
+
+    def discard_images(self, scene: Dict):
+        """Xóa nền ảnh và thumbnail của scene (ImageGCService, không chờ storage)"""
+        self.image_gc.discard(self.image_ids(scene))
 
-        # Xóa ảnh trên Cloudinary nếu có
-        public_id = scene.get("image_public_id")
-        if public_id:
-            await self.delete_image(public_id)
+    async def delete_scene_cascade(
+        self, scene_id: str, expected_version: Optional[int] = None
+    ) -> Dict:
+        """Xóa scene và tất cả hotspots liên quan, trả về scene đã xóa"""
+        # Xóa scene trước (find_one_and_delete trả về document để lấy ảnh)
+        scene = await self.delete(scene_id, expected_version)
 
         # Xóa hotspots
         await self.hotspot_repository.delete_by_scene_id(scene_id)
 
-        # Xóa scene
-        return await self.repository.delete(scene_id)
+        # Ảnh và thumbnail được xóa nền
+        self.discard_images(scene)
+
+        return scene
@@ -0,0 +1,222 @@
+import asyncio
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.repository.search_repository import SearchRepository
+from app.repository.tour_repository import TourRepository
+from app.repository.scene_repository import SceneRepository
+from app.repository.hotspot_repository import HotspotRepository
+from app.core.text import (
+    edge_prefixes,
+    fold_text,
+    tokenize,
+    MIN_PREFIX_LENGTH,
+    MAX_PREFIX_LENGTH,
+)
+from app.core.tracing import instrument
+
+# kind -> (field tiêu đề, field nội dung, field cha)
+SEARCH_FIELDS = {
+    "tour": ("name", None, None),
+    "scene": ("name", "description", "tour_id"),
+    "hotspot": ("label", None, "scene_id"),
+}
+
+# Ưu tiên nhẹ khi điểm bằng nhau
+KIND_WEIGHTS = {"tour": 0.3, "scene": 0.2, "hotspot": 0.1}
+
+# Số entry tối đa được chấm điểm mỗi query prefix
+MAX_CANDIDATES = 500
+
+
+@instrument
+class SearchService:
+    """Service cho tìm kiếm tours, scenes, hotspots (bỏ dấu tiếng Việt)"""
+
+    def __init__(self):
+        self.repository = SearchRepository()
+
+    def build_entry(self, kind: str, doc: Dict) -> Dict:
+        """Tạo entry search từ document gốc"""
+        title_field, body_field, parent_field = SEARCH_FIELDS[kind]
+        title = doc.get(title_field) or ""
+        body = (doc.get(body_field) or "") if body_field else ""
+        title_folded = fold_text(title)
+        body_folded = fold_text(body)
+        return {
+            "_id": f"{kind}:{doc['_id']}",
+            "kind": kind,
+            "ref_id": str(doc["_id"]),
+            "parent_id": doc.get(parent_field) if parent_field else None,
+            "title": title,
+            "body": body,
+            "title_folded": title_folded,
+            "body_folded": body_folded,
+            "prefixes": edge_prefixes(
+                title_folded.split() + body_folded.split()
+            ),
+        }
+
+    async def index(
+        self, kind: str, doc: Dict, fields: Optional[Iterable[str]] = None
+    ) -> bool:
+        """
+        Cập nhật entry search của một document
+
+        Args:
+            kind: "tour", "scene" hoặc "hotspot"
+            doc: Document đầy đủ sau khi ghi
+            fields: Các field vừa thay đổi, bỏ qua nếu không field nào được index
+        """
+        if fields is not None:
+            indexed = {f for f in SEARCH_FIELDS[kind] if f}
+            if not indexed.intersection(fields):
+                return False
+        await self.repository.upsert(self.build_entry(kind, doc))
+        return True
+
+    async def remove(self, *ids: str) -> int:
+        """Xóa entry của các document và con trực tiếp của chúng"""
+        ids = [id for id in ids if id]
+        if not ids:
+            return 0
+        return await self.repository.delete_by_refs(ids)
+
+    async def remove_children(self, parent_id: str) -> int:
+        """Xóa entry con trực tiếp (vd: hotspots của một scene)"""
+        return await self.repository.delete_children(parent_id)
+
+    async def search(
+        self,
+        query: str,
+        kinds: Optional[List[str]] = None,
+        limit: int = 20,
+        mode: str = "prefix",
+    ) -> List[Dict]:
+        """
+        Tìm kiếm có xếp hạng
+
+        Args:
+            query: Chuỗi tìm kiếm, có hoặc không dấu
+            kinds: Lọc theo loại document
+            limit: Số kết quả tối đa
+            mode: "prefix" cho typeahead, "text" cho full-text theo từ
+        """
+        terms = [t for t in tokenize(query) if len(t) >= MIN_PREFIX_LENGTH]
+        if not terms:
+            return []
+
+        if mode == "text":
+            candidates = await self.repository.find_by_text(
+                " ".join(terms), kinds, limit
+            )
+        else:
+            # Prefix dài nhất đứng đầu để index chọn bound hẹp nhất
+            prefixes = sorted(
+                {t[:MAX_PREFIX_LENGTH] for t in terms}, key=len, reverse=True
+            )
+            candidates = await self.repository.find_by_prefixes(
+                prefixes, kinds, limit * 5, max(limit * 5, MAX_CANDIDATES)
+            )
+
+        folded_query = " ".join(terms)
+        results = [
+            {
+                "kind": doc["kind"],
+                "id": doc["ref_id"],
+                "parent_id": doc.get("parent_id"),
+                "title": doc.get("title", ""),
+                "body": doc.get("body", ""),
+                "score": round(self._rank(doc, terms, folded_query), 3),
+            }
+            for doc in candidates
+        ]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _rank(doc: Dict, terms: List[str], folded_query: str) -> float:
+        """Điểm: khớp nguyên từ > khớp prefix ở tiêu đề > khớp ở nội dung"""
+        title = doc.get("title_folded", "")
+        title_words = title.split()
+        body_words = doc.get("body_folded", "").split()
+
+        score = doc.get("score", 0.0)
+        for term in terms:
+            if term in title_words:
+                score += 3
+            elif any(word.startswith(term) for word in title_words):
+                score += 2
+            elif any(word.startswith(term) for word in body_words):
+                score += 1
+        if title.startswith(folded_query):
+            score += 2
+        if title == folded_query:
+            score += 2
+        # Tiêu đề ngắn hơn khớp sát hơn
+        score += 1 / (1 + len(title_words))
+        return score + KIND_WEIGHTS.get(doc.get("kind"), 0)
+
+    async def match_filter(self, kind: str, query: str) -> Optional[Dict]:
+        """
+        Filter search index cho document có tiêu đề khớp query (dùng cho filter theo tên)
+
+        Mặc định dùng prefix index: mọi từ của query là prefix của một từ, không
+        theo thứ tự. Query có từ ngắn hơn MIN_PREFIX_LENGTH hoặc không khớp theo
+        prefix mới tìm chuỗi con bằng regex (quét index title_folded).
+        None nếu query không còn ký tự chữ/số sau khi fold.
+        """
+        folded_query = fold_text(query)
+        if not folded_query:
+            return None
+        words = folded_query.split()
+        if all(len(word) >= MIN_PREFIX_LENGTH for word in words):
+            prefixes = sorted({w[:MAX_PREFIX_LENGTH] for w in words}, key=len, reverse=True)
+            filter_dict = {"kind": kind, "prefixes": {"$all": prefixes}}
+            if await self.repository.exists(filter_dict):
+                return filter_dict
+        return {"kind": kind, "title_folded": {"$regex": re.escape(folded_query)}}
+
+    async def match_ids(
+        self, kind: str, query: str, skip: int = 0, limit: int = 0
+    ) -> List[str]:
+        """ID các document khớp query theo thứ tự ID (limit=0: không giới hạn)"""
+        filter_dict = await self.match_filter(kind, query)
+        if filter_dict is None:
+            return []
+        return await self.repository.find_ref_ids(filter_dict, skip, limit)
+
+    async def match_page(
+        self, kind: str, query: str, skip: int, limit: int
+    ) -> Tuple[List[str], int]:
+        """Một trang ID khớp query (theo thứ tự ID) và tổng số, đếm trên search index"""
+        filter_dict = await self.match_filter(kind, query)
+        if filter_dict is None:
+            return [], 0
+        ids, total_count = await asyncio.gather(
+            self.repository.find_ref_ids(filter_dict, skip, limit),
+            self.repository.count(filter_dict),
+        )
+        return ids, total_count
+
+    async def rebuild(self) -> Dict[str, int]:
+        """Index lại toàn bộ tours, scenes, hotspots"""
+        await self.repository.delete_many({})
+        counts = {}
+        sources = {
+            "tour": TourRepository(),
+            "scene": SceneRepository(),
+            "hotspot": HotspotRepository(),
+        }
+        for kind, repository in sources.items():
+            count = 0
+            batch = []
+            async for doc in repository.iter_all():
+                batch.append(self.build_entry(kind, doc))
+                if len(batch) >= 1000:
+                    count += await self.repository.bulk_upsert(batch)
+                    batch = []
+            if batch:
+                count += await self.repository.bulk_upsert(batch)
+            counts[kind] = count
+        return counts
@@ -1,19 +1,205 @@
-from typing import Dict, List
+import asyncio
+import re
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from bson import ObjectId
 
 from app.services.base_service import BaseService
 from app.repository.tour_repository import TourRepository
 from app.repository.scene_repository import SceneRepository
 from app.repository.hotspot_repository import HotspotRepository
+from app.services.search_service import SearchService
+from app.services.change_service import ChangeService
+from app.services.scene_service import SceneService
+from app.services.hotspot_service import HotspotService
+from app.core.config import configs
+from app.core.text import fold_text
+from app.core.container import container
 from app.core.exceptions import NotFoundError
+from app.core.cache import CachedPayload, tour_payload_cache
+from app.core.compression import precompress
+from app.core.single_flight import SingleFlight
+from app.core.write_coalescer import WriteCoalescer
+
+# Callback báo tiến độ: (done, total, message)
+ProgressCallback = Callable[[int, int, str], Awaitable[None]]
+
+
+async def _noop_progress(done: int, total: int, message: str = ""):
+    pass
+
+
+def _report_view_flush_error(future):
+    """Log lỗi của lần ghi lượt xem (không có ai chờ kết quả)"""
+    if not future.cancelled() and future.exception():
+        print(f"Tour view flush failed: {future.exception()}")
+
+
+def format_hotspot(hotspot: Dict) -> Dict:
+    """Format hotspot cho frontend (tour.json)"""
+    return {
+        "id": hotspot["_id"],
+        "type": hotspot.get("type", "click"),
+        "position": hotspot.get("position", {"x": 0, "y": 0, "z": 0}),
+        "targetScene": hotspot.get("target_scene"),
+        "label": hotspot.get("label", ""),
+        "fovTrigger": hotspot.get("fov_trigger"),
+    }
+
+
+def format_preview(preview: Dict) -> Dict:
+    """Format preview của scene cho frontend"""
+    return {
+        "thumbnail": preview.get("thumbnail_url"),
+        "blurhash": preview.get("blurhash"),
+        "dominantColor": preview.get("dominant_color"),
+        "width": preview.get("width"),
+        "height": preview.get("height"),
+    }
+
+
+def preview_fields(preview: Dict) -> Dict:
+    """Field `preview` lưu trên scene từ preview trong JSON (backup)"""
+    fields = {
+        "thumbnail_url": preview.get("thumbnail"),
+        "blurhash": preview.get("blurhash"),
+        "dominant_color": preview.get("dominantColor"),
+        "width": preview.get("width"),
+        "height": preview.get("height"),
+    }
+    if preview.get("thumbnailPublicId"):
+        fields["thumbnail_public_id"] = preview["thumbnailPublicId"]
+    return fields
+
+
+def format_scene(scene: Dict, hotspots: List[Dict]) -> Dict:
+    """Format scene kèm hotspots cho frontend (tour.json)"""
+    formatted = {
+        "id": scene["_id"],
+        "name": scene.get("name", ""),
+        "description": scene.get("description", ""),
+        "image": scene.get("image_url", ""),
+        "initialView": scene.get("initial_view", {"yaw": 0, "pitch": 0, "fov": 100}),
+        "hotspots": [format_hotspot(h) for h in hotspots],
+    }
+    if scene.get("preview"):
+        formatted["preview"] = format_preview(scene["preview"])
+    return formatted
+
+
+def scene_fields(scene_info: Dict) -> Dict:
+    """Field của scene từ JSON import (không gồm tour_id, source_id)"""
+    fields = {
+        "name": scene_info.get("name", ""),
+        "description": scene_info.get("description", ""),
+        "image_url": scene_info.get("image", ""),
+        "initial_view": scene_info.get("initialView", {"yaw": 0, "pitch": 0, "fov": 100}),
+    }
+    if scene_info.get("imagePublicId"):
+        fields["image_public_id"] = scene_info["imagePublicId"]
+    return fields
+
+
+def hotspot_fields(hotspot_info: Dict, scene_id_map: Dict[str, str]) -> Dict:
+    """Field của hotspot từ JSON import, targetScene được map sang ID mới"""
+    target_scene = hotspot_info.get("targetScene", "")
+    return {
+        "type": hotspot_info.get("type", "click"),
+        "position": hotspot_info.get("position", {"x": 0, "y": 0, "z": 0}),
+        "target_scene": scene_id_map.get(target_scene, target_scene),
+        "label": hotspot_info.get("label", ""),
+        "fov_trigger": hotspot_info.get("fovTrigger"),
+    }
+
+
+def hotspot_source_id(scene_source_id: str, index: int, hotspot_info: Dict) -> str:
+    """ID gốc của hotspot trong JSON (theo vị trí nếu JSON không có id)"""
+    return hotspot_info.get("id") or f"{scene_source_id}#{index}"
+
+
+def _index_by_keys(documents: List[Dict]) -> Dict[str, Dict]:
+    """Index documents theo ID và source_id (nếu có)"""
+    index = {doc["_id"]: doc for doc in documents}
+    index.update((doc["source_id"], doc) for doc in documents if doc.get("source_id"))
+    return index
+
+
+def _changed_fields(current: Dict, fields: Dict) -> Dict:
+    """Các field có giá trị khác với document hiện tại"""
+    return {k: v for k, v in fields.items() if current.get(k) != v}
 
 
 class TourService(BaseService):
     """Service cho Tour"""
 
+    live_entity = "tour"
+
     def __init__(self):
         self.repository = TourRepository()
         self.scene_repository = SceneRepository()
         self.hotspot_repository = HotspotRepository()
+        self.search_service = container.get(SearchService)
+        self.change_service = container.get(ChangeService)
+        self.scene_service = container.get(SceneService)
+        self.hotspot_service = container.get(HotspotService)
+        # Các request đồng thời cùng payload chỉ chạy một lần truy vấn
+        self.payload_flights = SingleFlight()
+        # Lượt xem được cộng dồn trong bộ nhớ và ghi định kỳ
+        self._views: Counter = Counter()
+        self.view_coalescer = WriteCoalescer(
+            self._flush_views, window=configs.VIEW_FLUSH_SECONDS
+        )
+
+    async def after_write(self, doc: Dict, fields: Optional[Iterable[str]] = None):
+        """Cập nhật search index của tour"""
+        await self.search_service.index("tour", doc, fields)
+
+    async def after_delete(self, id: str):
+        """Xóa search index của tour và scenes của nó"""
+        await self.search_service.remove(id)
+
+    async def live_tour_id(self, doc: Dict) -> Optional[str]:
+        return doc["_id"]
+
+    async def find_tour_ids_by_name(self, name: str) -> List[str]:
+        """Tìm ID tất cả tours theo tên (không phân biệt dấu, dùng search index)"""
+        return await self.search_service.match_ids("tour", name)
+
+    async def name_filter(self, name: str) -> Dict:
+        """Filter tours theo tên (không phân biệt dấu, dùng search index)"""
+        if not fold_text(name):
+            # Chỉ có ký tự đặc biệt: search index không có, lọc regex trên tên
+            return {"name": {"$regex": re.escape(name), "$options": "i"}}
+        tour_ids = await self.find_tour_ids_by_name(name)
+        return {"_id": {"$in": [ObjectId(id) for id in tour_ids]}}
+
+    async def find_by_name(self, name: str, page: int = 1, page_size: int = 20) -> Dict:
+        """
+        Danh sách tours theo tên, phân trang và đếm trên search index
+
+        Không dựng `$in` với toàn bộ ID khớp: chỉ đọc ID của trang hiện tại
+        (theo thứ tự ID) rồi lấy các tour đó.
+        """
+        if not fold_text(name):
+            return await self.get_list(await self.name_filter(name), page, page_size)
+
+        tour_ids, total_count = await self.search_service.match_page(
+            "tour", name, (page - 1) * page_size, page_size
+        )
+        tours = {}
+        if tour_ids:
+            docs = await self.repository.find_all(
+                {"_id": {"$in": [ObjectId(id) for id in tour_ids]}}, limit=len(tour_ids)
+            )
+            tours = {doc["_id"]: doc for doc in docs}
+        return {
+            "items": [tours[id] for id in tour_ids if id in tours],
+            "search_options": {
+                "page": page,
+                "page_size": page_size,
+                "total_count": total_count,
+            },
+        }
 
     async def get_tour_with_scenes(self, tour_id: str) -> Dict:
         """Lấy tour kèm tất cả scenes và hotspots"""
@@ -22,36 +208,13 @@ class TourService(BaseService):
             raise NotFoundError(f"Tour not found: {tour_id}")
 
         scenes = await self.scene_repository.find_by_tour_id(tour_id)
+        hotspots_by_scene = await self.hotspot_repository.find_grouped_by_scene(
+            [scene["_id"] for scene in scenes]
+        )
 
         scenes_dict = {}
         for scene in scenes:
-            scene_id = scene["_id"]
-            hotspots = await self.hotspot_repository.find_by_scene_id(scene_id)
-
-            # Format hotspots cho frontend
-            formatted_hotspots = []
-            for h in hotspots:
-                formatted_hotspots.append(
-                    {
-                        "id": h["_id"],
-                        "type": h.get("type", "click"),
-                        "position": h.get("position", {"x": 0, "y": 0, "z": 0}),
-                        "targetScene": h.get("target_scene"),
-                        "label": h.get("label", ""),
-                        "fovTrigger": h.get("fov_trigger"),
-                    }
-                )
-
-            scenes_dict[scene_id] = {
-                "id": scene_id,
-                "name": scene.get("name", ""),
-                "description": scene.get("description", ""),
-                "image": scene.get("image_url", ""),
-                "initialView": scene.get(
-                    "initial_view", {"yaw": 0, "pitch": 0, "fov": 100}
-                ),
-                "hotspots": formatted_hotspots,
-            }
+            scenes_dict[scene["_id"]] = format_scene(scene, hotspots_by_scene[scene["_id"]])
 
         tour["scenes"] = scenes_dict
         return tour
@@ -66,11 +229,324 @@ class TourService(BaseService):
             "scenes": tour.get("scenes", {}),
         }
 
-    async def delete_tour_cascade(self, tour_id: str) -> bool:
-        """Xóa tour và tất cả scenes, hotspots liên quan"""
+    async def get_full_payload(self, tour_id: str) -> CachedPayload:
+        """Lấy payload JSON của tour đầy đủ, dùng cache nếu còn hạn"""
+        key = ("full", tour_id)
+        payload = tour_payload_cache.get(key)
+        if payload is None:
+            # Generation nằm trong key: request đến sau một lần ghi không dùng
+            # chung lần load bắt đầu trước đó
+            generation = tour_payload_cache.generation
+            payload = await self.payload_flights.do(
+                (*key, generation), lambda: self._load_full_payload(tour_id, generation)
+            )
+        return payload
+
+    async def get_export_payload(self, tour_id: str) -> CachedPayload:
+        """Lấy payload JSON export của tour, dùng cache nếu còn hạn"""
+        key = ("export", tour_id)
+        payload = tour_payload_cache.get(key)
+        if payload is None:
+            # Generation nằm trong key: request đến sau một lần ghi không dùng
+            # chung lần load bắt đầu trước đó
+            generation = tour_payload_cache.generation
+            payload = await self.payload_flights.do(
+                (*key, generation), lambda: self._load_export_payload(tour_id, generation)
+            )
+        return payload
+
+    async def _load_full_payload(self, tour_id: str, generation: int) -> CachedPayload:
+        tour = await self.get_tour_with_scenes(tour_id)
+        data = {"id": tour["_id"], **{k: v for k, v in tour.items() if k != "_id"}}
+        return tour_payload_cache.set(
+            ("full", tour_id),
+            CachedPayload.from_data(data, self._dependencies(tour)),
+            generation,
+        )
+
+    async def _load_export_payload(self, tour_id: str, generation: int) -> CachedPayload:
+        tour = await self.get_tour_with_scenes(tour_id)
+        data = {
+            "name": tour.get("name", ""),
+            "entryScene": tour.get("entry_scene", ""),
+            "scenes": tour.get("scenes", {}),
+        }
+        return tour_payload_cache.set(
+            ("export", tour_id),
+            CachedPayload.from_data(data, self._dependencies(tour)),
+            generation,
+        )
+
+    def record_view(self, tour_id: str):
+        """Ghi nhận một lượt xem tour (ghi xuống database theo batch)"""
+        self._views[tour_id] += 1
+        future = self.view_coalescer.submit(tour_id, None)
+        future.add_done_callback(_report_view_flush_error)
+
+    async def _flush_views(self, batch: Dict[str, None]) -> int:
+        counts = {tour_id: self._views.pop(tour_id) for tour_id in batch if tour_id in self._views}
+        return await self.repository.increment_views(counts)
+
+    async def warm_up(self, limit: int) -> int:
+        """
+        Nạp trước payload (full, export, kèm bản nén) của limit tours
+        được xem nhiều nhất vào cache
+
+        Returns:
+            Số tours đã nạp
+        """
+        warmed = 0
+        for tour_id in await self.repository.find_most_viewed(limit):
+            try:
+                for payload in (
+                    await self.get_full_payload(tour_id),
+                    await self.get_export_payload(tour_id),
+                ):
+                    await precompress(payload)
+            except NotFoundError:
+                continue
+            warmed += 1
+        return warmed
+
+    async def close(self):
+        """Ghi các lượt xem còn đang chờ"""
+        await self.view_coalescer.close()
+
+    @staticmethod
+    def _dependencies(tour: Dict) -> List[str]:
+        """ID của tour, scenes và hotspots tạo nên payload"""
+        ids = [tour["_id"]]
+        for scene_id, scene in tour.get("scenes", {}).items():
+            ids.append(scene_id)
+            ids.extend(h["id"] for h in scene.get("hotspots", []))
+        return ids
+
+    async def delete_tour_cascade(
+        self,
+        tour_id: str,
+        progress: Optional[ProgressCallback] = None,
+        expected_version: Optional[int] = None,
+    ) -> Dict:
+        """Xóa tour và tất cả scenes, hotspots liên quan, trả về tour đã xóa"""
+        progress = progress or _noop_progress
+        # Xóa tour trước: 404/409 được trả về trước khi đụng tới scenes, hotspots
+        tour = await self.delete(tour_id, expected_version)
+        await progress(1, 4, "tour deleted")
+        scenes = await self.scene_repository.find_by_tour_id(tour_id)
+        # Xóa search index của scenes và hotspots (tour được xóa trong after_delete)
+        await self.search_service.remove(*[scene["_id"] for scene in scenes])
+        await progress(2, 4, "search index removed")
         # Xóa hotspots
         await self.hotspot_repository.delete_by_tour_id(tour_id)
-        # Xóa scenes
+        await progress(3, 4, "hotspots deleted")
+        # Xóa scenes, ảnh của chúng được xóa nền
         await self.scene_repository.delete_by_tour_id(tour_id)
-        # Xóa tour
-        return await self.repository.delete(tour_id)
+        for scene in scenes:
+            self.scene_service.discard_images(scene)
+        await progress(4, 4, "scenes deleted")
+        return tour
+
+    async def import_tour_json(
+        self, data: Dict, progress: Optional[ProgressCallback] = None
+    ) -> Dict:
+        """
+        Import tour từ JSON format (giống tour.json của frontend)
+
+        Nếu bị hủy giữa chừng (job cancel), tour đã tạo một phần sẽ bị xóa.
+
+        Returns:
+            Dict với tour_id, scene_id_map và số scenes
+        """
+        progress = progress or _noop_progress
+
+        scenes_data = data.get("scenes", {})
+        total = 1 + len(scenes_data) + sum(
+            len(scene_info.get("hotspots", [])) for scene_info in scenes_data.values()
+        )
+        done = 0
+
+        # 1. Tạo tour
+        tour_data = {
+            "name": data.get("name", "Imported Tour"),
+            "entry_scene": None,  # Sẽ cập nhật sau
+        }
+        tour = await self.create(tour_data)
+        tour_id = tour["_id"]
+        done += 1
+        await progress(done, total, "tour created")
+
+        try:
+            # Map từ old scene id sang new scene id
+            scene_id_map = {}
+
+            # 2. Tạo scenes
+            for old_scene_id, scene_info in scenes_data.items():
+                scene_data = {
+                    "tour_id": tour_id,
+                    "source_id": old_scene_id,
+                    **scene_fields(scene_info),
+                }
+                scene = await self.scene_service.create(scene_data)
+                scene_id_map[old_scene_id] = scene["_id"]
+                done += 1
+                await progress(done, total, f"scene {old_scene_id} created")
+
+            # 3. Cập nhật entry_scene với new scene id
+            entry_scene = data.get("entryScene", "")
+            if entry_scene and entry_scene in scene_id_map:
+                await self.update(tour_id, {"entry_scene": scene_id_map[entry_scene]})
+
+            # 4. Tạo hotspots với mapped scene ids
+            for old_scene_id, scene_info in scenes_data.items():
+                new_scene_id = scene_id_map.get(old_scene_id)
+                if not new_scene_id:
+                    continue
+
+                for index, hotspot_info in enumerate(scene_info.get("hotspots", [])):
+                    hotspot_data = {
+                        "scene_id": new_scene_id,
+                        "source_id": hotspot_source_id(old_scene_id, index, hotspot_info),
+                        **hotspot_fields(hotspot_info, scene_id_map),
+                    }
+                    await self.hotspot_service.create_hotspot(hotspot_data)
+                    done += 1
+                    await progress(done, total, f"hotspots of {old_scene_id}")
+        except asyncio.CancelledError:
+            await asyncio.shield(self.delete_tour_cascade(tour_id))
+            raise
+
+        return {
+            "tour_id": tour_id,
+            "scene_id_map": scene_id_map,
+            "scenes_count": len(scene_id_map),
+        }
+
+    async def sync_tour_json(
+        self, tour_id: str, data: Dict, progress: Optional[ProgressCallback] = None
+    ) -> Dict:
+        """
+        Import JSON vào một tour có sẵn (upsert): chỉ ghi phần thay đổi
+
+        Scenes/hotspots được so khớp theo `source_id` (ID trong JSON lúc import,
+        hoặc ID của chính document với JSON export từ tour này). Diff được tính
+        trong bộ nhớ rồi ghi bằng một bulk_write cho mỗi collection.
+
+        Returns:
+            Dict với tour_id, scene_id_map và số inserted/updated/deleted/unchanged
+        """
+        progress = progress or _noop_progress
+        tour = await self.repository.find_by_id(tour_id)
+        if not tour:
+            raise NotFoundError(f"Tour not found: {tour_id}")
+
+        # Mỗi document được tìm theo cả source_id lẫn ID của nó
+        scenes = [s async for s in self.scene_repository.iter_all({"tour_id": tour_id})]
+        existing_scenes = _index_by_keys(scenes)
+        hotspots_by_scene = await self.hotspot_repository.find_grouped_by_scene(
+            [s["_id"] for s in scenes]
+        )
+        existing_hotspots: Dict[str, Dict[str, Dict]] = {
+            scene_id: _index_by_keys(items) for scene_id, items in hotspots_by_scene.items()
+        }
+        await progress(1, 4, "existing tour loaded")
+
+        # 1. Diff scenes
+        scenes_data = data.get("scenes", {})
+        scene_id_map: Dict[str, str] = {}
+        scene_inserts: List[Dict] = []
+        scene_updates: Dict[str, Dict] = {}
+        # Document sau khi cập nhật, dùng để index lại search
+        changed_docs: List[tuple] = []
+        for source_id, scene_info in scenes_data.items():
+            fields = scene_fields(scene_info)
+            current = existing_scenes.get(source_id)
+            if current is None:
+                scene_id = ObjectId()
+                scene_inserts.append(
+                    {"_id": scene_id, "tour_id": tour_id, "source_id": source_id, **fields}
+                )
+                scene_id_map[source_id] = str(scene_id)
+                continue
+            scene_id_map[source_id] = current["_id"]
+            changed = _changed_fields(current, fields)
+            if changed:
+                scene_updates[current["_id"]] = changed
+                changed_docs.append(("scene", {**current, **changed}))
+        matched_scenes = set(scene_id_map.values())
+        scene_deletes = [s["_id"] for s in scenes if s["_id"] not in matched_scenes]
+
+        # 2. Diff hotspots (theo scene đã map)
+        hotspot_inserts: List[Dict] = []
+        hotspot_updates: Dict[str, Dict] = {}
+        hotspot_deletes: List[str] = []
+        hotspots_unchanged = 0
+        for source_id, scene_info in scenes_data.items():
+            scene_id = scene_id_map[source_id]
+            current_hotspots = existing_hotspots.get(scene_id, {})
+            seen = set()
+            for index, hotspot_info in enumerate(scene_info.get("hotspots", [])):
+                key = hotspot_source_id(source_id, index, hotspot_info)
+                fields = hotspot_fields(hotspot_info, scene_id_map)
+                current = current_hotspots.get(key)
+                if current is None:
+                    hotspot_inserts.append(
+                        {"_id": ObjectId(), "scene_id": scene_id, "source_id": key, **fields}
+                    )
+                    continue
+                seen.add(current["_id"])
+                changed = _changed_fields(current, fields)
+                if changed:
+                    hotspot_updates[current["_id"]] = changed
+                    changed_docs.append(("hotspot", {**current, **changed}))
+                else:
+                    hotspots_unchanged += 1
+            hotspot_deletes.extend(
+                {h["_id"] for h in current_hotspots.values() if h["_id"] not in seen}
+            )
+        await progress(2, 4, "diff computed")
+
+        # 3. Ghi thay đổi: một bulk_write cho mỗi collection
+        await self.scene_repository.apply_diff(scene_inserts, scene_updates, scene_deletes)
+        hotspot_result = await self.hotspot_repository.apply_diff(
+            hotspot_inserts,
+            hotspot_updates,
+            hotspot_deletes,
+            {"scene_id": {"$in": scene_deletes}} if scene_deletes else None,
+        )
+        entry_scene = scene_id_map.get(data.get("entryScene", ""))
+        tour_changes = _changed_fields(
+            tour,
+            {"name": data.get("name", tour.get("name")), "entry_scene": entry_scene},
+        )
+        if tour_changes:
+            await self.repository.update(tour_id, tour_changes)
+        await progress(3, 4, "changes written")
+
+        # 4. Search index và cache
+        await self.search_service.remove(*scene_deletes, *hotspot_deletes)
+        changed_docs += [("scene", doc) for doc in scene_inserts]
+        changed_docs += [("hotspot", doc) for doc in hotspot_inserts]
+        if "name" in tour_changes:
+            changed_docs.append(("tour", {**tour, **tour_changes}))
+        entries = [self.search_service.build_entry(kind, doc) for kind, doc in changed_docs]
+        await self.search_service.repository.bulk_upsert(entries)
+        tour_payload_cache.invalidate(tour_id)
+        await self.change_service.resync(tour_id)
+        await progress(4, 4, "search index updated")
+
+        return {
+            "tour_id": tour_id,
+            "scene_id_map": scene_id_map,
+            "scenes": {
+                "inserted": len(scene_inserts),
+                "updated": len(scene_updates),
+                "deleted": len(scene_deletes),
+                "unchanged": len(scenes_data) - len(scene_inserts) - len(scene_updates),
+            },
+            "hotspots": {
+                "inserted": len(hotspot_inserts),
+                "updated": len(hotspot_updates),
+                "deleted": hotspot_result["deleted"],
+                "unchanged": hotspots_unchanged,
+            },
+        }
@@ -0,0 +1,199 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from starlette.concurrency import run_in_threadpool
+
+from app.repository.upload_repository import UploadRepository
+from app.core.config import configs
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.core.tracing import instrument
+
+# Dữ liệu chunk được gom tới kích thước này rồi mới ghi xuống đĩa
+WRITE_BUFFER_BYTES = 1024 * 1024
+# Kích thước block khi đọc lại file để tính checksum
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def _create_file(path: str, size: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        # File thưa đủ dung lượng, chunk được ghi thẳng vào đúng offset
+        file.truncate(size)
+
+
+def _write(file, data: bytes, digest) -> None:
+    digest.update(data)
+    file.write(data)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@instrument
+class UploadService:
+    """
+    Resumable upload: file được gửi theo từng chunk (PUT lại được khi mất kết
+    nối), ghi thẳng vào file trên UPLOAD_DIR rồi dùng khi tạo/cập nhật scene
+    """
+
+    def __init__(self):
+        self.repository = UploadRepository()
+
+    def path(self, upload_id: str) -> str:
+        """File chứa dữ liệu của upload"""
+        return os.path.join(configs.UPLOAD_DIR, f"{upload_id}.part")
+
+    @staticmethod
+    def _expires_at() -> datetime:
+        return datetime.utcnow() + timedelta(hours=configs.UPLOAD_TTL_HOURS)
+
+    @staticmethod
+    def chunk_length(session: Dict, index: int) -> int:
+        """Số byte của chunk index (chunk cuối có thể ngắn hơn)"""
+        return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+    def describe(self, session: Dict) -> Dict:
+        """Trạng thái upload cho response (các chunk còn thiếu, số byte đã nhận)"""
+        received = set(session.get("received", []))
+        return {
+            **session,
+            "id": session["_id"],
+            "received_bytes": sum(self.chunk_length(session, i) for i in received),
+            "missing": [i for i in range(session["total_chunks"]) if i not in received],
+        }
+
+    async def get(self, upload_id: str) -> Dict:
+        """Lấy session upload, NotFoundError nếu không có hoặc đã hết hạn"""
+        session = await self.repository.find_by_id(upload_id)
+        if not session or session["expires_at"] < datetime.utcnow():
+            raise NotFoundError(f"Upload not found: {upload_id}")
+        return session
+
+    async def create(self, data: Dict) -> Dict:
+        """Tạo session upload và file rỗng đủ dung lượng"""
+        if not data["content_type"].startswith("image/"):
+            raise BadRequestError("File must be an image")
+        if data["size"] > configs.UPLOAD_MAX_BYTES:
+            raise BadRequestError(f"File is larger than {configs.UPLOAD_MAX_BYTES} bytes")
+        await self.purge_expired()
+
+        chunk_size = configs.UPLOAD_CHUNK_SIZE
+        session = {
+            "_id": ObjectId(),
+            **data,
+            "sha256": (data.get("sha256") or "").lower() or None,
+            "chunk_size": chunk_size,
+            "total_chunks": -(-data["size"] // chunk_size),
+            "received": [],
+            "status": "uploading",
+            "expires_at": self._expires_at(),
+        }
+        await run_in_threadpool(_create_file, self.path(str(session["_id"])), data["size"])
+        return await self.repository.create(session)
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        index: int,
+        stream: AsyncIterator[bytes],
+        checksum: Optional[str] = None,
+    ) -> Dict:
+        """
+        Ghi chunk index từ body request vào file (tối đa WRITE_BUFFER_BYTES
+        trong bộ nhớ). Gửi lại một chunk sẽ ghi đè chunk cũ.
+
+        Args:
+            checksum: SHA-256 (hex) của chunk nếu client gửi kèm
+        """
+        session = await self.get(upload_id)
+        if session["status"] != "uploading":
+            raise ConflictError(f"Upload is already {session['status']}")
+        if not 0 <= index < session["total_chunks"]:
+            raise BadRequestError(f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+
+        expected = self.chunk_length(session, index)
+        # Chunk đang ghi dở (mất kết nối) không được tính là đã nhận
+        await self.repository.unmark_chunk(upload_id, index)
+        digest = hashlib.sha256()
+        written = 0
+        buffer = bytearray()
+        try:
+            file = open(self.path(upload_id), "r+b")
+        except FileNotFoundError:
+            raise NotFoundError(f"Upload not found: {upload_id}")
+        with file:
+            file.seek(index * session["chunk_size"])
+            async for piece in stream:
+                written += len(piece)
+                if written > expected:
+                    raise BadRequestError(f"Chunk {index} must be {expected} bytes")
+                buffer += piece
+                if len(buffer) >= WRITE_BUFFER_BYTES:
+                    await run_in_threadpool(_write, file, bytes(buffer), digest)
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(_write, file, bytes(buffer), digest)
+
+        if written != expected:
+            raise BadRequestError(f"Chunk {index} must be {expected} bytes, got {written}")
+        if checksum and checksum.lower() != digest.hexdigest():
+            raise BadRequestError(f"Chunk {index} checksum mismatch")
+
+        await self.repository.mark_chunk(upload_id, index, self._expires_at())
+        return await self.get(upload_id)
+
+    async def complete(self, upload_id: str) -> Dict:
+        """
+        Kiểm tra đã nhận đủ chunk và checksum cả file, chuyển sang completed
+
+        Nếu checksum không khớp, mọi chunk phải được gửi lại.
+        """
+        session = await self.get(upload_id)
+        if session["status"] == "completed":
+            return session
+        missing = self.describe(session)["missing"]
+        if missing:
+            raise BadRequestError(f"Upload is missing {len(missing)} chunks: {missing[:20]}")
+
+        sha256 = await run_in_threadpool(_file_sha256, self.path(upload_id))
+        if session.get("sha256") and session["sha256"] != sha256:
+            await self.repository.set_fields(upload_id, {"received": []})
+            raise BadRequestError("File checksum mismatch, upload all chunks again")
+
+        fields = {"status": "completed", "sha256": sha256, "expires_at": self._expires_at()}
+        await self.repository.set_fields(upload_id, fields)
+        return {**session, **fields}
+
+    async def completed_path(self, upload_id: str) -> str:
+        """Đường dẫn file của upload đã complete"""
+        session = await self.get(upload_id)
+        if session["status"] != "completed":
+            raise BadRequestError(f"Upload is not completed: {upload_id}")
+        return self.path(upload_id)
+
+    async def discard(self, upload_id: str):
+        """Xóa session và file của upload"""
+        await self.repository.delete_many({"_id": ObjectId(upload_id)})
+        await run_in_threadpool(_remove, self.path(upload_id))
+
+    async def purge_expired(self) -> List[str]:
+        """Xóa các upload đã hết hạn (session và file)"""
+        expired = await self.repository.find_expired(datetime.utcnow())
+        for session in expired:
+            await self.discard(session["_id"])
+        return [session["_id"] for session in expired]
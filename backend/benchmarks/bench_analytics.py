@@ -0,0 +1,92 @@
+"""
+Benchmark nhận event analytics: parse batch JSON (như endpoint
+/analytics/events) và đưa vào buffer, đo số event/s mỗi worker và số
+document rollup cần upsert so với số event. Không flush (không cần MongoDB).
+
+Chạy: python backend/benchmarks/bench_analytics.py --events 200000
+       python backend/benchmarks/bench_analytics.py --batch 50 --scenes 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_batches(args):
+    rng = random.Random(42)
+    types = ["scene_enter", "scene_exit", "hotspot_click", "dwell"]
+    batches = []
+    for _ in range(args.events // args.batch):
+        events = []
+        for _ in range(args.batch):
+            event = {
+                "type": rng.choice(types),
+                "tour_id": f"tour{rng.randrange(args.tours)}",
+                "scene_id": f"scene{rng.randrange(args.scenes)}",
+                "session_id": f"session{rng.randrange(10000)}",
+            }
+            if event["type"] == "hotspot_click":
+                event["hotspot_id"] = f"hotspot{rng.randrange(args.scenes * 5)}"
+            elif event["type"] in ("scene_exit", "dwell"):
+                event["dwell_ms"] = rng.randrange(100, 60000)
+            events.append(event)
+        batches.append(json.dumps({"events": events}).encode())
+    return batches
+
+
+async def run(args):
+    from app.core.config import configs
+    from app.schema.analytics_schema import AnalyticsBatch
+    from app.services.analytics_service import AnalyticsService
+
+    configs.ANALYTICS_BUFFER_SIZE = args.events
+    configs.ANALYTICS_STORE_EVENTS = not args.rollups_only
+    # Không flush trong lúc đo
+    configs.ANALYTICS_FLUSH_SECONDS = 3600
+    service = AnalyticsService()
+    batches = make_batches(args)
+    total = len(batches) * args.batch
+
+    parse_time = ingest_time = 0.0
+    for body in batches:
+        t = time.perf_counter()
+        events = [
+            event.model_dump(exclude_none=True)
+            for event in AnalyticsBatch.model_validate_json(body).events
+        ]
+        parse_time += time.perf_counter() - t
+        t = time.perf_counter()
+        service.ingest(events)
+        ingest_time += time.perf_counter() - t
+
+    stats = service.stats()
+    service._task.cancel()
+    print(f"{total} events in batches of {args.batch}, {args.tours} tours, {args.scenes} scenes/hotspot groups")
+    print(f"parse:    {total / parse_time:>10.0f} events/s")
+    print(f"ingest:   {total / ingest_time:>10.0f} events/s")
+    print(f"total:    {total / (parse_time + ingest_time):>10.0f} events/s per worker")
+    print(
+        f"flush:    {stats['pending_rollups']} rollup upserts "
+        f"({stats['pending_rollups'] / total:.1%} of events), "
+        f"{len(service._events)} raw events"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=100, help="Số event mỗi request")
+    parser.add_argument("--tours", type=int, default=5)
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--rollups-only", action="store_true", help="Không lưu event gốc")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
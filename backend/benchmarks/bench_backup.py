@@ -0,0 +1,115 @@
+"""
+Benchmark backup/restore nhiều tours
+
+Seed tours/scenes/hotspots giả lập vào một database riêng, đo thời gian tạo
+archive backup, xóa dữ liệu rồi restore lại (giữ ID). Cần MongoDB đang chạy.
+
+Chạy: python backend/benchmarks/bench_backup.py --tours 200 --scenes 25 --hotspots 40
+       python backend/benchmarks/bench_backup.py --url mongodb://localhost:27017 --keep
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def seed(service, args):
+    from bson import ObjectId
+
+    start = time.perf_counter()
+    for t in range(args.tours):
+        tour_id = ObjectId()
+        scene_ids = [str(ObjectId()) for _ in range(args.scenes)]
+        scenes = [
+            {
+                "_id": ObjectId(scene_id),
+                "tour_id": str(tour_id),
+                "name": f"Scene {i}",
+                "description": "Phòng khách hướng biển",
+                "image_url": f"https://res.cloudinary.com/demo/{scene_id}.jpg",
+                "initial_view": {"yaw": 0, "pitch": 0, "fov": 100},
+            }
+            for i, scene_id in enumerate(scene_ids)
+        ]
+        hotspots = [
+            {
+                "scene_id": scene_id,
+                "type": "click",
+                "position": {"x": h * 1.5, "y": 0.25, "z": -h},
+                "target_scene": scene_ids[(i + 1) % len(scene_ids)],
+                "label": f"Hotspot {h}",
+                "fov_trigger": None,
+            }
+            for i, scene_id in enumerate(scene_ids)
+            for h in range(args.hotspots)
+        ]
+        await service.tour_repository.insert_many(
+            [{"_id": tour_id, "name": f"Tour {t}", "entry_scene": scene_ids[0]}]
+        )
+        await service.scene_repository.insert_many(scenes)
+        await service.hotspot_repository.insert_many(hotspots)
+    total = args.tours * args.scenes * args.hotspots
+    print(f"Seeded {args.tours} tours, {total:,} hotspots in {time.perf_counter() - start:.1f}s")
+    return total
+
+
+async def run(args):
+    os.environ["MONGODB_URL"] = args.url
+    os.environ["MONGODB_DB_NAME"] = args.db
+
+    from app.core.database import mongodb
+    from app.services.backup_service import BackupService
+
+    mongodb.connect()
+    service = BackupService()
+    repositories = (
+        service.tour_repository,
+        service.scene_repository,
+        service.hotspot_repository,
+        service.search_service.repository,
+    )
+    for repository in repositories:
+        await repository.delete_many({})
+        await repository.ensure_indexes()
+    hotspots = await seed(service, args)
+
+    archive = io.BytesIO()
+    start = time.perf_counter()
+    async for chunk in service.stream_backup():
+        archive.write(chunk)
+    elapsed = time.perf_counter() - start
+    print(f"Backup : {elapsed:.2f}s ({hotspots / elapsed:,.0f} hotspots/s), "
+          f"archive {archive.tell() / 1024 / 1024:.1f} MB")
+
+    for repository in repositories:
+        await repository.delete_many({})
+
+    archive.seek(0)
+    start = time.perf_counter()
+    counts = await service.restore(archive)
+    elapsed = time.perf_counter() - start
+    print(f"Restore: {elapsed:.2f}s ({counts['hotspots'] / elapsed:,.0f} hotspots/s), {counts}")
+
+    if not args.keep:
+        await mongodb.client.drop_database(args.db)
+    mongodb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="novaland_bench")
+    parser.add_argument("--tours", type=int, default=200)
+    parser.add_argument("--scenes", type=int, default=25)
+    parser.add_argument("--hotspots", type=int, default=40, help="Hotspots mỗi scene")
+    parser.add_argument("--keep", action="store_true", help="Giữ database sau khi chạy")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
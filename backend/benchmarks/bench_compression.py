@@ -0,0 +1,102 @@
+"""
+Benchmark nén payload export tour: bytes-on-wire và CPU theo từng mức nén
+
+Chạy: python backend/benchmarks/bench_compression.py
+       python backend/benchmarks/bench_compression.py --scenes 100 --hotspots 50
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_export(scene_count: int, hotspot_count: int) -> bytes:
+    """Tạo payload export giả lập giống /tours/{id}/export"""
+    scenes = {}
+    for i in range(scene_count):
+        scene_id = f"{i:024x}"
+        scenes[scene_id] = {
+            "id": scene_id,
+            "name": f"Khu vực {i}",
+            "description": f"Mô tả chi tiết cho khu vực số {i} của dự án Novaland",
+            "image": f"https://res.cloudinary.com/demo/image/upload/novaland/scenes/{scene_id}.jpg",
+            "initialView": {"yaw": 0, "pitch": 0, "fov": 100},
+            "hotspots": [
+                {
+                    "id": f"{i:012x}{j:012x}",
+                    "type": "click",
+                    "position": {"x": j * 3.5, "y": -12.25, "z": 300 - j},
+                    "targetScene": f"{(i + 1) % scene_count:024x}",
+                    "label": f"Đi tới khu vực {(i + 1) % scene_count}",
+                    "fovTrigger": None,
+                }
+                for j in range(hotspot_count)
+            ],
+        }
+    data = {"name": "Novaland Resort Tour", "entryScene": f"{0:024x}", "scenes": scenes}
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def measure(name: str, fn, body: bytes, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(body)
+    elapsed = (time.perf_counter() - start) / repeat
+    ratio = len(out) / len(body)
+    throughput = len(body) / elapsed / 1024 / 1024
+    print(
+        f"{name:<12} {len(out):>12,} B  {ratio:>7.1%}  "
+        f"{elapsed * 1000:>9.2f} ms  {throughput:>8.1f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--hotspots", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = build_export(args.scenes, args.hotspots)
+    print(f"Payload: {args.scenes} scenes x {args.hotspots} hotspots = {len(body):,} B\n")
+    print(f"{'encoding':<12} {'size':>14}  {'ratio':>7}  {'cpu/req':>12}  {'speed':>11}")
+
+    for level in (1, 6, 9):
+        measure(
+            f"gzip-{level}",
+            lambda b, lv=level: gzip.compress(b, compresslevel=lv, mtime=0),
+            body,
+            args.repeat,
+        )
+
+    if brotli is None:
+        print("\nbrotli chưa được cài, bỏ qua (pip install brotli)")
+        return
+
+    for quality in (1, 4, 6, 9, 11):
+        measure(
+            f"br-{quality}",
+            lambda b, q=quality: brotli.compress(b, quality=q),
+            body,
+            1 if quality >= 10 else args.repeat,
+        )
+
+    print(
+        "\nResponse động dùng gzip-6/br-4 (nén mỗi request); payload cache dùng "
+        "gzip-9/br-9 vì chỉ nén một lần cho mỗi entry (br-11 quá chậm cho "
+        "request đầu tiên mà gần như không nhỏ hơn)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark layout lưu hotspots: collection riêng và nhúng trong scene
+(HOTSPOT_STORAGE). Đo độ trễ đọc hotspots theo scene/theo tour, độ trễ sửa
+vị trí và write amplification (số byte document bị ghi lại mỗi lần sửa). Cần
+MongoDB đang chạy.
+
+Chạy: python backend/benchmarks/bench_hotspot_storage.py --scenes 200 --hotspots 50
+       python backend/benchmarks/bench_hotspot_storage.py --ops 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def seed(scene_repository, hotspot_repository, args):
+    from bson import ObjectId
+
+    tour_id = str(ObjectId())
+    scene_ids = [str(ObjectId()) for _ in range(args.scenes)]
+    await scene_repository.insert_many(
+        [
+            {"_id": ObjectId(scene_id), "tour_id": tour_id, "name": f"Scene {i}",
+             "image_url": "https://example.com/panorama.jpg"}
+            for i, scene_id in enumerate(scene_ids)
+        ]
+    )
+    hotspots = await hotspot_repository.insert_many(
+        [
+            {
+                "scene_id": scene_id,
+                "type": "click",
+                "position": {"x": h, "y": 0, "z": -h},
+                "target_scene": scene_ids[(i + 1) % len(scene_ids)],
+                "label": f"Hotspot {h}",
+            }
+            for i, scene_id in enumerate(scene_ids)
+            for h in range(args.hotspots)
+        ]
+    )
+    return scene_ids, [str(h["_id"]) for h in hotspots]
+
+
+async def timed(fn, ops: int):
+    """Gọi fn() ops lần liên tiếp, trả về (p50, p99) ms"""
+    latencies = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+async def bytes_written(db):
+    """Tổng byte WiredTiger đã ghi xuống đĩa (None nếu server không trả về)"""
+    try:
+        status = await db.command("serverStatus")
+        return status["wiredTiger"]["cache"]["bytes written from cache"]
+    except Exception:
+        return None
+
+
+async def run_layout(storage: str, args):
+    import bson
+    from bson import ObjectId
+
+    from app.core.config import configs
+    from app.core.database import mongodb
+    from app.repository.hotspot_repository import HotspotRepository
+    from app.repository.scene_repository import SceneRepository
+
+    configs.HOTSPOT_STORAGE = storage
+    db = mongodb.client[args.db]
+    await mongodb.client.drop_database(args.db)
+    scene_repository = SceneRepository()
+    hotspot_repository = HotspotRepository()
+    await scene_repository.ensure_indexes()
+    await hotspot_repository.ensure_indexes()
+    scene_ids, hotspot_ids = await seed(scene_repository, hotspot_repository, args)
+
+    by_scene = await timed(
+        lambda: hotspot_repository.find_by_scene_id(random.choice(scene_ids)), args.ops
+    )
+    by_tour = await timed(
+        lambda: hotspot_repository.find_grouped_by_scene(scene_ids), max(args.ops // 20, 5)
+    )
+
+    # Document bị ghi lại khi sửa một hotspot: hotspot hoặc cả scene chứa nó
+    sample = ObjectId(hotspot_ids[0])
+    if storage == "collection":
+        touched = await db["hotspots"].find_one({"_id": sample})
+    else:
+        touched = await db["scenes"].find_one({"hotspots._id": sample})
+    doc_bytes = len(bson.encode(touched))
+
+    written_before = await bytes_written(db)
+    position = {"x": 1.5, "y": 2.5, "z": -3.5}
+    update = await timed(
+        lambda: hotspot_repository.bulk_update_positions({random.choice(hotspot_ids): position}),
+        args.ops,
+    )
+    written_after = await bytes_written(db)
+
+    print(f"\n[{storage}] {args.scenes} scenes x {args.hotspots} hotspots, {args.ops} ops")
+    print(f"  read scene hotspots   p50 {by_scene[0]:>7.2f} ms   p99 {by_scene[1]:>7.2f} ms")
+    print(f"  read tour hotspots    p50 {by_tour[0]:>7.2f} ms   p99 {by_tour[1]:>7.2f} ms")
+    print(f"  update position       p50 {update[0]:>7.2f} ms   p99 {update[1]:>7.2f} ms")
+    print(f"  document rewritten per update: {doc_bytes} bytes")
+    if written_before is not None and written_after is not None:
+        print(f"  WiredTiger bytes written: {(written_after - written_before) / args.ops:.0f} / op")
+
+    if not args.keep:
+        await mongodb.client.drop_database(args.db)
+
+
+async def run(args):
+    os.environ["MONGODB_URL"] = args.url
+    os.environ["MONGODB_DB_NAME"] = args.db
+
+    from app.core.database import mongodb
+
+    mongodb.connect()
+    for storage in ("collection", "embedded"):
+        await run_layout(storage, args)
+    mongodb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="novaland_bench")
+    parser.add_argument("--scenes", type=int, default=200)
+    parser.add_argument("--hotspots", type=int, default=50, help="Hotspots mỗi scene")
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="Giữ database sau khi chạy")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark fan-out của kênh live: một tour có N subscriber, publish M delta
+liên tục, đo thời gian publish (phía request ghi), độ trễ tới subscriber
+(p50/p99), số frame đã gửi và số resync của client chậm. Dùng sender loop
+của endpoint với WebSocket giả (không cần MongoDB).
+
+Chạy: python backend/benchmarks/bench_live_fanout.py --subscribers 500
+       python backend/benchmarks/bench_live_fanout.py --subscribers 200 --slow 20 --slow-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class FakeWebSocket:
+    """Ghi lại thời điểm nhận từng event; delay mô phỏng client/mạng chậm"""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.frames = 0
+        self.events = 0
+        self.resyncs = 0
+        self.latencies = []
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        now = time.perf_counter()
+        self.frames += 1
+        for event in json.loads(text):
+            self.events += 1
+            if event["op"] == "resync":
+                self.resyncs += 1
+            elif "sent" in event.get("fields", {}):
+                self.latencies.append(now - event["fields"]["sent"])
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def run(args):
+    from app.api.v1.endpoints.live import _send_events
+    from app.core.live import LiveHub, live_hub, make_delta
+
+    live_hub.__init__(queue_size=args.queue_size, batch_size=args.batch_size)
+    hub: LiveHub = live_hub
+    tour_id = "bench"
+
+    sockets = [
+        FakeWebSocket(args.slow_ms / 1000 if i < args.slow else 0)
+        for i in range(args.subscribers)
+    ]
+    senders = [
+        asyncio.create_task(_send_events(socket, hub.subscribe(tour_id))) for socket in sockets
+    ]
+    await asyncio.sleep(0.05)
+
+    doc = {
+        "_id": "hotspot",
+        "scene_id": "scene",
+        "version": 1,
+        "position": {"x": 1.0, "y": 2.0, "z": 3.0},
+    }
+    publish_times = []
+    start = time.perf_counter()
+    for i in range(args.deltas):
+        doc["version"] = i
+        doc["sent"] = time.perf_counter()
+        t = time.perf_counter()
+        hub.publish(tour_id, make_delta("hotspot", "update", doc, ["position", "sent"]))
+        publish_times.append(time.perf_counter() - t)
+        # Nhường event loop như giữa các request ghi
+        if i % args.burst == args.burst - 1:
+            await asyncio.sleep(args.interval_ms / 1000)
+    while any(s.queue.qsize() for channel in hub._channels.values() for s in channel):
+        await asyncio.sleep(0.01)
+    total = time.perf_counter() - start
+
+    for task in senders:
+        task.cancel()
+    await asyncio.gather(*senders, return_exceptions=True)
+
+    fast = [s for s in sockets if not s.delay]
+    slow = [s for s in sockets if s.delay]
+    latencies = [v for s in fast for v in s.latencies]
+    print(
+        f"{args.subscribers} subscribers ({args.slow} slow, {args.slow_ms} ms/frame), "
+        f"{args.deltas} deltas, queue {args.queue_size}, batch {args.batch_size}"
+    )
+    print(
+        f"publish:   p50 {percentile(publish_times, 0.5) * 1000:>8.1f} us, "
+        f"p99 {percentile(publish_times, 0.99) * 1000:>8.1f} us per delta "
+        f"({args.subscribers} queues)"
+    )
+    print(f"delivery:  p50 {percentile(latencies, 0.5):>8.2f} ms, p99 {percentile(latencies, 0.99):>8.2f} ms")
+    print(
+        f"fast:      {sum(s.events for s in fast) / max(len(fast), 1):>8.0f} events/client, "
+        f"{sum(s.frames for s in fast) / max(len(fast), 1):>8.0f} frames/client"
+    )
+    if slow:
+        print(
+            f"slow:      {sum(s.events for s in slow) / len(slow):>8.0f} events/client, "
+            f"{sum(s.resyncs for s in slow) / len(slow):>8.1f} resyncs/client"
+        )
+    print(f"total:     {total * 1000:>8.1f} ms, {args.deltas * args.subscribers / total:>10.0f} events/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--deltas", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=20, help="Số delta giữa hai lần nhường event loop")
+    parser.add_argument("--interval-ms", type=float, default=1)
+    parser.add_argument("--slow", type=int, default=10, help="Số client chậm")
+    parser.add_argument("--slow-ms", type=float, default=20, help="Thời gian gửi một frame của client chậm")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark độ trễ typeahead của /search trên search index
+
+Seed N entry giả lập vào một database riêng rồi đo p50/p95/p99 của các query
+prefix ngắn (1-3 từ, có và không dấu) và của filter tên tours (một trang
+GET /tours?name=, kể cả fallback chuỗi con). Cần MongoDB đang chạy.
+
+Chạy: python backend/benchmarks/bench_search.py --docs 100000
+       python backend/benchmarks/bench_search.py --url mongodb://localhost:27017 --keep
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+WORDS = [
+    "Hồ", "Bơi", "Sảnh", "Vườn", "Biệt", "Thự", "Phòng", "Ngủ", "Khách", "Bếp",
+    "Đảo", "Ngọc", "Biển", "Cát", "Trắng", "Nhà", "Hàng", "Spa", "Gym", "Sân",
+    "Golf", "Tennis", "Khu", "Vui", "Chơi", "Trẻ", "Em", "Ban", "Công", "Cảnh",
+    "Hoàng", "Hôn", "Rừng", "Thông", "Suối", "Nước", "Nóng", "Đồi", "Thiên", "Đường",
+]
+
+QUERIES = ["ho", "ho bo", "ho boi", "san", "sanh", "biet thu", "dao ngo", "phong ngu",
+           "vuon", "khu vui", "Hồ bơi", "đảo", "golf", "spa", "rung thong", "suoi nuoc nong"]
+
+# Filter tên: prefix, từ một ký tự và chuỗi con giữa từ (fallback regex)
+NAME_QUERIES = ["ho boi", "dao ngoc", "biet thu", "a", "h", "oi", "uon"]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def seed(search_service, count: int):
+    from bson import ObjectId
+
+    rng = random.Random(42)
+    kinds = ["tour"] * 1 + ["scene"] * 9 + ["hotspot"] * 90
+    batch = []
+    start = time.perf_counter()
+    for _ in range(count):
+        kind = rng.choice(kinds)
+        doc = {"_id": ObjectId()}
+        if kind == "tour":
+            doc["name"] = random_text(rng, 3)
+        elif kind == "scene":
+            doc.update(
+                name=random_text(rng, 2),
+                description=random_text(rng, 8),
+                tour_id=str(ObjectId()),
+            )
+        else:
+            doc.update(label=random_text(rng, 3), scene_id=str(ObjectId()))
+        batch.append(search_service.build_entry(kind, doc))
+        if len(batch) >= 1000:
+            await search_service.repository.bulk_upsert(batch)
+            batch = []
+    if batch:
+        await search_service.repository.bulk_upsert(batch)
+    print(f"Seeded {count:,} entries in {time.perf_counter() - start:.1f}s")
+
+
+def report(label: str, timings, docs: int):
+    timings.sort()
+    p = lambda q: timings[min(len(timings) - 1, int(len(timings) * q))]
+    print(f"{label}: {len(timings)} queries on {docs:,} entries")
+    print(f"  mean {statistics.mean(timings):.2f} ms | p50 {p(0.5):.2f} ms | "
+          f"p95 {p(0.95):.2f} ms | p99 {p(0.99):.2f} ms")
+
+
+async def run(args):
+    os.environ["MONGODB_URL"] = args.url
+    os.environ["MONGODB_DB_NAME"] = args.db
+
+    from app.core.database import mongodb
+    from app.services.search_service import SearchService
+
+    mongodb.connect()
+    search_service = SearchService()
+    await search_service.repository.delete_many({})
+    await search_service.repository.ensure_indexes()
+    await seed(search_service, args.docs)
+
+    # Warm-up
+    for query in QUERIES:
+        await search_service.search(query)
+
+    timings = []
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            await search_service.search(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+    report("search", timings, args.docs)
+
+    timings = []
+    for _ in range(args.rounds):
+        for query in NAME_QUERIES:
+            start = time.perf_counter()
+            await search_service.match_page("tour", query, 0, 20)
+            timings.append((time.perf_counter() - start) * 1000)
+    report("name filter", timings, args.docs)
+
+    if not args.keep:
+        await mongodb.client.drop_database(args.db)
+    mongodb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="novaland_bench")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Giữ database sau khi chạy")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
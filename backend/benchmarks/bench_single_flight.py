@@ -0,0 +1,119 @@
+"""
+Benchmark thundering herd cho /tours/{id}/full: N request đồng thời khi cache
+trống, so sánh có và không có single-flight. Cần MongoDB đang chạy.
+
+Chạy: python backend/benchmarks/bench_single_flight.py --clients 500
+       python backend/benchmarks/bench_single_flight.py --scenes 50 --hotspots 30 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def seed(service, args) -> str:
+    from bson import ObjectId
+
+    tour_id = ObjectId()
+    scene_ids = [str(ObjectId()) for _ in range(args.scenes)]
+    await service.repository.insert_many(
+        [{"_id": tour_id, "name": "Herd Tour", "entry_scene": scene_ids[0]}]
+    )
+    await service.scene_repository.insert_many(
+        [
+            {"_id": ObjectId(scene_id), "tour_id": str(tour_id), "name": f"Scene {i}"}
+            for i, scene_id in enumerate(scene_ids)
+        ]
+    )
+    await service.hotspot_repository.insert_many(
+        [
+            {
+                "scene_id": scene_id,
+                "type": "click",
+                "position": {"x": h, "y": 0, "z": -h},
+                "target_scene": scene_ids[(i + 1) % len(scene_ids)],
+                "label": f"Hotspot {h}",
+            }
+            for i, scene_id in enumerate(scene_ids)
+            for h in range(args.hotspots)
+        ]
+    )
+    return str(tour_id)
+
+
+async def herd(fn, clients: int):
+    """Gọi fn đồng thời clients lần, trả về (tổng thời gian, p99 latency) ms"""
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(clients)))
+    total = time.perf_counter() - start
+    latencies.sort()
+    return total * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+async def run(args):
+    os.environ["MONGODB_URL"] = args.url
+    os.environ["MONGODB_DB_NAME"] = args.db
+
+    from app.core.cache import tour_payload_cache
+    from app.core.database import mongodb
+    from app.services.tour_service import TourService
+
+    mongodb.connect()
+    service = TourService()
+    tour_id = await seed(service, args)
+
+    aggregations = 0
+    load = service.get_tour_with_scenes
+
+    async def counted(id):
+        nonlocal aggregations
+        aggregations += 1
+        return await load(id)
+
+    service.get_tour_with_scenes = counted
+
+    modes = (
+        ("no single-flight", lambda: service._load_full_payload(tour_id, tour_payload_cache.generation)),
+        ("single-flight", lambda: service.get_full_payload(tour_id)),
+    )
+    print(f"{args.clients} concurrent clients, {args.scenes} scenes x {args.hotspots} hotspots")
+    for name, fn in modes:
+        for round in range(args.rounds):
+            tour_payload_cache.invalidate(tour_id)
+            aggregations = 0
+            total, p99 = await herd(fn, args.clients)
+            print(
+                f"{name:<17} round {round + 1}: {total:>9.1f} ms total, "
+                f"p99 {p99:>8.1f} ms, {aggregations} aggregations"
+            )
+
+    if not args.keep:
+        await mongodb.client.drop_database(args.db)
+    mongodb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="novaland_bench")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--scenes", type=int, default=25)
+    parser.add_argument("--hotspots", type=int, default=20, help="Hotspots mỗi scene")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Giữ database sau khi chạy")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Transcode ảnh panorama như khi upload scene (process_image) và in dung lượng
+tiết kiệm được, thời gian xử lý. Chạy offline, không cần Cloudinary/MongoDB;
+không truyền file thì dùng ảnh tổng hợp.
+
+Chạy: python backend/benchmarks/bench_transcode.py panorama.jpg other.png
+       python backend/benchmarks/bench_transcode.py --format avif --max-bytes 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def synthetic_panorama(width: int) -> bytes:
+    """JPEG 2:1 có gradient và nhiễu (gần với ảnh thật hơn ảnh một màu)"""
+    from PIL import Image
+
+    height = width // 2
+    base = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    image = Image.merge("RGB", (base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", help="Ảnh cần transcode")
+    parser.add_argument("--format", default="webp", choices=["webp", "avif", "jpeg", "original"])
+    parser.add_argument("--max-width", type=int, default=8192)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--max-bytes", type=int, default=0, help="Budget dung lượng (0: không giới hạn)")
+    parser.add_argument("--thumbnail-width", type=int, default=512)
+    parser.add_argument("--width", type=int, default=4096, help="Chiều rộng ảnh tổng hợp")
+    parser.add_argument("--out", help="Thư mục lưu ảnh đã transcode")
+    args = parser.parse_args()
+
+    from app.services.image_service import process_image
+
+    options = {
+        "format": args.format,
+        "max_width": args.max_width,
+        "quality": args.quality,
+        "max_bytes": args.max_bytes,
+        "thumbnail_width": args.thumbnail_width,
+    }
+    inputs = [(path, open(path, "rb").read()) for path in args.files]
+    if not inputs:
+        inputs = [(f"synthetic {args.width}x{args.width // 2}", synthetic_panorama(args.width))]
+
+    total_in = total_out = 0
+    for name, data in inputs:
+        start = time.perf_counter()
+        result = process_image(data, options)
+        elapsed = (time.perf_counter() - start) * 1000
+        report = result["transcode"]
+        total_in += len(data)
+        total_out += len(result["data"] or data)
+        if report and result["data"]:
+            print(
+                f"{name}: {report['source_format']} {report['source_width']}x{report['source_height']} "
+                f"{report['source_bytes']:>10} B -> {report['format']} {report['width']}x{report['height']} "
+                f"q{report['quality']} {report['bytes']:>10} B "
+                f"({report['saved_bytes'] / report['source_bytes']:.0%} saved), {elapsed:.0f} ms"
+            )
+        else:
+            print(f"{name}: kept original ({len(data)} B), {elapsed:.0f} ms")
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            base = os.path.splitext(os.path.basename(name))[0].replace(" ", "_")
+            with open(os.path.join(args.out, f"{base}.{result['format']}"), "wb") as f:
+                f.write(result["data"] or data)
+
+    if len(inputs) > 1 and total_in:
+        print(f"total: {total_in} B -> {total_out} B ({(total_in - total_out) / total_in:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
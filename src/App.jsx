@@ -1,6 +1,6 @@
 import { useState, useCallback, useEffect } from 'react';
 import Viewer from './components/Viewer';
-import { tourAPI } from './services/api';
+import { tourAPI, analyticsAPI } from './services/api';
 
 // const DEFAULT_TOUR_ID = '6787a1b2c3d4e5f6a7b8c9d0';
 const DEFAULT_TOUR_ID = '69661dfa5a3d3057d1ec3e3b';
@@ -21,6 +21,7 @@ function App() {
         
         const data = await tourAPI.export(DEFAULT_TOUR_ID);
         setTourData(data);
+        analyticsAPI.setTour(DEFAULT_TOUR_ID);
         // console.log()
         setCurrentSceneId(Object.keys(data.scenes)[0]);
       } catch (err) {
@@ -34,6 +35,37 @@ function App() {
     loadTour();
   }, []);
 
+  // Analytics: vào/rời scene kèm thời gian ở lại (ẩn tab cũng tính là rời scene)
+  useEffect(() => {
+    if (!currentSceneId) return;
+    let enteredAt = null;
+
+    const enter = () => {
+      enteredAt = Date.now();
+      analyticsAPI.track({ type: 'scene_enter', scene_id: currentSceneId });
+    };
+    const exit = () => {
+      if (enteredAt === null) return;
+      analyticsAPI.track({ type: 'scene_exit', scene_id: currentSceneId, dwell_ms: Date.now() - enteredAt });
+      enteredAt = null;
+    };
+    const handleVisibility = () => {
+      if (document.visibilityState === 'hidden') {
+        exit();
+        analyticsAPI.flush();
+      } else {
+        enter();
+      }
+    };
+
+    enter();
+    document.addEventListener('visibilitychange', handleVisibility);
+    return () => {
+      document.removeEventListener('visibilitychange', handleVisibility);
+      exit();
+    };
+  }, [currentSceneId]);
+
   const currentScene = tourData?.scenes?.[currentSceneId];
   const allScenes = tourData ? Object.values(tourData.scenes) : [];
 
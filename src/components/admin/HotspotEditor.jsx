@@ -10,7 +10,7 @@ import {
   HiOutlineCursorClick,
   HiOutlinePhotograph
 } from 'react-icons/hi';
-import { hotspotAPI } from '../../services/api';
+import { hotspotAPI, liveAPI } from '../../services/api';
 
 const HotspotEditor = ({
   scene,
@@ -26,6 +26,7 @@ const HotspotEditor = ({
   const cameraRef = useRef(null);
   const sphereRef = useRef(null);
   const rafRef = useRef(null);
+  const liveRef = useRef(null);
 
   const [hotspots, setHotspots] = useState([]);
   const [selectedHotspot, setSelectedHotspot] = useState(null);
@@ -65,6 +66,45 @@ const HotspotEditor = ({
     loadHotspots();
   }, [loadHotspots]);
 
+  // Apply hotspot changes pushed by the server (this and other open editors)
+  // instead of refetching the whole scene after every edit
+  useEffect(() => {
+    if (!scene.tour_id) return;
+
+    const live = liveAPI.subscribe(scene.tour_id, (events) => {
+      for (const event of events) {
+        if (event.op === 'resync') {
+          loadHotspots();
+          continue;
+        }
+        if (event.entity !== 'hotspot' || event.scene_id !== scene.id) continue;
+
+        if (event.op === 'create') {
+          setHotspots(prev => prev.some(h => h.id === event.id)
+            ? prev
+            : [...prev, { id: event.id, ...event.fields }]);
+        } else if (event.op === 'update') {
+          setHotspots(prev => prev.map(h =>
+            h.id === event.id ? { ...h, ...event.fields } : h
+          ));
+        } else if (event.op === 'delete') {
+          setHotspots(prev => prev.filter(h => h.id !== event.id));
+        }
+      }
+    });
+    liveRef.current = live;
+
+    return () => {
+      live.close();
+      liveRef.current = null;
+    };
+  }, [scene.tour_id, scene.id, loadHotspots]);
+
+  // Refetch only when the live channel is not connected
+  const refreshHotspots = useCallback(() => {
+    if (!liveRef.current?.isOpen()) loadHotspots();
+  }, [loadHotspots]);
+
   // Initialize Three.js
   useEffect(() => {
     if (!containerRef.current) return;
@@ -311,7 +351,7 @@ const HotspotEditor = ({
 
     if (success) {
       setShowModal(false);
-      loadHotspots();
+      refreshHotspots();
     }
   };
 
@@ -320,7 +360,7 @@ const HotspotEditor = ({
     if (!confirm('Xác nhận xóa hotspot này?')) return;
     const success = await onDelete(hotspotId);
     if (success) {
-      loadHotspots();
+      refreshHotspots();
       setSelectedHotspot(null);
     }
   };
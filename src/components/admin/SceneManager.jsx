@@ -105,9 +105,16 @@ const SceneManager = ({
             className={`item-card scene-card ${selectedScene?.id === scene.id ? 'selected' : ''}`}
             onClick={() => onSelect(scene)}
           >
-            <div className="scene-thumbnail">
+            <div
+              className="scene-thumbnail"
+              style={scene.preview?.dominant_color ? { backgroundColor: scene.preview.dominant_color } : undefined}
+            >
               {scene.image_url ? (
-                <img src={scene.image_url} alt={scene.name} />
+                <img
+                  src={scene.preview?.thumbnail_url || scene.image_url}
+                  alt={scene.name}
+                  loading="lazy"
+                />
               ) : (
                 <div className="no-image">
                   <HiOutlinePhotograph />
@@ -1,10 +1,12 @@
 import { useCallback } from 'react';
+import { analyticsAPI } from '../../services/api';
 
 /**
  * Component hiển thị một hotspot trên panorama
  */
 const Hotspot = ({ hotspot, currentSceneId, onSceneChange, setHotspotRef }) => {
   const handleClick = useCallback(() => {
+    analyticsAPI.track({ type: 'hotspot_click', scene_id: currentSceneId, hotspot_id: hotspot.id });
     if (hotspot.type === 'click') {
       // Sử dụng target_scene hoặc targetScene (tùy format dữ liệu)
       const targetSceneId = hotspot.target_scene || hotspot.targetScene;
@@ -141,6 +141,12 @@ export const hotspotAPI = {
       body: JSON.stringify(position),
     }),
 
+  updatePositions: (items, relaxed = false) => 
+    fetchAPI('/hotspots/positions', {
+      method: 'PATCH',
+      body: JSON.stringify({ items, relaxed }),
+    }),
+
   delete: (hotspotId) => 
     fetchAPI(`/hotspots/${hotspotId}`, {
       method: 'DELETE',
@@ -152,8 +158,97 @@ export const hotspotAPI = {
     }),
 };
 
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+
+export const liveAPI = {
+  // Live channel of a tour: onEvents receives arrays of events
+  // (create/update/delete/resync). Reconnects automatically and emits a
+  // resync after reconnecting since changes may have been missed.
+  subscribe: (tourId, onEvents) => {
+    let socket = null;
+    let closed = false;
+    let subscribedBefore = false;
+    let retryDelay = 1000;
+
+    const connect = () => {
+      socket = new WebSocket(`${WS_BASE_URL}/tours/${tourId}/live`);
+      socket.onmessage = (message) => {
+        const events = JSON.parse(message.data);
+        if (events[0]?.op === 'subscribed') {
+          retryDelay = 1000;
+          if (subscribedBefore) onEvents([{ op: 'resync', tour_id: tourId }]);
+          subscribedBefore = true;
+        }
+        onEvents(events);
+      };
+      socket.onclose = () => {
+        if (closed) return;
+        setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+    return {
+      isOpen: () => socket?.readyState === WebSocket.OPEN,
+      close: () => {
+        closed = true;
+        socket?.close();
+      },
+    };
+  },
+};
+
+const ANALYTICS_FLUSH_MS = 5000;
+const ANALYTICS_MAX_BATCH = 100;
+const analyticsQueue = [];
+const analyticsSession = `${Date.now().toString(36)}${Math.random().toString(36).slice(2)}`;
+let analyticsTimer = null;
+let analyticsTourId = null;
+
+export const analyticsAPI = {
+  // Tour attached to every tracked event
+  setTour: (tourId) => {
+    analyticsTourId = tourId;
+  },
+
+  // Queue a viewer event (scene_enter, scene_exit, hotspot_click, dwell).
+  // Events are sent in batches every few seconds and when the page is hidden.
+  track: (event) => {
+    if (!analyticsTourId) return;
+    analyticsQueue.push({
+      tour_id: analyticsTourId,
+      session_id: analyticsSession,
+      ts: new Date().toISOString(),
+      ...event,
+    });
+    if (analyticsQueue.length >= ANALYTICS_MAX_BATCH) {
+      analyticsAPI.flush();
+    } else if (!analyticsTimer) {
+      analyticsTimer = setTimeout(analyticsAPI.flush, ANALYTICS_FLUSH_MS);
+    }
+  },
+
+  flush: () => {
+    clearTimeout(analyticsTimer);
+    analyticsTimer = null;
+    if (analyticsQueue.length === 0) return;
+    const events = analyticsQueue.splice(0, analyticsQueue.length);
+    // keepalive lets the request finish while the page unloads;
+    // analytics is best effort so errors are ignored
+    fetch(`${API_BASE_URL}/analytics/events`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ events }),
+      keepalive: true,
+    }).catch(() => {});
+  },
+};
+
 export default {
   tour: tourAPI,
   scene: sceneAPI,
   hotspot: hotspotAPI,
+  live: liveAPI,
+  analytics: analyticsAPI,
 };